@@ -1,36 +1,124 @@
-from fastapi import FastAPI
-import subprocess
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+from typing import List, Optional
+import os
+import sys
+import asyncio
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from pipeline import run_pipeline, STAGES, OUTPUT_DIR
+from job_manager import JobManager
+from model_registry import ModelRegistry, MicroBatcher
+import instrumentation as metrics
 
 app = FastAPI(title="ExoAsteroid Discovery API 🚀")
+jobs = JobManager()
+models = ModelRegistry()
+batcher = MicroBatcher(models)
+
+CARDS_DIR = "reports"
+
+
+def start_job(kind, targets=None, force=False, resources=(OUTPUT_DIR,)):
+    """Queue a pipeline run; stages whose inputs are unchanged are skipped unless forced."""
+    selected = targets or [s.name for s in STAGES]
+
+    def work(job):
+        return run_pipeline(selected, force=selected if force else (),
+                            on_stage=job.update_stage, cancel_event=job.cancel_event)
+
+    job = jobs.submit(kind, work, resources)
+    return {"job_id": job.id, "status": job.status}
+
+
+def get_job(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
 
 @app.get("/")
 def root():
     return {"message": "ExoAsteroid Pipeline Ready!"}
 
-@app.post("/detect-dips")
-def detect_dips():
-    subprocess.run(["python", "scripts/batch_dip_scanner.py"])
-    return {"status": "✅ Dips detected and saved."}
-
-@app.post("/auto-label")
-def auto_label():
-    subprocess.run(["python", "scripts/auto_label_dips.py"])
-    return {"status": "✅ Auto-labeling complete."}
-
-@app.post("/train-model")
-def train_model():
-    subprocess.run(["python", "scripts/train_dip_classifier.py"])
-    return {"status": "✅ Model trained and saved."}
-
-@app.post("/predict")
-def predict():
-    subprocess.run(["python", "scripts/predict_dip_labels.py"])
-    return {"status": "✅ New dips labeled with predictions."}
-
-@app.post("/full-run")
-def full_pipeline():
-    subprocess.run(["python", "scripts/batch_dip_scanner.py"])
-    subprocess.run(["python", "scripts/auto_label_dips.py"])
-    subprocess.run(["python", "scripts/train_dip_classifier.py"])
-    subprocess.run(["python", "scripts/predict_dip_labels.py"])
-    return {"status": "🚀 Full pipeline complete."}
+@app.post("/detect-dips", status_code=202)
+def detect_dips(force: bool = False):
+    return start_job("detect-dips", ["scan"], force)
+
+@app.post("/auto-label", status_code=202)
+def auto_label(force: bool = False):
+    return start_job("auto-label", ["auto_label"], force)
+
+@app.post("/train-model", status_code=202)
+def train_model(force: bool = False):
+    return start_job("train-model", ["train"], force)
+
+@app.post("/predict", status_code=202)
+def predict(force: bool = False):
+    return start_job("predict", ["predict"], force)
+
+
+class PredictRequest(BaseModel):
+    rows: List[dict]  # dip feature rows, e.g. {"depth": 0.012, "duration": 0.08, ...}
+    version: Optional[str] = None  # model version; default is the current model
+
+
+@app.post("/predict/batch")
+async def predict_batch(request: PredictRequest):
+    # Concurrent requests are micro-batched into one predict_proba call
+    future = batcher.submit(request.rows, request.version)
+    try:
+        return await asyncio.wrap_future(future)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except FileNotFoundError:
+        raise HTTPException(status_code=503, detail="No trained model yet. Run /train-model first.")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@app.get("/predict/batch/stats")
+def predict_stats():
+    return batcher.summary()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    # Stage spans and counters accumulate as jobs run in this process; the
+    # batcher and job table are sampled at scrape time
+    summary = batcher.summary()
+    for name in ("requests", "rows", "batches", "errors"):
+        metrics.gauge(f"predict_{name}", summary[name])
+    metrics.gauge("predict_busy_seconds", summary["predict_seconds"])
+    for quantile, ms in summary["latency_ms"].items():
+        metrics.gauge("predict_latency_ms", ms, quantile=quantile)
+    metrics.gauge("predict_queue_depth", batcher.queue.qsize())
+    by_status = Counter(job["status"] for job in jobs.list())
+    for status in ("queued", "waiting", "running", "succeeded", "failed", "cancelled"):
+        metrics.gauge("jobs", by_status[status], status=status)
+    return metrics.prometheus_text()
+
+@app.get("/models")
+def list_models():
+    return models.versions()
+
+@app.post("/full-run", status_code=202)
+def full_pipeline(force: bool = False):
+    return start_job("full-run", force=force, resources=(OUTPUT_DIR, CARDS_DIR))
+
+@app.get("/jobs")
+def list_jobs():
+    return jobs.list()
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    return get_job(job_id).summary()
+
+@app.get("/jobs/{job_id}/logs")
+def job_logs(job_id: str, tail: int = 200):
+    return {"job_id": job_id, "lines": get_job(job_id).log.tail(tail)}
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    get_job(job_id)
+    return jobs.cancel(job_id).summary()
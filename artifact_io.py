@@ -0,0 +1,174 @@
+# === Pipeline Artifact I/O ===
+# Typed Parquet storage for the tables handed between stages in exoasteroid_output/.
+#
+# Stages keep referring to artifacts by their historical CSV paths
+# (e.g. "exoasteroid_output/all_dips.csv"); the data itself lives next to it as
+# all_dips.parquet with an explicit schema. Readers fall back to the CSV for
+# outputs of older runs. A CSV copy is still written by default while scripts
+# and users that read exoasteroid_output/*.csv move over; set
+# EXOASTEROID_EXPORT_CSV=0 to write Parquet only.
+
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from tic_utils import normalize_tic, format_tic
+
+EXPORT_CSV = os.environ.get("EXOASTEROID_EXPORT_CSV", "1") == "1"
+
+TIC_COLUMNS = {"tic_id", "TIC"}
+# Measurements where float32 (~7 significant digits) is plenty; times, epochs
+# and sky coordinates stay float64
+FLOAT32_COLUMNS = {
+    "depth", "dip_depth", "duration", "peak_power", "ls_period",
+    "bls_period", "bls_duration", "bls_depth", "bls_snr",
+    "object_radius_km", "star_radius_rsun", "rad", "Tmag", "Teff", "logg", "mass",
+    "Tmag_x", "Tmag_y", "Teff_x", "Teff_y", "rad_x", "rad_y",
+    "ingress_slope", "egress_slope", "symmetry", "local_noise", "snr", "edge_distance",
+    "contamination_ratio", "nearest_neighbor_arcsec",
+}
+CATEGORY_COLUMNS = {"label", "predicted_label", "discovery_label", "exofop_status", "dip_shape",
+                    "model_version"}
+
+
+def parquet_path(path):
+    return os.path.splitext(path)[0] + ".parquet"
+
+
+def csv_path(path):
+    return os.path.splitext(path)[0] + ".csv"
+
+
+def artifact_exists(path):
+    return os.path.exists(parquet_path(path)) or os.path.exists(csv_path(path))
+
+
+def _tic_numbers(values):
+    # Dip tables repeat each TIC many times, so normalize the unique IDs only
+    if pd.api.types.is_numeric_dtype(values):
+        numbers = values
+    else:
+        codes, uniques = pd.factorize(values)
+        lookup = np.array([normalize_tic(u) for u in uniques] + [np.nan], dtype=float)
+        numbers = pd.Series(lookup[codes], index=values.index)
+    return numbers.astype("Int64" if numbers.isna().any() else np.int64)
+
+
+def apply_schema(df):
+    """Cast a frame to the pipeline's storage types (in place-safe copy)."""
+    df = df.copy()
+    for col in df.columns:
+        # Columns read back from Parquet are typed already; casting them again is a full copy
+        dtype = df[col].dtype
+        if col in TIC_COLUMNS:
+            if dtype != np.int64:
+                df[col] = _tic_numbers(df[col])
+        elif col in FLOAT32_COLUMNS and pd.api.types.is_numeric_dtype(dtype):
+            if dtype != np.float32:
+                df[col] = df[col].astype(np.float32)
+        elif col in CATEGORY_COLUMNS:
+            if not isinstance(dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype("category")
+    return df
+
+
+def _csv_frame(df):
+    # CSV consumers expect the historical "TIC 123" spelling
+    df = df.copy()
+    for col in TIC_COLUMNS & set(df.columns):
+        df[col] = df[col].map(format_tic, na_action="ignore")
+    return df
+
+
+def write_table(df, path, export_csv=None):
+    """Write an artifact as Parquet (plus a CSV copy when exporting)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    df = apply_schema(df)
+    tmp = parquet_path(path) + ".tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, parquet_path(path))
+    if EXPORT_CSV if export_csv is None else export_csv:
+        tmp = csv_path(path) + ".tmp"
+        _csv_frame(df).to_csv(tmp, index=False)
+        os.replace(tmp, csv_path(path))
+    return df
+
+
+def _apply_filters(df, filters):
+    ops = {
+        "==": lambda s, v: s == v, "=": lambda s, v: s == v, "!=": lambda s, v: s != v,
+        "<": lambda s, v: s < v, "<=": lambda s, v: s <= v,
+        ">": lambda s, v: s > v, ">=": lambda s, v: s >= v,
+        "in": lambda s, v: s.isin(v), "not in": lambda s, v: ~s.isin(v),
+    }
+    mask = pd.Series(True, index=df.index)
+    for col, op, value in filters:
+        mask &= ops[op](df[col], value)
+    return df[mask].reset_index(drop=True)
+
+
+def read_table(path, columns=None, filters=None):
+    """
+    Read an artifact, optionally projecting `columns` and applying `filters`
+    (pyarrow-style [(column, op, value), ...], AND-ed). With Parquet both are
+    pushed down to the reader, so untouched columns and row groups are skipped.
+    """
+    if os.path.exists(parquet_path(path)):
+        return pd.read_parquet(parquet_path(path), columns=columns, filters=filters)
+
+    df = pd.read_csv(csv_path(path))
+    if filters:
+        df = _apply_filters(apply_schema(df), filters)
+    if columns is not None:
+        df = df[columns]
+    return apply_schema(df)
+
+
+class TableWriter:
+    """
+    Appends frames to a Parquet artifact one row group at a time, for stages
+    that stream their output (e.g. the scanner's ordered merge). Both files
+    are written under a .tmp name and only replace the artifact in close(),
+    so an interrupted run leaves the previous one intact.
+    """
+
+    def __init__(self, path, export_csv=None):
+        self.path = path
+        self.export_csv = EXPORT_CSV if export_csv is None else export_csv
+        self.tmp = parquet_path(path) + ".tmp"
+        self.csv_tmp = csv_path(path) + ".tmp"
+        self.writer = None
+        self.rows = 0
+
+    def write(self, df):
+        df = apply_schema(df)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self.writer is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.writer = pq.ParquetWriter(self.tmp, table.schema)
+        else:
+            table = table.cast(self.writer.schema)
+        self.writer.write_table(table)
+        if self.export_csv:
+            _csv_frame(df).to_csv(self.csv_tmp, mode="w" if self.rows == 0 else "a",
+                                  index=False, header=self.rows == 0)
+        self.rows += len(df)
+
+    def close(self, empty=None):
+        """
+        Publish the artifact. If nothing was written, `empty` (a frame with the
+        artifact's columns) is written instead, so a rerun with no rows never
+        leaves the previous run's artifact behind; without it the old one is removed.
+        """
+        if self.writer is None and empty is not None:
+            self.write(empty.iloc[:0])
+        if self.writer is not None:
+            self.writer.close()
+            os.replace(self.tmp, parquet_path(self.path))
+            if self.export_csv:
+                os.replace(self.csv_tmp, csv_path(self.path))
+            return
+        for path in (parquet_path(self.path), csv_path(self.path)):
+            if os.path.exists(path):
+                os.remove(path)
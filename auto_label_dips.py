@@ -1,38 +1,43 @@
 # === Auto Label Dips Based on Heuristics ===
 # This script adds labels like 'asteroid', 'planet', 'noise' to dips based on rules
 
-import pandas as pd
-import os
+import numpy as np
+from artifact_io import artifact_exists, read_table, write_table
 
 input_csv = "exoasteroid_output/all_dips.csv"
 output_csv = "exoasteroid_output/dip_labels_auto.csv"
 
-if not os.path.exists(input_csv):
-    raise FileNotFoundError("❌ all_dips.csv not found. Run the batch scanner first.")
 
-# Load dip data
-df = pd.read_csv(input_csv)
-labels = []
+def label_dips(df):
+    """Return a copy of the dip table with a rule-based 'label' column."""
+    depth = df['depth'].to_numpy(dtype=float)
+    duration = df['duration'].to_numpy(dtype=float)
 
-# Rule-based labeling
-for _, row in df.iterrows():
-    depth = row['depth']
-    duration = row['duration']
+    # Rule-based labeling, first matching rule wins (one column pass per rule)
+    labels = np.select(
+        [(depth < 0.005) | (duration < 0.01),
+         (depth < 0.015) & (duration < 0.06),
+         (depth >= 0.015) & (duration >= 0.06)],
+        ['noise', 'asteroid', 'planet'],
+        default='unknown',
+    )
 
-    if depth < 0.005 or duration < 0.01:
-        label = 'noise'
-    elif depth < 0.015 and duration < 0.06:
-        label = 'asteroid'
-    elif depth >= 0.015 and duration >= 0.06:
-        label = 'planet'
-    else:
-        label = 'unknown'
+    df = df.copy()
+    df['label'] = labels
+    return df
 
-    labels.append(label)
 
-# Add and save
-df['label'] = labels
-df.to_csv(output_csv, index=False)
+def run():
+    if not artifact_exists(input_csv):
+        raise FileNotFoundError("❌ all_dips.csv not found. Run the batch scanner first.")
 
-print(f"✅ Auto-labeled dips saved to: {output_csv}")
-print("📌 Labels used: 'noise', 'asteroid', 'planet', 'unknown'")
+    # Load, label and save
+    df = label_dips(read_table(input_csv))
+    write_table(df, output_csv)
+
+    print(f"✅ Auto-labeled dips saved to: {output_csv}")
+    print("📌 Labels used: 'noise', 'asteroid', 'planet', 'unknown'")
+
+
+if __name__ == "__main__":
+    run()
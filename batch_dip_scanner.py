@@ -1,98 +1,481 @@
 # Batch Dip Scanner for ExoAsteroids - Multi-TIC Processing
 
-from lightkurve import search_lightcurve, search_targetpixelfile
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import os
+import json
+import hashlib
+import time as timer
+import argparse
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from dip_detection import find_dips, dips_to_frame, concat_dips, StreamingDipDetector
+from dip_features import extract_features, with_features, NOISE_WINDOW
+from detrending import detrend
+from single_event_search import search_events, BASELINE
+import lc_cache
+from tpf_access import ensure_tpf, frames_near_time
+from render import render_job
+from artifact_io import TableWriter
+from tic_utils import normalize_tic
+from prefetch import Prefetcher
+import instrumentation as metrics
 
 # === Config ===
 tic_file = "tics.txt"  # one TIC ID per line
-dip_threshold = 0.995
+dip_threshold = 0.995  # flux cut for method "threshold" (and first-pass dips masked while detrending)
 output_folder = "exoasteroid_output"
-os.makedirs(output_folder, exist_ok=True)
+workers = 1  # >1 scans TICs in a process pool
+stream = False  # scan sector by sector instead of the stitched light curve
+profile_folder = os.path.join(output_folder, "profiles")
+manifest_file = os.path.join(output_folder, "scan_manifest.jsonl")
+max_attempts = 3  # a TIC that failed this many times is not retried by --resume
+download_threads = 2  # prefetch light curves and TPFs for upcoming TICs (0 = off)
+prefetch_depth = 4  # prefetched TICs allowed to wait for analysis
+prefetch_tpf = True
+detrend_method = "biweight"  # "median", or None to scan the normalized flux as is
+detrend_window = 0.75  # days; dips much longer than a third of this get partly absorbed
+detect_method = "matched_filter"  # or "threshold": every run of cadences with flux < dip_threshold
+snr_threshold = 7.0  # matched-filter SNR cut
 
-# === Master Dip Collection ===
-all_dips = []
 
-# === Load TICs ===
-with open(tic_file, "r") as f:
-    tic_ids = [line.strip() for line in f if line.strip()]
+def load_tic_ids(path=tic_file):
+    with open(path, "r") as f:
+        return [line.strip() for line in f if line.strip()]
 
-for tic_id in tic_ids:
-    try:
-        print(f"\n🔭 Processing {tic_id}...")
-
-        # Step 1: Download and clean light curve
-        lc_collection = search_lightcurve(tic_id, author="SPOC", mission="TESS").download_all()
-        lc = lc_collection.stitch().normalize().remove_outliers()
-
-        flux = lc.flux.value
-        time = lc.time.value
-
-        # Step 2: Dip detection
-        dip_events = []
-        start = None
-        for i in range(len(flux)):
-            if flux[i] < dip_threshold:
-                if start is None:
-                    start = i
-            else:
-                if start is not None:
-                    end = i
-                    event = {
-                        "TIC": tic_id,
-                        "start_index": start,
-                        "end_index": end - 1,
-                        "start_time": time[start],
-                        "end_time": time[end - 1],
-                        "depth": 1 - np.min(flux[start:end]),
-                        "duration": time[end - 1] - time[start]
-                    }
-                    dip_events.append(event)
-                    start = None
-
-        if not dip_events:
-            print("⚠️  No dips found for this target.")
-            continue
-
-        # Save dip CSV for this TIC
-        df = pd.DataFrame(dip_events)
-        csv_path = os.path.join(output_folder, f"{tic_id.replace(' ', '_')}_dips.csv")
-        df.to_csv(csv_path, index=False)
-        print(f"✅ Saved dips to {csv_path}")
-
-        # Save dips to master list
-        all_dips.extend(dip_events)
-
-        # Step 3: Pixel Frame
-        tpf = search_targetpixelfile(tic_id, mission="TESS").download()
-        first_dip = dip_events[0]
-        frame_index = first_dip['start_index']
-        frame = tpf.flux[frame_index]
-
-        plt.figure(figsize=(6, 6))
-        plt.imshow(frame.value, cmap='plasma', origin='lower')
-        plt.colorbar(label='Flux (e⁻/s)')
-        plt.title(f"{tic_id} - Pixel Frame During Dip")
-        pixel_path = os.path.join(output_folder, f"{tic_id.replace(' ', '_')}_pixel_dip_frame.png")
-        plt.savefig(pixel_path)
-        plt.close()
-        print(f"🖼️  Saved pixel image: {pixel_path}")
-
-        # Step 4: Print ExoFOP link
-        tic_num = tic_id.split()[1]
-        exofop_url = f"https://exofop.ipac.caltech.edu/tess/target.php?id={tic_num}"
-        print("🔗 ExoFOP:", exofop_url)
 
+def write_csv_atomic(df, path):
+    # A crash mid-write leaves only the temporary file, never a truncated CSV
+    tmp = f"{path}.{os.getpid()}.tmp"
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def scan_config(stream_sectors, overrides=None):
+    """
+    Settings a finished TIC's result depends on: the module defaults with
+    `overrides` applied. The same dict is recorded in the manifest (--resume
+    rescans TICs scanned with other settings) and handed to every scan_tic,
+    so pool workers run exactly what the manifest says.
+    """
+    config = {"threshold": dip_threshold, "stream": bool(stream_sectors),
+              "detrend": detrend_method, "detrend_window": detrend_window,
+              "method": detect_method, "snr": snr_threshold}
+    config.update(overrides or {})
+    if not config["detrend"]:
+        config["detrend_window"] = None
+    if config["method"] != "matched_filter":
+        config["snr"] = None
+    return config
+
+
+def data_fingerprint(tic_id, stream_sectors):
+    """Short hash of the cached light curve entry a scan used, None if not cached."""
+    key = lc_cache.data_key(tic_id, "scan_sector" if stream_sectors else "scan")
+    return hashlib.sha1(key.encode()).hexdigest()[:16] if key else None
+
+
+class ScanManifest:
+    """
+    Append-only JSON-lines journal of finished TICs.
+
+    Every finished TIC appends one record (status, output paths, data
+    fingerprint, scan config, attempts and timing), flushed and fsynced
+    before the scan moves on, so after a crash the journal lists all the
+    work that completed. A later record for a TIC supersedes earlier ones;
+    a line torn by the crash is ignored.
+    """
+
+    def __init__(self, path, config, resume=False, attempts_cap=None):
+        self.path = path
+        self.config = config
+        self.attempts_cap = max_attempts if attempts_cap is None else attempts_cap
+        self.records = {}
+        if resume and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self.records[record["tic_id"]] = record
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.file = open(path, "a" if resume else "w")
+
+    def reusable(self, tic_id, stream_sectors):
+        """
+        The TIC's last record if it need not be scanned again: it finished
+        with the same config, its CSV is still there and the cached light
+        curve has not changed since; or it failed attempts_cap times.
+        """
+        record = self.records.get(tic_id)
+        if record is None or record.get("config") != self.config:
+            return None
+        if record["status"] == "error":
+            return record if record["attempts"] >= self.attempts_cap else None
+        if record["status"] == "ok" and not (record["csv_path"] and os.path.exists(record["csv_path"])):
+            return None
+        current = data_fingerprint(tic_id, stream_sectors)
+        if current is not None and current != record.get("fingerprint"):
+            return None  # new data since, e.g. another sector
+        return record
+
+    def record(self, result):
+        previous = self.records.get(result["tic_id"], {})
+        record = {key: value for key, value in result.items() if key != "metrics"}
+        record.update(config=self.config, attempts=previous.get("attempts", 0) + 1, finished_at=timer.time())
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.records[result["tic_id"]] = record
+
+    def close(self):
+        self.file.close()
+
+
+def scan_tic(tic_id, stream_sectors=None, config=None):
+    """
+    Download, detect and plot one TIC with the given scan_config (module
+    defaults if None). Failures are caught here so one bad target never
+    takes down the rest of the batch (or a pool worker).
+    """
+    started = timer.perf_counter()
+    stream_sectors = stream if stream_sectors is None else stream_sectors
+    config = config or scan_config(stream_sectors)
+    result = {"tic_id": tic_id, "status": "ok", "n_dips": 0, "csv_path": None, "png_path": None,
+              "error": None, "cache_hit": False, "fingerprint": None}
+    try:
+        with metrics.span("scan_tic", tic=tic_id):
+            _scan_tic(tic_id, stream_sectors, config, result)
     except Exception as e:
         print(f"❌ Error processing {tic_id}: {e}")
+        metrics.count_error(e, stage="scan")
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        result["elapsed"] = timer.perf_counter() - started
+        metrics.count("tics", status=result["status"])
+        if metrics.in_worker():
+            result["metrics"] = metrics.drain()  # merged by the parent
+    return result
+
+
+def detrended(tic_id, time, flux, config):
+    """Flux with stellar variability removed (first-pass dips masked), or as is if detrending is off."""
+    if not config["detrend"]:
+        return flux
+    with metrics.span("detrend", tic=tic_id):
+        return detrend(time, flux, method=config["detrend"], window=config["detrend_window"],
+                       mask_threshold=config["threshold"])
+
+
+def detect(time, flux, config):
+    """Dips (find_dips schema) by the config's method: matched-filter events or threshold runs."""
+    if config["method"] == "matched_filter":
+        return search_events(time, flux, config["snr"])
+    return find_dips(time, flux, [config["threshold"]])
+
+
+def empty_dips_frame(config):
+    """Zero-row dip table with the columns the config's method writes."""
+    time = np.empty(0)
+    return dips_to_frame(with_features(time, time, detect(time, time, config)), "")
+
+
+def _scan_tic(tic_id, stream_sectors, config, result):
+    print(f"\n🔭 Processing {tic_id}...")
+
+    # Step 1+2: Light curve (served from the local cache when warm), dip detection and features
+    misses_before = lc_cache.stats["misses"]
+    if stream_sectors and config["method"] == "matched_filter":
+        # One sector in memory at a time; the search never spans a data gap,
+        # so sector by sector finds the same events as the stitched curve
+        parts, offset = [], 0
+        for n, sector in enumerate(lc_cache.iter_sectors(tic_id)):
+            flux = detrended(tic_id, sector["time"], sector["flux"], config)
+            with metrics.span("detect", tic=tic_id):
+                events = with_features(sector["time"], flux, detect(sector["time"], flux, config))
+            for key in ("start_index", "end_index", "min_index"):
+                events[key] = events[key] + offset
+            offset += len(flux)
+            parts.append(events)
+            print(f"📡 {tic_id} sector {n + 1}: {len(events['start_index'])} events")
+        dips = concat_dips(parts, [BASELINE])
+    elif stream_sectors:
+        # One sector in memory at a time; a dip straddling a sector
+        # boundary is carried over and reported once
+        detector = StreamingDipDetector([config["threshold"]], extract=extract_features, context=NOISE_WINDOW)
+        parts = []
+        for n, sector in enumerate(lc_cache.iter_sectors(tic_id)):
+            flux = detrended(tic_id, sector["time"], sector["flux"], config)
+            with metrics.span("detect", tic=tic_id):
+                parts.append(detector.feed(sector["time"], flux))
+            print(f"📡 {tic_id} sector {n + 1}: {len(parts[-1]['start_index'])} dips")
+        dips = concat_dips(parts, [config["threshold"]])
+    else:
+        with metrics.span("lightcurve", tic=tic_id):
+            lc = lc_cache.get_lightcurve(tic_id, recipe="scan")
+        flux = detrended(tic_id, lc["time"], lc["flux"], config)
+        with metrics.span("detect", tic=tic_id):
+            found = detect(lc["time"], flux, config)
+        with metrics.span("features", tic=tic_id):
+            dips = with_features(lc["time"], flux, found)
+    result["cache_hit"] = lc_cache.stats["misses"] == misses_before
+    result["fingerprint"] = data_fingerprint(tic_id, stream_sectors)
+    metrics.count("dips_found", len(dips["start_index"]))
+
+    if len(dips["start_index"]) == 0:
+        print(f"⚠️  No dips found for {tic_id}.")
+        result["status"] = "no_dips"
+        return
+
+    # Save dip CSV for this TIC
+    with metrics.span("write_csv", tic=tic_id):
+        df = dips_to_frame(dips, tic_id)
+        csv_path = os.path.join(output_folder, f"{tic_id.replace(' ', '_')}_dips.csv")
+        write_csv_atomic(df, csv_path)
+    print(f"✅ Saved dips to {csv_path}")
+    result["csv_path"] = csv_path
+    result["n_dips"] = len(df)
+
+    # Step 3: Pixel Frame (one cadence read from the memory-mapped TPF)
+    with metrics.span("tpf", tic=tic_id):
+        tpf_path, _ = ensure_tpf(tic_id)
+        frame = frames_near_time(tpf_path, dips["start_time"][0])["flux"][0]
 
-# === Save Merged Dip CSV ===
-if all_dips:
-    all_dips_df = pd.DataFrame(all_dips)
+    pixel_path = os.path.join(output_folder, f"{tic_id.replace(' ', '_')}_pixel_dip_frame.png")
+    result["png_path"] = render_job({"kind": "frame", "path": pixel_path, "frame": frame,
+                                     "title": f"{tic_id} - Pixel Frame During Dip"})
+    print(f"🖼️  Saved pixel image: {pixel_path}")
+
+    # Step 4: Print ExoFOP link
+    tic_num = normalize_tic(tic_id)
+    exofop_url = f"https://exofop.ipac.caltech.edu/tess/target.php?id={tic_num}"
+    print("🔗 ExoFOP:", exofop_url)
+
+
+def prefetch_tic(tic_id, stream_sectors):
+    """
+    Download (or find cached) everything scan_tic reads, on a prefetch
+    thread. The data lands in the light curve cache and TPF index, so the
+    scan itself then runs from disk. Returns whether it was already cached.
+    """
+    recipe = "scan_sector" if stream_sectors else "scan"
+    cached_key = lc_cache.data_key(tic_id, recipe)
+    with metrics.span("prefetch", tic=tic_id):
+        if stream_sectors:
+            for _ in lc_cache.iter_sectors(tic_id):
+                pass
+        else:
+            lc_cache.get_lightcurve(tic_id, recipe=recipe)
+        if prefetch_tpf:
+            try:
+                ensure_tpf(tic_id)
+            except Exception as e:
+                # Only needed if dips turn up; scan_tic retries and reports it then
+                metrics.count_error(e, stage="prefetch_tpf")
+    return {"cache_hit": cached_key is not None and cached_key == lc_cache.data_key(tic_id, recipe)}
+
+
+def failed_result(tic_id, error):
+    return {"tic_id": tic_id, "status": "error", "n_dips": 0, "csv_path": None, "png_path": None,
+            "error": f"{type(error).__name__}: {error}", "elapsed": 0.0, "cache_hit": False,
+            "fingerprint": None}
+
+
+def profile_tic(tic_id, mode="cprofile", stream_sectors=None, settings=None):
+    """Scan one TIC under the profiler; the output lands in profile_folder."""
+    os.makedirs(output_folder, exist_ok=True)
+    suffix = "prof" if mode == "cprofile" else "collapsed"
+    path = os.path.join(profile_folder, f"{tic_id.replace(' ', '_')}.{suffix}")
+    with metrics.profiled(path, mode):
+        result = scan_tic(tic_id, stream_sectors, scan_config(stream_sectors, settings))
+    metrics.print_summary()
+    return result
+
+
+class OrderedDipMerger:
+    """
+    Streams per-TIC dip CSVs into the all_dips artifact in TIC-list order.
+
+    Results may arrive in any order; each one is appended as soon as every
+    TIC before it in the list has been written, so the merged file grows
+    while the scan runs and always ends up in the same deterministic order.
+    """
+
+    def __init__(self, tic_ids, merged_path, config):
+        self.config = config
+        self.position = {tic: i for i, tic in enumerate(tic_ids)}
+        self.writer = TableWriter(merged_path)
+        self.pending = {}
+        self.next_index = 0
+        self.rows_written = 0
+
+    def add(self, result):
+        self.pending[self.position[result["tic_id"]]] = result
+        while self.next_index in self.pending:
+            ready = self.pending.pop(self.next_index)
+            self.next_index += 1
+            if ready["csv_path"]:
+                df = pd.read_csv(ready["csv_path"])
+                self.writer.write(df)
+                self.rows_written += len(df)
+
+    def close(self):
+        # Zero dips still replaces the previous run's all_dips, with an empty table
+        self.writer.close(empty=empty_dips_frame(self.config))
+
+
+def print_summary(results):
+    print("\n📋 Scan summary")
+    print(f"{'TIC':<16}{'status':<10}{'dips':>6}{'wall (s)':>10}")
+    for r in results:
+        reused = " (resumed)" if r.get("resumed") else ""
+        print(f"{r['tic_id']:<16}{r['status']:<10}{r['n_dips']:>6}{r['elapsed']:>10.1f}{reused}")
+        if r["error"]:
+            print(f"    ↳ {r['error']}")
+    scanned = [r for r in results if not r.get("resumed")]
+    total = sum(r["elapsed"] for r in scanned)
+    failed = sum(r["status"] == "error" for r in results)
+    hits = sum(r["cache_hit"] for r in scanned)
+    print(f"⏱️ {len(results)} TICs, {failed} failed, {total:.1f}s summed TIC time "
+          f"({len(results) - len(scanned)} resumed from the manifest)")
+    print(f"💾 Light curve cache: {hits} hits, {len(scanned) - hits} misses")
+
+
+def run(tic_path=tic_file, n_workers=workers, stream_sectors=None, resume=False, attempts_cap=None,
+        n_threads=None, depth=None, settings=None):
+    """
+    Scan every TIC in tic_path. With resume=True, TICs the manifest shows
+    as finished are reused instead of rescanned, and failed ones are retried
+    until they have failed attempts_cap times. n_threads download threads
+    prefetch up to `depth` TICs ahead of the scan. `settings` overrides
+    scan_config defaults (e.g. {"method": "threshold", "threshold": 0.99}).
+    """
+    stream_sectors = stream if stream_sectors is None else stream_sectors
+    n_threads = download_threads if n_threads is None else n_threads
+    depth = prefetch_depth if depth is None else depth
+    os.makedirs(output_folder, exist_ok=True)
+    tic_ids = list(dict.fromkeys(load_tic_ids(tic_path)))  # drop repeats, keep order
     merged_path = os.path.join(output_folder, "all_dips.csv")
-    all_dips_df.to_csv(merged_path, index=False)
-    print(f"\n📦 Merged all dip data to: {merged_path}")
-else:
-    print("\n⚠️ No dips found in any targets. Try lowering the threshold or using different TICs.")
+    config = scan_config(stream_sectors, settings)
+    merger = OrderedDipMerger(tic_ids, merged_path, config)
+    manifest = ScanManifest(manifest_file, config, resume, attempts_cap)
+    started = timer.perf_counter()
+
+    results = []
+    todo = []
+    for tic_id in tic_ids:
+        record = manifest.reusable(tic_id, stream_sectors) if resume else None
+        if record is None:
+            todo.append(tic_id)
+        else:
+            results.append({**record, "resumed": True})
+            merger.add(record)  # its CSV is merged in list order, as if just scanned
+    if resume:
+        gave_up = sum(r["status"] == "error" for r in results)
+        retried = sum(manifest.records.get(tic, {}).get("status") == "error" for tic in todo)
+        print(f"♻️ Resuming: {len(results) - gave_up} TICs done, {len(todo)} to scan "
+              f"({retried} failed before), {gave_up} given up after {manifest.attempts_cap} attempts")
+
+    def finish(result, fetched=None):
+        if fetched:
+            result["cache_hit"] = fetched["cache_hit"]  # the scan itself always hits after prefetching
+        metrics.merge(result.pop("metrics", None))
+        manifest.record(result)
+        merger.add(result)
+        results.append(result)
+
+    def prefetch_failed(tic_id, error):
+        print(f"❌ Error processing {tic_id}: {error}")
+        metrics.count_error(error, stage="prefetch")
+        metrics.count("tics", status="error")
+        finish(failed_result(tic_id, error))
+
+    prefetcher = None
+    if n_threads > 0 and todo:
+        print(f"📥 Prefetching with {n_threads} download threads, up to {depth} TICs ahead")
+        prefetcher = Prefetcher(todo, lambda tic_id: prefetch_tic(tic_id, stream_sectors), n_threads, depth)
+    source = prefetcher if prefetcher else ((tic_id, None, None) for tic_id in todo)
+
+    if n_workers <= 1:
+        for tic_id, fetched, error in source:
+            if error:
+                prefetch_failed(tic_id, error)
+            else:
+                finish(scan_tic(tic_id, stream_sectors, config), fetched)
+    else:
+        print(f"⚙️ Scanning {len(todo)} TICs with {n_workers} workers...")
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=metrics.mark_worker) as executor:
+            futures = {}
+
+            def collect(done):
+                for future in done:
+                    tic_id, fetched = futures.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        # The worker process itself died (e.g. out of memory)
+                        print(f"❌ Worker failed on {tic_id}: {e}")
+                        result = failed_result(tic_id, e)
+                    finish(result, fetched)
+
+            # At most one TIC per worker is submitted, so unscanned TICs wait
+            # in the bounded prefetch queue rather than piling up here
+            for tic_id, fetched, error in source:
+                if error:
+                    prefetch_failed(tic_id, error)
+                    continue
+                if len(futures) >= n_workers:
+                    collect(wait(futures, return_when=FIRST_COMPLETED).done)
+                futures[executor.submit(scan_tic, tic_id, stream_sectors, config)] = (tic_id, fetched)
+            collect(wait(futures).done)
+    results.sort(key=lambda r: merger.position[r["tic_id"]])
+
+    merger.close()
+    manifest.close()
+    print_summary(results)
+    if prefetcher:
+        prefetcher.print_summary()
+    metrics.print_summary()
+    print(f"⏱️ Total wall time: {timer.perf_counter() - started:.1f}s")
+    print(f"📒 Scan manifest: {manifest_file}")
+
+    # === Merged Dip CSV ===
+    if merger.rows_written:
+        print(f"\n📦 Merged all dip data to: {merged_path}")
+    else:
+        print("\n⚠️ No dips found in any targets. Try lowering the threshold or using different TICs.")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scan TESS light curves for dips.")
+    parser.add_argument("--tics", default=tic_file, help="file with one TIC ID per line")
+    parser.add_argument("--workers", type=int, default=workers, help="process-pool size (1 = sequential)")
+    parser.add_argument("--stream", action="store_true", default=None,
+                        help="scan one sector at a time (bounded memory)")
+    parser.add_argument("--profile", metavar="TIC", help="profile the scan of this one TIC instead of the batch")
+    parser.add_argument("--profile-mode", choices=["cprofile", "sample"], default="cprofile",
+                        help="deterministic cProfile, or a low-overhead stack sampler")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip TICs the scan manifest lists as done, retry failed ones")
+    parser.add_argument("--max-attempts", type=int, default=max_attempts,
+                        help="with --resume, stop retrying a TIC after this many failures")
+    parser.add_argument("--download-threads", type=int, default=download_threads,
+                        help="threads prefetching light curves and TPFs (0 = download inside the scan)")
+    parser.add_argument("--prefetch-depth", type=int, default=prefetch_depth,
+                        help="prefetched TICs allowed to wait for analysis")
+    parser.add_argument("--detrend", choices=["biweight", "median", "none"], default=detrend_method or "none",
+                        help="remove stellar variability before dip detection")
+    parser.add_argument("--detrend-window", type=float, default=detrend_window, help="detrending window in days")
+    parser.add_argument("--method", choices=["matched_filter", "threshold"], default=detect_method,
+                        help="single-event search (matched filter) or the fixed flux threshold")
+    parser.add_argument("--snr", type=float, default=snr_threshold, help="matched-filter SNR cut")
+    args = parser.parse_args()
+    settings = {"detrend": None if args.detrend == "none" else args.detrend, "detrend_window": args.detrend_window,
+                "method": args.method, "snr": args.snr}
+    if args.profile:
+        profile_tic(args.profile, args.profile_mode, args.stream, settings)
+    else:
+        run(args.tics, args.workers, args.stream, args.resume, args.max_attempts,
+            args.download_threads, args.prefetch_depth, settings)
@@ -0,0 +1,67 @@
+# === Artifact I/O Benchmark ===
+# Write/read time and file size for a million-dip table: the old CSV hand-off
+# against the typed Parquet artifacts, including projected and filtered reads.
+
+import os
+import tempfile
+import time as timer
+import numpy as np
+import pandas as pd
+from artifact_io import write_table, read_table, parquet_path
+
+N_DIPS = 1_000_000
+N_TICS = 20_000
+
+
+def synthetic_dips(n=N_DIPS, seed=0):
+    rng = np.random.default_rng(seed)
+    start = rng.integers(0, 100_000, n)
+    start_time = 1325.0 + start * (2.0 / 60 / 24)
+    duration = rng.uniform(0.001, 0.3, n)
+    return pd.DataFrame({
+        "TIC": [f"TIC {t}" for t in rng.integers(1, 10 ** 9, N_TICS)[rng.integers(0, N_TICS, n)]],
+        "start_index": start,
+        "end_index": start + rng.integers(0, 200, n),
+        "start_time": start_time,
+        "end_time": start_time + duration,
+        "depth": rng.uniform(0.005, 0.05, n),
+        "duration": duration,
+        "predicted_label": rng.choice(["noise", "asteroid", "planet"], n),
+    })
+
+
+def timed(fn):
+    t0 = timer.perf_counter()
+    result = fn()
+    return timer.perf_counter() - t0, result
+
+
+def run():
+    df = synthetic_dips()
+    print(f"⏱️ {len(df):,} dips")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "all_dips.csv")
+
+        t_csv_write, _ = timed(lambda: df.to_csv(path, index=False))
+        t_csv_read, _ = timed(lambda: pd.read_csv(path))
+        t_csv_filter, _ = timed(lambda: pd.read_csv(path).query("depth > 0.04")[["TIC", "depth"]])
+        csv_bytes = os.path.getsize(path)
+        os.remove(path)
+
+        t_pq_write, _ = timed(lambda: write_table(df, path, export_csv=False))
+        t_pq_read, typed = timed(lambda: read_table(path))
+        t_pq_filter, _ = timed(lambda: read_table(path, columns=["TIC", "depth"],
+                                                  filters=[("depth", ">", 0.04)]))
+        pq_bytes = os.path.getsize(parquet_path(path))
+
+    print(f"\n{'':<26}{'CSV':>10}{'Parquet':>10}")
+    print(f"{'write (s)':<26}{t_csv_write:>10.2f}{t_pq_write:>10.2f}")
+    print(f"{'full read (s)':<26}{t_csv_read:>10.2f}{t_pq_read:>10.2f}")
+    print(f"{'2 cols, depth>0.04 (s)':<26}{t_csv_filter:>10.2f}{t_pq_filter:>10.2f}")
+    print(f"{'size (MB)':<26}{csv_bytes / 1e6:>10.1f}{pq_bytes / 1e6:>10.1f}")
+    print("\n📐 Parquet dtypes:")
+    print(typed.dtypes.to_string())
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,119 @@
+# === Catalog Store Benchmark ===
+# Full and incremental merges through the SQLite catalog store against a
+# pandas re-merge of everything, on synthetic tables. Every merged table is
+# checked against the pandas merge, and the store/pandas time ratios are
+# printed: stages hand the store whole tables, so each sync still hashes
+# every row, which is why the store is opt-in (EXOASTEROID_CATALOG_STORE=1).
+
+import io
+import os
+import argparse
+import contextlib
+import tempfile
+import warnings
+import time as timer
+import pandas as pd
+import synthetic
+from artifact_io import apply_schema
+from catalog_store import CatalogStore, dip_ids
+from discovery_scoring import score_discoveries
+from merge_and_filter_dip_metadata import merge_dips_metadata
+
+N_TICS = 100_000
+N_NEW = 100  # TICs added by the incremental run
+N_STATUS_CHANGES = 10  # existing TICs whose ExoFOP status changes
+N_QUERY = 100
+
+
+def timed(fn, *args, **kwargs):
+    t0 = timer.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, timer.perf_counter() - t0
+
+
+def tables(n_tics, seed=0):
+    metadata = synthetic.synthetic_tic_metadata(n_tics, seed)
+    predictions = synthetic.synthetic_predictions(synthetic.synthetic_dips(metadata, seed=seed), seed)
+    # A real scan never reports two dips starting at the same cadence; typed
+    # as the merge stage gets them from read_table
+    predictions = predictions.drop_duplicates(["tic_id", "start_index"], ignore_index=True)
+    return apply_schema(metadata), apply_schema(predictions)
+
+
+def pandas_merge(predictions, metadata):
+    merged = apply_schema(pd.merge(predictions, metadata, on="tic_id", how="left"))
+    merged.insert(1, "dip_id", dip_ids(merged))
+    return merged.sort_values(["tic_id", "dip_id"], ignore_index=True)
+
+
+def assert_same(store_merged, reference):
+    pd.testing.assert_frame_equal(store_merged[reference.columns], reference,
+                                  check_dtype=False, check_categorical=False)
+
+
+def run(n_tics=N_TICS, n_new=N_NEW):
+    metadata, predictions = tables(n_tics)
+    print(f"⏱️ {n_tics:,} TICs, {len(predictions):,} dips; then {n_new} new TICs "
+          f"and {N_STATUS_CHANGES} ExoFOP status changes")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CatalogStore(os.path.join(tmp, "catalog.sqlite"))
+        (merged, _, generation), t_first = timed(merge_dips_metadata, predictions, metadata, store)
+        store.mark_consumed(generation)  # as the merge stage does once the artifact is saved
+        reference, t_pandas = timed(pandas_merge, predictions, metadata)
+        assert_same(merged, reference)
+        with contextlib.redirect_stdout(io.StringIO()):  # the view itself, as candidates() reads it
+            (view, _), t_view = timed(store.merged)
+        assert_same(view, reference)
+
+        # Next run: a batch of new TICs, and a few existing ones changed status
+        new_meta, new_dips = tables(n_new, seed=1)
+        new_meta["tic_id"] += metadata["tic_id"].max() + 1000
+        new_dips["tic_id"] += metadata["tic_id"].max() + 1000
+        metadata2 = pd.concat([metadata, new_meta], ignore_index=True)
+        predictions2 = pd.concat([predictions, new_dips], ignore_index=True)
+        changed = metadata["tic_id"].sample(N_STATUS_CHANGES, random_state=2)
+        predictions2.loc[predictions2["tic_id"].isin(changed), "exofop_status"] = synthetic.EXOFOP_STATUSES[2]
+
+        (merged2, _, _), t_second = timed(merge_dips_metadata, predictions2, metadata2, store, merged)
+        reference2, t_pandas2 = timed(pandas_merge, predictions2, metadata2)
+        assert_same(merged2, reference2)
+        # That artifact was never saved, so it is not consumed: the retry re-merges the same TICs
+        with contextlib.redirect_stdout(io.StringIO()):
+            retried, _, generation = merge_dips_metadata(predictions2, metadata2, store, merged)
+        store.mark_consumed(generation)
+        assert_same(retried, reference2)
+        # Nothing changed since: the previous table comes back as is, without warnings
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            unchanged, _ = store.merged(merged2)
+        assert_same(unchanged, reference2)
+
+        # Indexed reads: a few TICs, and the top of the score table
+        scores = score_discoveries(merged2)
+        store.sync_scores(scores, merged2)
+        tics = metadata2["tic_id"].sample(N_QUERY, random_state=3)
+        subset, t_tics = timed(store.candidates, tics=tics)
+        assert set(subset["tic_id"]) <= set(tics) and len(subset) == scores["tic_id"].isin(tics).sum()
+        top, t_top = timed(store.candidates, min_score=70)
+        assert len(top) == (scores["confidence_score"] >= 70).sum()
+        store.close()
+
+    print(f"\n{'':<40}{'s':>9}")
+    for name, seconds in [("store: first sync + merge", t_first), ("pandas: full merge", t_pandas),
+                          ("store: full merged_dips view read", t_view),
+                          (f"store: sync + merge after +{n_new} TICs", t_second),
+                          ("pandas: full re-merge", t_pandas2),
+                          (f"store: {N_QUERY} TICs by index", t_tics),
+                          (f"store: score >= 70 ({len(top):,} rows)", t_top)]:
+        print(f"{name:<40}{seconds:>9.3f}")
+    print(f"\n{'store / pandas, first merge':<40}{t_first / t_pandas:>8.1f}x")
+    print(f"{'store / pandas, incremental merge':<40}{t_second / t_pandas2:>8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the catalog store")
+    parser.add_argument("--tics", type=int, default=N_TICS)
+    parser.add_argument("--new", type=int, default=N_NEW)
+    args = parser.parse_args()
+    run(args.tics, args.new)
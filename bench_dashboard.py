@@ -0,0 +1,90 @@
+# === Dashboard Data Layer Benchmark ===
+# One dashboard interaction on a 10^6-dip merged table: the original chained
+# boolean masks + head(500) + row-wise highlight_status against FilterIndex
+# lookups + one styled page, plus the sky-map point sampling.
+
+import time as timer
+import numpy as np
+import pandas as pd
+from dashboard_data import FilterIndex, page_rows, sample_rows, status_color, MAX_PLOT_POINTS
+
+N_DIPS = 1_000_000
+N_TICS = 50_000
+STATUSES = ["Not Found", "No Planet Found", "Known Planet (TOI)", "Unknown"]
+
+
+def synthetic_merged(n=N_DIPS, seed=11):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "tic_id": rng.integers(1, N_TICS, n),
+        "predicted_label": pd.Categorical(rng.choice(["noise", "asteroid", "planet"], n, p=[0.7, 0.25, 0.05])),
+        "exofop_status": pd.Categorical(rng.choice(STATUSES, n)),
+        "dip_depth": rng.random(n).astype(np.float32) * 0.02,
+        "Tmag": rng.uniform(6, 16, n).astype(np.float32),
+        "object_radius_km": rng.exponential(4000, n).astype(np.float32),
+        "ra": rng.uniform(0, 360, n), "dec": rng.uniform(-90, 90, n),
+    })
+
+
+def highlight_status(row):
+    """Original row-wise styler."""
+    color = ""
+    if "Not Found" in row["exofop_status"]:
+        color = "#ffcccc"
+    elif "No Planet" in row["exofop_status"]:
+        color = "#fff7cc"
+    elif "Known Planet" in row["exofop_status"]:
+        color = "#ccffcc"
+    return [f"background-color: {color}"] * len(row)
+
+
+def original(df, tics, labels, statuses, radius_range):
+    filtered = df[df["tic_id"].isin(tics) & df["predicted_label"].isin(labels) & df["exofop_status"].isin(statuses)]
+    filtered = filtered[filtered["Tmag"] < 12]
+    filtered = filtered[filtered["object_radius_km"].between(*radius_range)]
+    filtered.head(500).style.apply(highlight_status, axis=1).to_html()
+    return filtered
+
+
+def indexed(df, index, labels, statuses, radius_range):
+    rows = index.rows({"predicted_label": labels, "exofop_status": statuses},
+                      {"Tmag": (-np.inf, 12, False), "object_radius_km": radius_range})
+    visible = page_rows(rows, 1, 500)
+    colors = index.colors("exofop_status", visible)
+    df.iloc[visible].style.apply(lambda page: np.repeat(
+        np.where(colors != "", "background-color: " + colors.astype(str), "")[:, None], page.shape[1], axis=1),
+        axis=None).to_html()
+    return rows
+
+
+def timed(fn, *args):
+    t0 = timer.perf_counter()
+    result = fn(*args)
+    return result, timer.perf_counter() - t0
+
+
+def run():
+    df = synthetic_merged()
+    print(f"⏱️ {N_DIPS:,} dips, {N_TICS:,} TICs")
+    index, build = timed(FilterIndex, df, ["tic_id", "predicted_label", "exofop_status"], ["Tmag", "object_radius_km"])
+    print(f"🗂️ Index built once per file change in {build:.2f}s")
+
+    labels, statuses, radius_range = ["asteroid", "planet"], STATUSES[:3], (500, 15000)
+    # The original sidebar selected every TIC by default
+    expected, t_original = timed(original, df, index.options("tic_id"), labels, statuses, radius_range)
+    rows, t_indexed = timed(indexed, df, index, labels, statuses, radius_range)
+    assert np.array_equal(rows, np.flatnonzero(df.index.isin(expected.index))), "filters disagree"
+    assert [status_color(s) for s in expected["exofop_status"].head(500)] == \
+        list(index.colors("exofop_status", rows[:500]))
+
+    sample, t_sample = timed(sample_rows, rows, index.codes["predicted_label"][0][rows])
+    assert len(sample) <= MAX_PLOT_POINTS + 3 * 500 and set(df["predicted_label"].iloc[sample]) == set(labels)
+
+    print(f"\n{'':<36}{'ms':>10}")
+    print(f"{'chained masks + row-wise styling':<36}{t_original * 1000:>10.0f}")
+    print(f"{'FilterIndex + styled page':<36}{t_indexed * 1000:>10.0f}  ({t_original / t_indexed:.0f}x)")
+    print(f"{f'sky sample ({len(rows):,} -> {len(sample):,})':<36}{t_sample * 1000:>10.0f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,119 @@
+# === Rendering Benchmark ===
+# Pixel-dip thumbnails per hour: the original new-pyplot-figure-per-image
+# path against the reused Agg renderers, render_many (which only starts a
+# process pool when spare CPUs and the batch size make it pay) and the
+# LUT->PNG fast path. render_many must write the same images as rendering
+# the same jobs in-process; its slowdown is reported, and only enforced with
+# --strict-timing (wall-clock ratios are noisy on loaded machines).
+
+import argparse
+import os
+import tempfile
+import itertools
+import time as timer
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from render import render_many, render_job, pool_workers, RENDER_WORKERS
+
+N_FRAMES = 400
+FRAME_SHAPE = (11, 11)
+MAX_SLOWDOWN = 1.15  # render_many vs in-process under --strict-timing, allowing for timing noise
+PNG_REPEATS = 5  # the LUT path takes milliseconds: best of several runs
+
+
+def pyplot_frame(path, frame, title):
+    """Original scanner rendering, kept as the reference path."""
+    plt.figure(figsize=(6, 6))
+    plt.imshow(frame, cmap='plasma', origin='lower')
+    plt.colorbar(label='Flux (e⁻/s)')
+    plt.title(title)
+    plt.savefig(path)
+    plt.close()
+
+
+def synthetic_frames(n=N_FRAMES, seed=3):
+    rng = np.random.default_rng(seed)
+    frames = rng.gamma(2.0, 300.0, (n, *FRAME_SHAPE))
+    frames[rng.random(frames.shape) < 0.01] = np.nan
+    return frames
+
+
+def timed(fn, repeat=1):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = timer.perf_counter()
+        fn()
+        best = min(best, timer.perf_counter() - t0)
+    return best
+
+
+def same_images(paths, other_paths):
+    """Both runs wrote byte-identical PNGs, image for image."""
+    for a, b in zip(paths, other_paths, strict=True):
+        with open(a, "rb") as fa, open(b, "rb") as fb:
+            if fa.read() != fb.read():
+                return False
+    return True
+
+
+def run(strict_timing=False):
+    frames = synthetic_frames()
+    print(f"⏱️ Rendering {N_FRAMES} {FRAME_SHAPE[0]}x{FRAME_SHAPE[1]} pixel frames")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        runs = itertools.count()
+
+        def jobs(kind):
+            # Every run writes fresh files: replacing existing ones is slower
+            run_dir = os.path.join(tmp, f"{kind}_{next(runs)}")
+            os.makedirs(run_dir)
+            for i, frame in enumerate(frames):
+                path = os.path.join(run_dir, f"{i}.png")
+                if kind == "png":
+                    yield {"kind": "png", "path": path, "frame": frame}
+                else:
+                    yield {"kind": "frame", "path": path, "frame": frame, "title": f"TIC {i} - Pixel Frame During Dip"}
+
+        outputs = {}
+
+        def rendered(paths, name):
+            assert all(paths) and len(paths) == N_FRAMES
+            outputs[name] = paths
+
+        workers = {kind: pool_workers([{"kind": kind}] * N_FRAMES, RENDER_WORKERS) for kind in ("frame", "png")}
+        results = [
+            ("pyplot figure per image", timed(lambda: [
+                pyplot_frame(os.path.join(tmp, f"plt_{i}.png"), f, f"TIC {i} - Pixel Frame During Dip")
+                for i, f in enumerate(frames)])),
+            ("reused Agg figure", timed(lambda: rendered([render_job(j) for j in jobs("frame")], "reused Agg figure"))),
+            (f"render_many, {workers['frame']} process(es)",
+             timed(lambda: rendered(render_many(jobs("frame"), RENDER_WORKERS), "render_many"))),
+            ("LUT -> PNG", timed(lambda: rendered([render_job(j) for j in jobs("png")], "LUT -> PNG"), PNG_REPEATS)),
+            (f"LUT -> PNG render_many, {workers['png']} proc.",
+             timed(lambda: rendered(render_many(jobs("png"), RENDER_WORKERS), "LUT -> PNG render_many"), PNG_REPEATS)),
+        ]
+
+        for serial, pooled in (("reused Agg figure", "render_many"), ("LUT -> PNG", "LUT -> PNG render_many")):
+            assert same_images(outputs[serial], outputs[pooled]), f"{pooled} images differ from {serial}"
+        print("✅ render_many writes the same images as in-process rendering")
+
+    for (name, serial), (pooled_name, pooled) in ((results[1], results[2]), (results[3], results[4])):
+        print(f"{pooled_name}: {pooled / serial:.2f}x the time of {name}")
+        if strict_timing:
+            assert pooled <= MAX_SLOWDOWN * serial, f"{pooled_name} slower than {name}"
+
+    baseline = results[0][1]
+    print(f"\n{'':<36}{'ms/image':>10}{'images/hour':>14}{'speedup':>10}")
+    for name, seconds in results:
+        per_image = seconds / N_FRAMES
+        print(f"{name:<36}{per_image * 1000:>10.1f}{3600 / per_image:>14,.0f}{baseline / seconds:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pixel-frame rendering")
+    parser.add_argument("--strict-timing", action="store_true",
+                        help=f"fail if render_many takes over {MAX_SLOWDOWN}x the in-process time")
+    args = parser.parse_args()
+    run(args.strict_timing)
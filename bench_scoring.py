@@ -0,0 +1,148 @@
+# === Scoring Benchmark ===
+# Times the rule-table discovery scoring and column-wise radius estimate
+# against the original row-wise df.apply versions on a synthetic merged dip
+# table, and checks both produce the same scores, labels and radii.
+# `--check` runs only the deterministic rule checks, without timing.
+
+import argparse
+import time as timer
+import numpy as np
+import pandas as pd
+from discovery_scoring import score_frame
+from estimate_radius import add_object_radius, R_SUN_KM
+
+N_ROWS = 1_000_000
+N_ROWWISE = 100_000  # the row-wise reference is timed on a slice, then scaled
+
+
+def classify_discovery(row):
+    """Original row-wise scoring, kept as the reference for the legacy rules (no blend penalty)."""
+    score = 0
+    if isinstance(row.get("exofop_status"), str) and "Not Found" in row["exofop_status"]:
+        score += 20
+    if row.get("predicted_label") in ["planet", "asteroid"]:
+        score += 10
+    if row.get("depth", 0) > 0.01:
+        score += 10
+    if 0.05 <= row.get("duration", 0) <= 0.15:
+        score += 10
+    if row.get("Tmag", 99) < 12:
+        score += 10
+    if row.get("periodic") == True:
+        score += 20
+    if row.get("dip_shape", "") == "u_shaped":
+        score += 10
+    if not row.get("near_edge", False):
+        score += 10
+
+    label = "Noise"
+    if score >= 70:
+        label = "Likely Planet"
+    elif score >= 50:
+        label = "Possible Asteroid"
+    elif score >= 30:
+        label = "Interesting Noise"
+    return pd.Series({"confidence_score": score, "discovery_label": label})
+
+
+def rowwise_radius(depth, star_radius_rsun):
+    if pd.isna(depth) or pd.isna(star_radius_rsun) or depth <= 0:
+        return np.nan
+    return R_SUN_KM * star_radius_rsun * np.sqrt(depth)
+
+
+def synthetic_scored_dips(n=N_ROWS, seed=1):
+    rng = np.random.default_rng(seed)
+
+    def with_gaps(values, frac=0.05):
+        values = pd.Series(values)
+        return values.mask(rng.random(n) < frac)
+
+    return pd.DataFrame({
+        "tic_id": rng.integers(1, 10 ** 9, n),
+        "exofop_status": with_gaps(rng.choice(["❌ Not Found", "✅ Known Planet",
+                                               "🟡 Found (No Planet Listed)", "⚠️ Error: timeout"], n)),
+        "predicted_label": rng.choice(["noise", "asteroid", "planet"], n),
+        "depth": with_gaps(rng.uniform(-0.001, 0.03, n)),
+        "duration": with_gaps(rng.uniform(0.0, 0.3, n)),
+        "Tmag": with_gaps(rng.uniform(6, 16, n)),
+        "periodic": with_gaps(rng.random(n) < 0.2).astype(object),
+        "dip_shape": rng.choice(["u_shaped", "v_shaped", "flat"], n),
+        "near_edge": rng.random(n) < 0.1,
+        "star_radius_rsun": with_gaps(rng.uniform(0.1, 3, n)),
+    })
+
+
+def timed(fn):
+    t0 = timer.perf_counter()
+    result = fn()
+    return timer.perf_counter() - t0, result
+
+
+def check_scores(df):
+    expected = df.apply(classify_discovery, axis=1)
+    got = score_frame(df)
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+
+
+def check_blend_penalty():
+    """Hand-scored rows for the blended -20 rule and the clamp at 0."""
+    strong = {"exofop_status": "❌ Not Found", "predicted_label": "planet", "depth": 0.02, "duration": 0.1,
+              "Tmag": 10.0, "periodic": True, "dip_shape": "u_shaped", "near_edge": False}  # 100 points
+    weak = {"exofop_status": "✅ Known Planet", "predicted_label": "noise", "depth": 0.001, "duration": 0.3,
+            "Tmag": 15.0, "periodic": False, "dip_shape": "v_shaped", "near_edge": False}  # 10 points
+    middling = {**weak, "exofop_status": "❌ Not Found", "periodic": True}  # 50 points
+    df = pd.DataFrame([
+        {**strong, "contaminated": False},
+        {**strong, "contaminated": True},
+        {**middling, "contaminated": True},
+        {**weak, "contaminated": True},  # 10 - 20 clamps to 0
+        {**weak, "contaminated": np.nan},  # no position: no penalty
+    ])
+    expected = pd.DataFrame({
+        "confidence_score": [100, 80, 30, 0, 10],
+        "discovery_label": ["Likely Planet", "Likely Planet", "Interesting Noise", "Noise", "Noise"],
+    })
+    pd.testing.assert_frame_equal(score_frame(df), expected, check_dtype=False)
+
+
+def check_rules():
+    df = synthetic_scored_dips(20_000)
+    # Legacy rules, including rows and tables missing optional columns
+    check_scores(df)
+    check_scores(df.iloc[:5_000].drop(columns=["dip_shape", "near_edge", "periodic"]))
+    check_blend_penalty()
+    print("✅ Identical confidence_score / discovery_label; blend penalty and clamp as specified")
+
+
+def run():
+    check_rules()
+    df = synthetic_scored_dips()
+    print(f"⏱️ Scoring {len(df):,} dips (row-wise timed on {N_ROWWISE:,} and scaled)")
+
+    sample = df.iloc[:N_ROWWISE]
+    scale = len(df) / N_ROWWISE
+    t_row_score, _ = timed(lambda: sample.apply(classify_discovery, axis=1))
+    t_vec_score, _ = timed(lambda: score_frame(df))
+
+    radius_df = df.rename(columns={"depth": "dip_depth"})
+    t_row_radius, expected = timed(lambda: sample.apply(
+        lambda row: rowwise_radius(row["depth"], row["star_radius_rsun"]), axis=1))
+    t_vec_radius, got = timed(lambda: add_object_radius(radius_df)["object_radius_km"])
+    pd.testing.assert_series_equal(got.iloc[:N_ROWWISE], expected, check_names=False, check_dtype=False)
+    print("✅ Identical object_radius_km")
+
+    print(f"\n{'':<16}{'row-wise (s)':>14}{'vectorized (s)':>16}{'speedup':>10}")
+    for name, t_row, t_vec in [("scoring", t_row_score * scale, t_vec_score),
+                               ("radius", t_row_radius * scale, t_vec_radius)]:
+        print(f"{name:<16}{t_row:>14.2f}{t_vec:>16.4f}{t_row / t_vec:>9.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark discovery scoring and radius estimates")
+    parser.add_argument("--check", action="store_true", help="only run the rule checks, without timing")
+    args = parser.parse_args()
+    if args.check:
+        check_rules()
+    else:
+        run()
@@ -0,0 +1,80 @@
+# === Single-Event Search Benchmark ===
+# Matched-filter search vs the fixed 0.995 flux threshold on detrended
+# synthetic light curves: completeness per injected depth, spurious events
+# (not overlapping any injection) on quiet, active and noisy stars, and
+# the search cost per target.
+
+import argparse
+import time as timer
+import pandas as pd
+import synthetic
+from dip_detection import find_dips
+from detrending import detrend
+from single_event_search import search_events
+
+N_TARGETS = 10
+THRESHOLD = 0.995
+STARS = {
+    "quiet": {"noise": 0.001},
+    "active": {"noise": 0.001, "variability_amplitude": 0.01},
+    "noisy": {"noise": 0.003},  # single-cadence excursions below 0.995 are common here
+}
+DIP_SPEC = {"n_dips": 8, "dip_depth": (0.002, 0.03), "dip_duration": (0.01, 0.25)}
+DEPTH_BINS = (0.002, 0.005, 0.01, 0.02, 0.03)
+
+
+def methods():
+    return {
+        "threshold": lambda time, flux: find_dips(time, flux, [THRESHOLD]),
+        "matched filter": search_events,
+    }
+
+
+def evaluate(n_targets=N_TARGETS):
+    rows, recovered = [], []
+    for star, spec in STARS.items():
+        lcs = [synthetic.synthetic_lightcurve(seed, **spec, **DIP_SPEC) for seed in range(n_targets)]
+        fluxes = [detrend(lc["time"], lc["flux"], mask_threshold=THRESHOLD) for lc in lcs]
+        for name, search in methods().items():
+            spurious, seconds, parts = 0, 0.0, []
+            for lc, flux in zip(lcs, fluxes):
+                started = timer.perf_counter()
+                events = pd.DataFrame(search(lc["time"], flux))
+                seconds += timer.perf_counter() - started
+                real = synthetic.injection_recovery(events, lc["injections"])["recovered"]
+                spurious += int((~real).sum())
+                parts.append(synthetic.injection_recovery(lc["injections"], events))
+            found = pd.concat(parts, ignore_index=True).assign(star=star, method=name)
+            recovered.append(found)
+            rows.append({"star": star, "method": name, "ms_per_target": seconds / n_targets * 1000,
+                         "spurious": spurious, "completeness": found["recovered"].mean()})
+    return pd.DataFrame(rows), pd.concat(recovered, ignore_index=True)
+
+
+def run(n_targets=N_TARGETS):
+    summary, recovered = evaluate(n_targets)
+    print(f"⏱️ {n_targets} targets per star type, {len(recovered) // 2} injected dips\n")
+    print(summary.to_string(index=False, float_format=lambda x: f"{x:.2f}"))
+
+    by_depth = (recovered.groupby(["method", pd.cut(recovered["depth"], DEPTH_BINS)], observed=False)["recovered"]
+                .mean().unstack(0))
+    print("\n📈 Completeness by injected depth")
+    print(by_depth.to_string(float_format=lambda x: f"{x:.2f}"))
+
+    s = summary.set_index(["star", "method"])
+    for star in STARS:
+        assert s.loc[(star, "matched filter"), "spurious"] <= s.loc[(star, "threshold"), "spurious"], star
+    for star in ("quiet", "active"):
+        assert s.loc[(star, "matched filter"), "completeness"] >= s.loc[(star, "threshold"), "completeness"], star
+    # On noisy stars the threshold fires on outliers everywhere (its completeness
+    # there is overlap by chance); the SNR cut drops them and keeps the deep dips
+    assert s.loc[("noisy", "matched filter"), "spurious"] < 0.01 * s.loc[("noisy", "threshold"), "spurious"]
+    noisy = recovered[(recovered["star"] == "noisy") & (recovered["method"] == "matched filter")]
+    assert noisy[noisy["depth"] >= 0.01]["recovered"].mean() >= 0.95
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the matched-filter single-event search")
+    parser.add_argument("--targets", type=int, default=N_TARGETS)
+    args = parser.parse_args()
+    run(args.targets)
@@ -0,0 +1,103 @@
+# === Sky Index Benchmark ===
+# Build time, batch cone search, k-nearest-neighbour and contamination
+# throughput of the KD-tree sky index over 10^6-10^7 synthetic stars,
+# checked against brute-force great-circle separations.
+
+import argparse
+import time as timer
+import numpy as np
+import pandas as pd
+from discovery_scoring import score_discoveries
+from sky_index import SkyIndex, contamination, field_groups, pixels_to_deg, CONTAMINATION_RADIUS_PIX
+
+N_STARS = 1_000_000
+N_TARGETS = 10_000
+N_CHECKED = 200  # targets verified against brute force
+K_NEAREST = 5
+
+
+def synthetic_catalog(n, seed=5):
+    """Stars uniform on the sphere, with a TESS-like magnitude spread."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "tic_id": np.arange(1, n + 1),
+        "ra": rng.uniform(0, 360, n),
+        "dec": np.degrees(np.arcsin(rng.uniform(-1, 1, n))),
+        "Tmag": rng.uniform(6, 17, n),
+    })
+
+
+def separation_deg(ra1, dec1, ra2, dec2):
+    """Haversine great-circle separation."""
+    ra1, dec1, ra2, dec2 = map(np.radians, (ra1, dec1, ra2, dec2))
+    h = np.sin((dec2 - dec1) / 2) ** 2 + np.cos(dec1) * np.cos(dec2) * np.sin((ra2 - ra1) / 2) ** 2
+    return np.degrees(2 * np.arcsin(np.sqrt(h)))
+
+
+def timed(fn, *args, **kwargs):
+    t0 = timer.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, timer.perf_counter() - t0
+
+
+def check_missing_positions():
+    """TICs without a catalog match reach scoring with NaN ra/dec; they must not break the blend check."""
+    targets = pd.DataFrame({"tic_id": [1, 2, 3], "ra": [10.0, 10.001, np.nan],
+                            "dec": [-5.0, -5.0, np.nan], "Tmag": [10.0, 10.5, 9.0]})
+    flags = contamination(targets).set_index("tic_id")
+    assert flags.loc[[1, 2], "n_neighbors"].tolist() == [1, 1]
+    assert flags.loc[[1, 2], "contaminated"].all()
+    assert flags.loc[3, ["n_neighbors", "contamination_ratio", "nearest_neighbor_arcsec"]].isna().all()
+    assert not flags.loc[3, "contaminated"]
+    assert len(np.unique(field_groups(targets["ra"], targets["dec"]))) == 2
+
+    scored = score_discoveries(targets.assign(depth=0.01, duration=0.2)).set_index("tic_id")
+    assert not scored.loc[3, "contaminated"]
+    print("✅ TICs without positions pass through the blend check unflagged")
+
+
+def run(n_stars=N_STARS, n_targets=N_TARGETS):
+    check_missing_positions()
+    catalog = synthetic_catalog(n_stars)
+    targets = catalog.sample(n_targets, random_state=1)
+    ra, dec = catalog["ra"].to_numpy(), catalog["dec"].to_numpy()
+    t_ra, t_dec = targets["ra"].to_numpy(), targets["dec"].to_numpy()
+    # Wide enough to hold a few stars each at this density
+    radius = max(pixels_to_deg(CONTAMINATION_RADIUS_PIX), np.degrees(np.sqrt(20 * 4 * np.pi / n_stars)))
+    print(f"⏱️ {n_stars:,} stars, {n_targets:,} targets, cone radius {radius * 3600:.0f}\"")
+
+    index, t_build = timed(SkyIndex, ra, dec)
+    cones, t_cone = timed(index.cone_search, t_ra, t_dec, radius)
+    (knn_sep, knn_rows), t_knn = timed(index.nearest, t_ra, t_dec, K_NEAREST)
+    flags, t_flags = timed(contamination, targets, catalog)
+
+    # Brute force on a subset: same members, same neighbours, same counts
+    brute_time = 0.0
+    for i in range(N_CHECKED):
+        sep, dt = timed(separation_deg, t_ra[i], t_dec[i], ra, dec)
+        brute_time += dt
+        assert np.array_equal(np.sort(cones[i]), np.flatnonzero(sep < radius)), f"cone {i} differs"
+        assert np.allclose(np.sort(sep)[:K_NEAREST], knn_sep[i], atol=1e-9), f"kNN {i} differs"
+    brute_per_target = brute_time / N_CHECKED
+    blend_cones = index.cone_count(t_ra, t_dec, pixels_to_deg(CONTAMINATION_RADIUS_PIX))
+    assert np.array_equal(flags["n_neighbors"], blend_cones - 1)  # minus the target itself
+
+    groups, t_groups = timed(field_groups, t_ra, t_dec)
+
+    print(f"\n{'':<34}{'s':>9}{'targets/s':>14}")
+    print(f"{'build index':<34}{t_build:>9.2f}")
+    for name, seconds in [("batch cone search", t_cone), (f"{K_NEAREST}-nearest neighbours", t_knn),
+                          ("contamination flags", t_flags),
+                          ("brute-force cone (extrapolated)", brute_per_target * n_targets)]:
+        print(f"{name:<34}{seconds:>9.2f}{n_targets / seconds:>14,.0f}")
+    print(f"\n🧩 {len(np.unique(groups)):,} fields among the targets ({t_groups:.2f}s); "
+          f"{int(flags['contaminated'].sum()):,} targets with a bright star within "
+          f"{CONTAMINATION_RADIUS_PIX:g} px")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the sky index")
+    parser.add_argument("--stars", type=int, default=N_STARS, help="catalog size, e.g. 10000000")
+    parser.add_argument("--targets", type=int, default=N_TARGETS)
+    args = parser.parse_args()
+    run(args.stars, args.targets)
@@ -0,0 +1,88 @@
+# === Streaming Scan Benchmark ===
+# Peak memory and events of the sector-by-sector scan against detection on
+# the stitched light curve, for a synthetic continuous-viewing-zone target
+# with dips placed across sector boundaries. Dips that straddle a boundary
+# must also get the same features as on the stitched light curve.
+
+import time as timer
+import tracemalloc
+import numpy as np
+from dip_detection import find_dips, concat_dips, StreamingDipDetector
+from dip_features import with_features, extract_features, FEATURE_COLUMNS, NOISE_WINDOW
+
+N_SECTORS = 30
+CADENCES_PER_SECTOR = 200_000  # 20 s cadence is ~100k per sector
+SECTOR_DAYS = 25.0  # observed span of each 27.4-day sector; the rest is the downlink gap
+THRESHOLDS = [0.997, 0.995]
+
+
+def synthetic_sector(k, n=CADENCES_PER_SECTOR):
+    rng = np.random.default_rng(k)
+    time = 1325.0 + 27.4 * k + np.arange(n) * (SECTOR_DAYS / n)
+    flux = 1 + rng.normal(0, 0.001, n)
+    flux[rng.random(n) < 0.001] = np.nan
+    for center in rng.integers(0, n, n // 5000):
+        flux[center:center + rng.integers(3, 60)] -= rng.uniform(0.003, 0.02)
+    # Dips that run off the end of this sector and continue in the next
+    flux[-rng.integers(1, 30):] -= 0.01
+    flux[:rng.integers(1, 30)] -= 0.01
+    return time, flux
+
+
+def sectors():
+    for k in range(N_SECTORS):
+        yield synthetic_sector(k)
+
+
+def stitched_scan():
+    time, flux = map(np.concatenate, zip(*sectors()))
+    return find_dips(time, flux, THRESHOLDS)
+
+
+def streaming_scan():
+    return concat_dips(StreamingDipDetector(THRESHOLDS).scan(sectors()), THRESHOLDS)
+
+
+def check_boundary_features():
+    """Features of dips that straddle a sector boundary match the stitched scan's."""
+    time, flux = map(np.concatenate, zip(*sectors()))
+    expected = with_features(time, flux, find_dips(time, flux, THRESHOLDS))
+    detector = StreamingDipDetector(THRESHOLDS, extract=extract_features, context=NOISE_WINDOW)
+    got = concat_dips(detector.scan(sectors()), THRESHOLDS)
+
+    boundaries = np.arange(1, N_SECTORS) * CADENCES_PER_SECTOR
+    slot = np.searchsorted(boundaries, expected["start_index"], side="right")
+    straddles = (slot < len(boundaries)) & (expected["end_index"] >= boundaries[np.minimum(slot, len(boundaries) - 1)])
+    assert straddles.any()
+    for key in ["start_index", "end_index"] + FEATURE_COLUMNS:
+        np.testing.assert_array_equal(got[key][straddles], expected[key][straddles], err_msg=key)
+    print(f"✅ Identical features for {int(straddles.sum())} boundary-straddling dips")
+
+
+def measured(fn):
+    tracemalloc.start()
+    t0 = timer.perf_counter()
+    result = fn()
+    seconds = timer.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak, result
+
+
+def run():
+    print(f"⏱️ {N_SECTORS} sectors x {CADENCES_PER_SECTOR:,} cadences, thresholds {THRESHOLDS}")
+    t_stitch, peak_stitch, expected = measured(stitched_scan)
+    t_stream, peak_stream, got = measured(streaming_scan)
+
+    for key in expected:
+        np.testing.assert_array_equal(got[key], expected[key], err_msg=key)
+    print(f"✅ Identical events: {len(expected['start_index'])} dips")
+    check_boundary_features()
+
+    print(f"\n{'':<12}{'time (s)':>10}{'peak MB':>10}")
+    print(f"{'stitched':<12}{t_stitch:>10.2f}{peak_stitch / 1e6:>10.0f}")
+    print(f"{'streaming':<12}{t_stream:>10.2f}{peak_stream / 1e6:>10.0f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,214 @@
+# === Pipeline Benchmark Suite ===
+# Time and peak memory of every compute stage on synthetic data, from 10^3 to
+# 10^6 targets, plus injection-recovery completeness so a faster stage can
+# never silently lose dips or periods.
+#
+# The scanner's default path (gap-aware detrending, then the matched-filter
+# search) is checked on active stars, with and without first-pass masking.
+#
+# Light-curve stages (detrending, search, detection, features, periodicity)
+# cost the same per target, so they run on a sample of synthetic light curves
+# and are scaled up; table stages (labeling, merging, scoring, radius) run at full size.
+# Peak memory is measured with tracemalloc, which also slows the timed code
+# down a little.
+
+import io
+import json
+import argparse
+import contextlib
+import tracemalloc
+import time as timer
+import numpy as np
+import pandas as pd
+import synthetic
+from dip_detection import find_dips, concat_dips, StreamingDipDetector
+from dip_features import extract_features
+from periodicity_detector import analyze_lightcurve
+from detrending import detrend
+from single_event_search import search_events
+from auto_label_dips import label_dips
+from merge_and_filter_dip_metadata import merge_dips_metadata
+from discovery_scoring import score_discoveries
+from merge_metadata import merge_scores_metadata
+from estimate_radius import add_object_radius
+from bench_dip_detection import loop_dips
+
+SCALES = [1_000, 10_000, 100_000]  # add 1_000_000 with --scales
+LC_TARGETS = 50  # light curves actually generated for the per-target stages
+PERIODICITY_TARGETS = 3  # LS + BLS take seconds per target
+DIP_THRESHOLD = 0.995
+DIPS_PER_TARGET = 3
+ACTIVE_VARIABILITY = 0.01  # stellar variability amplitude of the detrend + search targets
+
+# Recovery floors: the suite fails if a change drops below them
+MIN_DIP_COMPLETENESS = 0.95  # injected dips deeper than DEEP_DIP
+DEEP_DIP = 0.01
+MIN_PERIOD_RECOVERY = 2 / 3  # BLS period within PERIOD_TOLERANCE of the injected one
+PERIOD_TOLERANCE = 0.01
+
+
+def measured(fn, *args, **kwargs):
+    """(result, seconds, peak bytes)."""
+    tracemalloc.start()
+    t0 = timer.perf_counter()
+    result = fn(*args, **kwargs)
+    seconds = timer.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def lightcurves(n, seed=0, **overrides):
+    spec = {"n_dips": 5, "variability_amplitude": 0.0003, **overrides}
+    return [synthetic.synthetic_lightcurve(seed + i, **spec) for i in range(n)]
+
+
+def lightcurve_stages(n_lc=LC_TARGETS):
+    """Per-target seconds and peak bytes of detection, features and periodicity."""
+    lcs = lightcurves(n_lc)
+    detected, t_detect, m_detect = measured(
+        lambda: [find_dips(lc["time"], lc["flux"], [DIP_THRESHOLD]) for lc in lcs])
+    _, t_features, m_features = measured(
+        lambda: [extract_features(lc["time"], lc["flux"], d) for lc, d in zip(lcs, detected)])
+
+    transits = lightcurves(PERIODICITY_TARGETS, seed=1000, n_dips=0,
+                           transit={"period": 3.3, "duration": 0.1, "depth": 0.004})
+    periods, t_period, m_period = measured(
+        lambda: [analyze_lightcurve(lc["time"][np.isfinite(lc["flux"])], lc["flux"][np.isfinite(lc["flux"])])
+                 for lc in transits])
+    return {
+        "detection": (t_detect / n_lc, m_detect),
+        "features": (t_features / n_lc, m_features),
+        "periodicity": (t_period / PERIODICITY_TARGETS, m_period),
+    }, lcs, detected, transits, periods
+
+
+def search_stages(n_lc=LC_TARGETS):
+    """
+    Detrending and matched-filter search on active stars: per-target seconds
+    and peak bytes, and (spurious events, recovered injections) with and
+    without first-pass dip masking.
+    """
+    lcs = lightcurves(n_lc, seed=2000, variability_amplitude=ACTIVE_VARIABILITY)
+    plain = [detrend(lc["time"], lc["flux"]) for lc in lcs]
+    masked, t_detrend, m_detrend = measured(
+        lambda: [detrend(lc["time"], lc["flux"], mask_threshold=DIP_THRESHOLD) for lc in lcs])
+    events, t_search, m_search = measured(
+        lambda: [search_events(lc["time"], flux) for lc, flux in zip(lcs, masked)])
+
+    quality = {}
+    for name, found in (("unmasked", [search_events(lc["time"], flux) for lc, flux in zip(lcs, plain)]),
+                        ("masked", events)):
+        spurious = sum(int((~synthetic.injection_recovery(pd.DataFrame(e), lc["injections"])["recovered"]).sum())
+                       for lc, e in zip(lcs, found))
+        recovered = pd.concat([synthetic.injection_recovery(lc["injections"], e) for lc, e in zip(lcs, found)],
+                              ignore_index=True)
+        quality[name] = (spurious, recovered)
+    return {
+        "detrending": (t_detrend / n_lc, m_detrend),
+        "search": (t_search / n_lc, m_search),
+    }, quality
+
+
+def table_stages(n_targets):
+    """Seconds, peak bytes and rows of the table stages on n_targets synthetic TICs."""
+    metadata = synthetic.synthetic_tic_metadata(n_targets)
+    dips = synthetic.synthetic_dips(metadata, DIPS_PER_TARGET)
+    predictions = synthetic.synthetic_predictions(dips)
+    periodic = synthetic.synthetic_periodicity(metadata)
+
+    n_rows = len(dips)
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()):  # the stages' own progress prints
+        _, *results["labeling"] = measured(label_dips, dips)
+        del dips
+        (merged, _, _), *results["merging"] = measured(merge_dips_metadata, predictions, metadata)
+        del predictions
+        scores, *results["scoring"] = measured(score_discoveries, merged, periodic)
+        del merged
+        scores = scores.drop(columns=[c for c in metadata.columns if c != "tic_id"])
+        _, *results["radius"] = measured(lambda: add_object_radius(merge_scores_metadata(scores, metadata)))
+    return {stage: (seconds, peak, n_rows) for stage, (seconds, peak) in results.items()}
+
+
+def dip_recovery(lcs, detected):
+    """Completeness per injected depth, and the same check against the reference loop."""
+    recovered = pd.concat([synthetic.injection_recovery(lc["injections"], d) for lc, d in zip(lcs, detected)],
+                          ignore_index=True)
+    reference = pd.concat([
+        synthetic.injection_recovery(lc["injections"], pd.DataFrame(loop_dips(0, lc["time"], lc["flux"], DIP_THRESHOLD),
+                                                                    columns=["start_time", "end_time"]))
+        for lc in lcs], ignore_index=True)
+    assert recovered["recovered"].equals(reference["recovered"]), "vectorized detection lost injections"
+
+    streamed = []
+    for lc in lcs:
+        chunks = np.array_split(np.arange(len(lc["time"])), 4)
+        detector = StreamingDipDetector([DIP_THRESHOLD])
+        parts = [detector.feed(lc["time"][c], lc["flux"][c]) for c in chunks]
+        streamed.append(synthetic.injection_recovery(lc["injections"], concat_dips(parts, [DIP_THRESHOLD])))
+    assert pd.concat(streamed, ignore_index=True)["recovered"].equals(recovered["recovered"]), \
+        "streaming detection lost injections"
+    return recovered
+
+
+def period_recovery(transits, periods):
+    found = [abs(r["bls_period"] - lc["injections"]["period"].iloc[0]) / lc["injections"]["period"].iloc[0]
+             < PERIOD_TOLERANCE for lc, r in zip(transits, periods)]
+    return float(np.mean(found))
+
+
+def run(scales=SCALES, output=None):
+    print(f"⏱️ Light-curve stages on {LC_TARGETS} synthetic targets "
+          f"({len(synthetic.sector_times()):,} cadences each)")
+    per_target, lcs, detected, transits, periods = lightcurve_stages()
+    search_timing, search_quality = search_stages()
+    per_target = {**search_timing, **per_target}
+
+    recovered = dip_recovery(lcs, detected)
+    deep = recovered[recovered["depth"] >= DEEP_DIP]["recovered"].mean()
+    period_rate = period_recovery(transits, periods)
+    print("\n🎯 Dip injection-recovery (threshold "
+          f"{DIP_THRESHOLD}, noise {synthetic.LIGHTCURVE_DEFAULTS['noise']}):")
+    print(synthetic.completeness(recovered).to_string(float_format=lambda v: f"{v:.2f}"))
+    print(f"🎯 BLS period recovery: {period_rate:.0%} of {PERIODICITY_TARGETS} transiting targets")
+    assert deep >= MIN_DIP_COMPLETENESS, f"completeness for depth >= {DEEP_DIP} fell to {deep:.2f}"
+    assert period_rate >= MIN_PERIOD_RECOVERY, f"period recovery fell to {period_rate:.0%}"
+
+    (spurious, searched), (spurious_plain, _) = search_quality["masked"], search_quality["unmasked"]
+    deep_searched = searched[searched["depth"] >= DEEP_DIP]["recovered"].mean()
+    print(f"\n🎯 Detrend + matched-filter search on active stars (variability {ACTIVE_VARIABILITY:.0%}):")
+    print(synthetic.completeness(searched).to_string(float_format=lambda v: f"{v:.2f}"))
+    print(f"🎯 Spurious events: {spurious} with first-pass dips masked, {spurious_plain} without")
+    assert deep_searched >= MIN_DIP_COMPLETENESS, \
+        f"detrend + search completeness for depth >= {DEEP_DIP} fell to {deep_searched:.2f}"
+    assert spurious <= spurious_plain, "masking first-pass dips inflated spurious detections"
+
+    report = {"completeness_deep": float(deep), "period_recovery": period_rate,
+              "search_completeness_deep": float(deep_searched), "search_spurious": spurious, "scales": {}}
+    print(f"\n{'stage':<14}{'targets':>10}{'rows':>11}{'seconds':>12}{'peak MB':>10}{'rows/s':>13}")
+    for n in scales:
+        rows = {}
+        for stage, (seconds, peak) in per_target.items():
+            # Scaled from the per-target cost; peak memory is per batch, not per scale
+            rows[stage] = (seconds * n, peak, n)
+        rows.update(table_stages(n))
+        for stage, (seconds, peak, n_rows) in rows.items():
+            scaled = "*" if stage in per_target else " "
+            print(f"{stage:<14}{n:>10,}{n_rows:>11,}{seconds:>11.2f}{scaled}{peak / 1e6:>10.1f}"
+                  f"{n_rows / seconds if seconds else 0:>13,.0f}")
+        report["scales"][n] = {stage: {"seconds": s, "peak_bytes": p, "rows": r} for stage, (s, p, r) in rows.items()}
+    print("* extrapolated from the per-target cost; rows are light curves")
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results saved to: {output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time, memory and recovery benchmarks for every stage")
+    parser.add_argument("--scales", type=int, nargs="+", default=SCALES, help="target counts, e.g. 1000 1000000")
+    parser.add_argument("--output", help="write results as JSON, to compare runs")
+    args = parser.parse_args()
+    run(args.scales, args.output)
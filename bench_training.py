@@ -0,0 +1,81 @@
+# === Classifier Training Benchmark ===
+# Fit time, model size, predict throughput and macro F1 of the original
+# single-threaded, uncapped RandomForest against the capped parallel forest
+# and histogram gradient boosting, on synthetic labeled dips.
+
+import time as timer
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import f1_score
+from sklearn.model_selection import train_test_split
+from train_dip_classifier import build_model, training_data, model_bytes, predict_throughput, \
+    update_classifier, RANDOM_STATE, TEST_SIZE, UPDATE_TREES
+
+N_ROWS = 100_000
+UPDATE_ROWS = 20_000
+
+
+def synthetic_labels(n=N_ROWS, seed=7):
+    """Labeled dips whose depth/duration/snr overlap between classes."""
+    rng = np.random.default_rng(seed)
+    label = rng.choice(["asteroid", "planet", "noise"], n, p=[0.3, 0.2, 0.5])
+    depth = np.select([label == "planet", label == "asteroid"], [0.01, 0.004], 0.002) * rng.lognormal(0, 0.6, n)
+    duration = np.select([label == "planet", label == "asteroid"], [0.1, 0.03], 0.005) * rng.lognormal(0, 0.6, n)
+    noise = 0.001 * rng.lognormal(0, 0.3, n)
+    n_points = (duration * 720).astype(int) + 1
+    return pd.DataFrame({
+        "TIC": rng.integers(1, 10**9, n), "depth": depth, "duration": duration, "label": label,
+        "n_points": n_points, "snr": depth / noise * np.sqrt(n_points), "symmetry": rng.random(n),
+        "ingress_slope": -depth / duration, "egress_slope": depth / duration,
+        "edge_distance": rng.exponential(3.0, n), "near_edge": rng.random(n) < 0.1,
+    })
+
+
+def measure(name, model, X_train, y_train, X_test, y_test):
+    started = timer.perf_counter()
+    model.fit(X_train, y_train)
+    fit = timer.perf_counter() - started
+    f1 = f1_score(y_test, model.predict(X_test), average="macro")
+    return name, fit, model_bytes(model), predict_throughput(model, X_test), f1
+
+
+def run():
+    X, y = training_data(synthetic_labels())
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+    print(f"⏱️ Training on {len(X_train):,} synthetic dips, {X.shape[1]} features")
+
+    results = [
+        measure("original forest (1 core)", RandomForestClassifier(n_estimators=100, random_state=RANDOM_STATE),
+                X_train, y_train, X_test, y_test),
+        measure("capped forest (all cores)", build_model("forest"), X_train, y_train, X_test, y_test),
+        measure("hist gradient boosting", build_model("hgb"), X_train, y_train, X_test, y_test),
+    ]
+
+    print(f"\n{'':<28}{'fit s':>8}{'MB':>9}{'rows/s':>12}{'F1':>7}")
+    for name, fit, size, throughput, f1 in results:
+        print(f"{name:<28}{fit:>8.1f}{size / 1e6:>9.1f}{throughput:>12,.0f}{f1:>7.3f}")
+
+    # The compact models must not give up accuracy for their size
+    original_f1 = results[0][4]
+    assert all(f1 >= original_f1 - 0.01 for *_, f1 in results[1:]), "capped model lost accuracy"
+
+    # Warm start with a new batch vs refitting everything
+    new = synthetic_labels(UPDATE_ROWS, seed=8)
+    model = build_model("forest").fit(X_train, y_train)
+    started = timer.perf_counter()
+    update_classifier(model, new)
+    print(f"\n🔁 Warm-start update with {UPDATE_ROWS:,} dips: {timer.perf_counter() - started:.1f}s "
+          f"(full refit: {results[1][1]:.1f}s)")
+
+    # Capped at the pre-update size, the update must drop old trees, never the new batch's
+    old_trees = {id(tree) for tree in model.estimators_}
+    cap_mb = model_bytes(model) / 1024 / 1024
+    model = update_classifier(model, synthetic_labels(UPDATE_ROWS, seed=9), max_mb=cap_mb)
+    kept_new = sum(id(tree) not in old_trees for tree in model.estimators_)
+    print(f"✂️ Capped update kept {kept_new} of {UPDATE_TREES} new trees, {len(model.estimators_)} in total")
+    assert kept_new == UPDATE_TREES, "size cap dropped trees fitted on the new batch"
+
+
+if __name__ == "__main__":
+    run()
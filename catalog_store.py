@@ -0,0 +1,390 @@
+# === Catalog Store ===
+# Embedded SQLite database of stars, dips, predictions, ExoFOP statuses and
+# scores, keyed by integer TIC and dip ID.
+#
+# Stages upsert their table and only rows whose contents changed are
+# written: every row carries a hash of its values, so re-syncing a table of
+# 10^6 dips that gained 300 costs one vectorized hash compare and 300
+# writes. The sorted keys and hashes of each table are also kept as packed
+# int64 arrays (row_index), so the compare never reads the table back. Each
+# write logs the TICs it touched under a new generation, which lets merged()
+# rebuild only those TICs' rows of the merged dip table (an indexed query on
+# the merged_dips view) and splice them into the previous result. Every
+# column lives in exactly one table, so the views never produce _x/_y
+# suffixes.
+#
+# Stages hand over whole tables, so every sync still hashes every row: at
+# 10^5 TICs an incremental sync + merge is slower than the pandas merge it
+# would replace. The merge and score stages therefore only use the store
+# when EXOASTEROID_CATALOG_STORE=1 (for its indexed candidate queries).
+
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+from artifact_io import apply_schema
+
+CATALOG_FILE = "exoasteroid_output/catalog.sqlite"
+USE_CATALOG_STORE = os.environ.get("EXOASTEROID_CATALOG_STORE", "0") == "1"
+CONSUMER = "merge"  # name under which merged() remembers the generation it has seen
+
+# table -> primary key; every table also has tic_id and row_hash
+TABLES = {
+    "stars": "tic_id",
+    "exofop_status": "tic_id",
+    "dips": "dip_id",
+    "predictions": "dip_id",
+    "scores": "dip_id",
+}
+DIP_KEY = ["tic_id", "threshold", "start_index"]  # identifies a dip across runs
+PREDICTION_COLUMNS = ["predicted_label", "model_version"]
+STATUS_COLUMNS = ["exofop_status"]
+INDEXED_COLUMNS = {"scores": ["confidence_score"]}  # besides the keys and tic_id
+
+# sqlite3 only binds plain Python scalars
+for _type in (np.int64, np.int32, np.int16, np.int8, np.uint32, np.uint16, np.uint8):
+    sqlite3.register_adapter(_type, int)
+for _type in (np.float64, np.float32):
+    sqlite3.register_adapter(_type, float)
+sqlite3.register_adapter(np.bool_, bool)
+
+
+def dip_ids(df):
+    """Stable int64 ID per dip from (tic_id, threshold, start_index)."""
+    key = pd.DataFrame({
+        "tic_id": df["tic_id"].to_numpy(dtype=np.int64),
+        "threshold": df["threshold"].to_numpy(dtype=float) if "threshold" in df.columns else np.zeros(len(df)),
+        "start_index": df["start_index"].to_numpy(dtype=np.int64),
+    })
+    return pd.util.hash_pandas_object(key, index=False).to_numpy().view(np.int64)
+
+
+def row_hashes(df):
+    return pd.util.hash_pandas_object(df, index=False, categorize=False).to_numpy().view(np.int64)
+
+
+def _sql_rows(df):
+    """Rows as tuples of plain Python values (missing -> None), built column by column."""
+    columns = []
+    for col in df.columns:
+        values = df[col]
+        if values.isna().any():
+            values = values.astype(object).where(values.notna(), None)
+        columns.append(values.tolist())
+    return zip(*columns)
+
+
+def _sql_type(dtype):
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    return "TEXT"
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _restore(df, dtypes):
+    """Cast columns read from SQLite back to the dtypes they were stored from."""
+    for col in df.columns:
+        dtype = dtypes.get(col)
+        if dtype is None:
+            continue
+        missing = df[col].isna().any()
+        if dtype in ("bool", "boolean"):
+            df[col] = df[col].astype("boolean" if missing else bool)
+        elif dtype.lower().startswith(("int", "uint")):
+            df[col] = df[col].astype("Int64" if missing else np.int64)
+        elif dtype == "float32":
+            df[col] = df[col].astype(np.float32)
+        elif dtype == "category":
+            df[col] = df[col].astype("category")
+    return df
+
+
+def _splice(previous, fresh, dirty):
+    """
+    `previous` without the `dirty` TICs' rows, with `fresh` (their rows now)
+    inserted in (tic_id, dip_id) order. Both are sorted already, and no TIC
+    is in both, so each fresh row goes in by binary search on tic_id instead
+    of re-sorting the whole table.
+    """
+    if not len(dirty):
+        return previous
+    kept = previous[~previous["tic_id"].isin(dirty)]
+    tics = kept["tic_id"].to_numpy()
+    if not len(fresh) or not (np.diff(tics) >= 0).all():
+        result = pd.concat([kept, fresh], ignore_index=True) if len(fresh) else kept.reset_index(drop=True)
+        return apply_schema(result.sort_values(["tic_id", "dip_id"], kind="stable", ignore_index=True))
+
+    # Categories of both halves are unioned first, or concat falls back to object
+    for col in previous.columns:
+        if isinstance(previous[col].dtype, pd.CategoricalDtype):
+            categories = kept[col].cat.categories.union(fresh[col].cat.categories)
+            kept = kept.assign(**{col: kept[col].cat.set_categories(categories)})
+            fresh = fresh.assign(**{col: fresh[col].cat.set_categories(categories)})
+    at = np.searchsorted(tics, fresh["tic_id"].to_numpy()) + np.arange(len(fresh))
+    is_fresh = np.zeros(len(kept) + len(fresh), dtype=bool)
+    is_fresh[at] = True
+    order = np.empty(len(is_fresh), dtype=np.int64)
+    order[is_fresh] = len(kept) + np.arange(len(fresh))
+    order[~is_fresh] = np.arange(len(kept))
+    return pd.concat([kept, fresh], ignore_index=True).take(order).reset_index(drop=True)
+
+
+class CatalogStore:
+    def __init__(self, path=CATALOG_FILE):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS store_columns ("
+                              "table_name TEXT NOT NULL, column_name TEXT NOT NULL, dtype TEXT NOT NULL, "
+                              "position INTEGER NOT NULL, PRIMARY KEY (table_name, column_name))")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS changes ("
+                              "generation INTEGER NOT NULL, tic_id INTEGER NOT NULL)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS changes_generation ON changes (generation)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS consumers ("
+                              "name TEXT PRIMARY KEY, generation INTEGER NOT NULL)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS row_index (table_name TEXT PRIMARY KEY, "
+                              "keys BLOB NOT NULL, tic_ids BLOB NOT NULL, hashes BLOB NOT NULL)")
+            for table, key in TABLES.items():
+                extra = "" if key == "tic_id" else ", tic_id INTEGER NOT NULL"
+                self.conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ("
+                                  f"{key} INTEGER PRIMARY KEY{extra}, row_hash INTEGER NOT NULL)")
+                if key != "tic_id":
+                    self.conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_tic ON {table} (tic_id)")
+        self._create_views()
+
+    def close(self):
+        self.conn.close()
+
+    # === Schema ===
+
+    def columns(self, table):
+        """{column: pandas dtype} of a table's value columns, in storage order."""
+        rows = self.conn.execute("SELECT column_name, dtype FROM store_columns WHERE table_name = ? "
+                                 "ORDER BY position", (table,))
+        return dict(rows.fetchall())
+
+    def _add_columns(self, table, df):
+        known = self.columns(table)
+        new = [col for col in df.columns if col not in known and col not in ("tic_id", TABLES[table])]
+        for i, col in enumerate(new):
+            self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {_quote(col)} {_sql_type(df[col].dtype)}")
+            self.conn.execute("INSERT INTO store_columns VALUES (?, ?, ?, ?)",
+                              (table, col, str(df[col].dtype), len(known) + i))
+            if col in INDEXED_COLUMNS.get(table, ()):
+                self.conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_{col} ON {table} ({_quote(col)})")
+        if new:
+            self._create_views()
+
+    def _create_views(self):
+        # The merged dip table (what merge_dips_metadata returns), and the
+        # same with scores for the dashboard and cards
+        tables = {table: self.columns(table) for table in TABLES}
+        merged = (["d.tic_id AS tic_id", "d.dip_id AS dip_id"]
+                  + [f"d.{_quote(c)}" for c in tables["dips"]]
+                  + [f"p.{_quote(c)}" for c in tables["predictions"]]
+                  + [f"e.{_quote(c)}" for c in tables["exofop_status"]]
+                  + [f"s.{_quote(c)}" for c in tables["stars"]])
+        scored = ["m.*"] + [f"c.{_quote(col)}" for col in tables["scores"]]
+        self.conn.execute("DROP VIEW IF EXISTS candidates")
+        self.conn.execute("DROP VIEW IF EXISTS merged_dips")
+        self.conn.execute(f"CREATE VIEW merged_dips AS SELECT {', '.join(merged)} FROM dips d "
+                          "JOIN predictions p USING (dip_id) "
+                          "LEFT JOIN exofop_status e ON e.tic_id = d.tic_id "
+                          "LEFT JOIN stars s ON s.tic_id = d.tic_id")
+        self.conn.execute(f"CREATE VIEW candidates AS SELECT {', '.join(scored)} FROM merged_dips m "
+                          "LEFT JOIN scores c USING (dip_id)")
+
+    # === Writes ===
+
+    def generation(self):
+        return self.conn.execute("SELECT COALESCE(MAX(generation), 0) FROM changes").fetchone()[0]
+
+    def _row_index(self, table):
+        """(keys, tic_ids, row hashes) of a table's stored rows, sorted by key."""
+        row = self.conn.execute("SELECT keys, tic_ids, hashes FROM row_index WHERE table_name = ?",
+                                (table,)).fetchone()
+        if row is not None:
+            return tuple(np.frombuffer(blob, dtype=np.int64) for blob in row)
+        # Stores written before the index existed: read the table back once
+        key = TABLES[table]
+        stored = pd.read_sql(f"SELECT {', '.join(dict.fromkeys([key, 'tic_id']))}, row_hash FROM {table} "
+                             f"ORDER BY {key}", self.conn)
+        return tuple(stored[col].to_numpy(dtype=np.int64) for col in (key, "tic_id", "row_hash"))
+
+    def _save_row_index(self, table, keys, tic_ids, hashes):
+        """Store a table's (keys, tic_ids, row hashes), already sorted by key."""
+        blobs = [np.ascontiguousarray(a, dtype=np.int64).tobytes() for a in (keys, tic_ids, hashes)]
+        self.conn.execute("INSERT OR REPLACE INTO row_index VALUES (?, ?, ?, ?)", (table, *blobs))
+
+    def upsert(self, table, df, replace=True):
+        """
+        Write the rows of `df` (key, tic_id and value columns) that are new or
+        changed. With replace=True the frame is the whole table: stored rows
+        missing from it are deleted. Returns counts of what happened.
+        """
+        key = TABLES[table]
+        if not df[key].is_unique:
+            df = df.drop_duplicates(key, keep="last")
+        df = df.reset_index(drop=True)
+        with self.conn:
+            self._add_columns(table, df)
+            columns = [key] + ([] if key == "tic_id" else ["tic_id"]) + list(self.columns(table))
+            df = df.reindex(columns=columns)
+            # Compared in key order: sorted lookups are cache-friendly and the
+            # sorted arrays are the new row index as they are
+            incoming = df[key].to_numpy(dtype=np.int64)
+            order = np.argsort(incoming)  # keys are unique after drop_duplicates
+            incoming = incoming[order]
+            tic_ids = df["tic_id"].to_numpy(dtype=np.int64)[order]
+            hashes = row_hashes(df[columns[1:]])[order]
+
+            stored_keys, stored_tics, stored_hashes = self._row_index(table)
+            position = np.minimum(np.searchsorted(stored_keys, incoming), max(len(stored_keys) - 1, 0))
+            known = (stored_keys[position] == incoming) if len(stored_keys) else np.zeros(len(df), dtype=bool)
+            changed = ~known
+            changed[known] = stored_hashes[position[known]] != hashes[known]
+            inserted = int((~known).sum())
+
+            rows = df.iloc[order[changed]].assign(row_hash=hashes[changed])
+            names = ", ".join(_quote(c) for c in rows.columns)
+            # Loading an empty table: building its secondary indexes once
+            # afterwards beats updating them row by row in random tic_id order
+            indexes = [] if len(stored_keys) else self.conn.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+                (table,)).fetchall()
+            for name, _ in indexes:
+                self.conn.execute(f"DROP INDEX {_quote(name)}")
+            placeholders = ", ".join("?" * len(rows.columns))
+            self.conn.executemany(f"INSERT OR REPLACE INTO {table} ({names}) VALUES ({placeholders})",
+                                  _sql_rows(rows))
+            for _, sql in indexes:
+                self.conn.execute(sql)
+
+            touched = set(tic_ids[changed].tolist())
+            deleted = 0
+            if replace:
+                gone = np.ones(len(stored_keys), dtype=bool)
+                gone[position[known]] = False
+                deleted = int(gone.sum())
+                self.conn.executemany(f"DELETE FROM {table} WHERE {key} = ?",
+                                      ((k,) for k in stored_keys[gone].tolist()))
+                touched.update(stored_tics[gone].tolist())
+                if changed.any() or deleted:
+                    self._save_row_index(table, incoming, tic_ids, hashes)
+            elif changed.any():
+                kept = np.ones(len(stored_keys), dtype=bool)
+                kept[position[known & changed]] = False
+                merged = [np.concatenate([old[kept], new[changed]]) for old, new in
+                          ((stored_keys, incoming), (stored_tics, tic_ids), (stored_hashes, hashes))]
+                resort = np.argsort(merged[0])
+                self._save_row_index(table, *(a[resort] for a in merged))
+            if touched:
+                generation = self.generation() + 1
+                self.conn.executemany("INSERT INTO changes VALUES (?, ?)", ((generation, t) for t in touched))
+        counts = {"inserted": inserted, "updated": int(changed.sum()) - inserted, "deleted": deleted,
+                  "unchanged": len(df) - int(changed.sum())}
+        print(f"🗄️ {table}: {counts['inserted']} new, {counts['updated']} changed, "
+              f"{counts['deleted']} removed, {counts['unchanged']} unchanged")
+        return counts
+
+    def sync_dips(self, df):
+        """Upsert a predicted dip table (with exofop_status) into dips, predictions and exofop_status."""
+        df = apply_schema(df)
+        df["dip_id"] = dip_ids(df)
+        predictions = [c for c in PREDICTION_COLUMNS if c in df.columns]
+        statuses = [c for c in STATUS_COLUMNS if c in df.columns]
+        self.upsert("dips", df.drop(columns=predictions + statuses))
+        self.upsert("predictions", df[["dip_id", "tic_id"] + predictions])
+        if statuses:
+            self.upsert("exofop_status", df[["tic_id"] + statuses].drop_duplicates("tic_id"))
+        return df["dip_id"]
+
+    def sync_stars(self, metadata):
+        self.upsert("stars", apply_schema(metadata))
+
+    def sync_scores(self, scored, merged):
+        """Upsert what scoring added to the merged table (scores, flags, periodicity)."""
+        if "dip_id" not in scored.columns:
+            return None  # merged before the store existed; the next merge adds dip IDs
+        added = [c for c in scored.columns if c not in merged.columns]
+        return self.upsert("scores", apply_schema(scored[["dip_id", "tic_id"] + added]))
+
+    # === Reads ===
+
+    def _dtypes(self):
+        dtypes = {"tic_id": "int64", "dip_id": "int64"}
+        for table in TABLES:
+            dtypes.update(self.columns(table))
+        return dtypes
+
+    def query(self, view="candidates", tics=None, where="", params=(), columns=None):
+        """
+        Rows of a view, optionally only for `tics` (an indexed join through a
+        temporary table) and an extra SQL `where` clause.
+        """
+        select = ", ".join(_quote(c) for c in columns) if columns else "*"
+        sql = f"SELECT {select} FROM {view}"
+        clauses = [where] if where else []
+        if tics is not None:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (tic_id INTEGER PRIMARY KEY)")
+            self.conn.execute("DELETE FROM wanted")
+            self.conn.executemany("INSERT OR IGNORE INTO wanted VALUES (?)", ((int(t),) for t in tics))
+            clauses.append("tic_id IN (SELECT tic_id FROM wanted)")
+        if clauses:
+            sql += " WHERE " + " AND ".join(f"({c})" for c in clauses)
+        df = pd.read_sql(sql + " ORDER BY tic_id, dip_id", self.conn, params=list(params))
+        return _restore(df, self._dtypes())
+
+    def candidates(self, min_score=None, tics=None, columns=None):
+        """Scored dips, optionally at or above `min_score` and/or only for `tics`."""
+        where, params = ("confidence_score >= ?", [min_score]) if min_score is not None else ("", [])
+        return self.query("candidates", tics, where, params, columns)
+
+    def changed_tics(self, since):
+        rows = self.conn.execute("SELECT DISTINCT tic_id FROM changes WHERE generation > ?", (since,))
+        return [tic for (tic,) in rows]
+
+    def merged(self, previous=None, consumer=CONSUMER, rebuild=None):
+        """
+        (merged dip table, generation). Starting from `previous` (the last
+        table the consumer saved), only the TICs changed since are re-queried
+        and spliced in; without it, or after a schema change, the whole table
+        comes from `rebuild()` (the same join done in memory on the frames
+        just synced) or else from reading the whole view. Pass the generation
+        to mark_consumed once the table is saved.
+        """
+        row = self.conn.execute("SELECT generation FROM consumers WHERE name = ?", (consumer,)).fetchone()
+        seen = row[0] if row else None
+        current = self.generation()
+        fresh = None
+        if previous is not None and seen is not None and "dip_id" in previous.columns:
+            dirty = self.changed_tics(seen)
+            fresh = self.query("merged_dips", tics=dirty)
+            if set(fresh.columns) != set(previous.columns):
+                fresh = None
+        if fresh is None:
+            result = apply_schema(rebuild() if rebuild is not None else self.query("merged_dips"))
+            print(f"🗄️ Merged {len(result)} dips from the catalog store")
+        else:
+            result = _splice(previous, apply_schema(fresh[previous.columns]), dirty)
+            print(f"🗄️ Re-merged {len(fresh)} dips of {len(dirty)} changed TICs, kept {len(result) - len(fresh)}")
+        return result, current
+
+    def mark_consumed(self, generation, consumer=CONSUMER):
+        """
+        Record that the consumer has saved the merged table up to `generation`.
+        Called only after the artifact is written, so a failed write means the
+        same TICs are re-merged next time.
+        """
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO consumers VALUES (?, ?)", (consumer, generation))
+            # Changes every consumer has seen are no longer needed
+            self.conn.execute("DELETE FROM changes WHERE generation <= (SELECT MIN(generation) FROM consumers) "
+                              "AND generation < ?", (generation,))
@@ -0,0 +1,124 @@
+# === Dashboard Data Layer ===
+# Filtering, paging and plot sampling for the Streamlit dip explorer.
+#
+# A FilterIndex is built once per loaded table: categorical columns are
+# factorized to integer codes (a filter is one lookup-table gather) and
+# numeric columns are argsorted (a range is two binary searches), so a
+# widget change costs a few vectorized passes instead of re-masking and
+# re-copying the whole frame. Only the visible page is ever materialized.
+
+import os
+import numpy as np
+import pandas as pd
+from artifact_io import parquet_path, csv_path
+
+PAGE_SIZE = 100
+MAX_PLOT_POINTS = 20_000  # beyond this the sky maps show a sample
+MIN_POINTS_PER_LABEL = 500  # rare labels keep up to this many points when sampling
+
+STATUS_COLORS = [("Not Found", "#ffcccc"), ("No Planet", "#fff7cc"), ("Known Planet", "#ccffcc")]
+
+
+def file_stamp(path):
+    """(size, mtime) of the artifact actually read; changes whenever it is rewritten."""
+    for candidate in (parquet_path(path), csv_path(path)):
+        if os.path.exists(candidate):
+            st = os.stat(candidate)
+            return candidate, st.st_size, st.st_mtime_ns
+    raise FileNotFoundError(path)
+
+
+def status_color(status):
+    for text, color in STATUS_COLORS:
+        if text in str(status):
+            return color
+    return ""
+
+
+class FilterIndex:
+    """Precomputed lookups for isin filters on categorical columns and ranges on numeric ones."""
+
+    def __init__(self, df, categorical=(), numeric=()):
+        self.n = len(df)
+        self.codes = {}  # column -> (int codes, -1 for missing; unique values)
+        self.sorted = {}  # column -> (row order, values in that order), missing values dropped
+        for col in categorical:
+            if col in df.columns:
+                codes, uniques = pd.factorize(df[col])
+                self.codes[col] = (codes, np.asarray(uniques, dtype=object))
+        for col in numeric:
+            if col in df.columns:
+                values = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+                order = np.argsort(values, kind="stable")
+                order = order[~np.isnan(values[order])]
+                self.sorted[col] = (order, values[order])
+
+    def options(self, col):
+        """Distinct non-missing values of a categorical column, sorted."""
+        if col not in self.codes:
+            return []
+        return sorted(self.codes[col][1], key=str)
+
+    def isin(self, col, values):
+        codes, uniques = self.codes[col]
+        allowed = np.zeros(len(uniques) + 1, dtype=bool)  # last slot: code -1 (missing)
+        allowed[:-1] = pd.Index(uniques).isin(list(values))
+        return allowed[codes]
+
+    def between(self, col, lo=-np.inf, hi=np.inf, inclusive_hi=True):
+        order, values = self.sorted[col]
+        start = np.searchsorted(values, lo, side="left")
+        stop = np.searchsorted(values, hi, side="right" if inclusive_hi else "left")
+        mask = np.zeros(self.n, dtype=bool)
+        mask[order[start:stop]] = True
+        return mask
+
+    def rows(self, isin=None, ranges=None):
+        """
+        Row positions matching every filter. `isin` maps a categorical column
+        to allowed values (None skips it); `ranges` maps a numeric column to
+        (lo, hi) or (lo, hi, inclusive_hi). Filters on columns the table
+        lacks are ignored, as the dashboard always did.
+        """
+        mask = np.ones(self.n, dtype=bool)
+        for col, values in (isin or {}).items():
+            if values is not None and col in self.codes:
+                mask &= self.isin(col, values)
+        for col, bounds in (ranges or {}).items():
+            if bounds is not None and col in self.sorted:
+                mask &= self.between(col, *bounds)
+        return np.flatnonzero(mask)
+
+    def colors(self, col, rows):
+        """Background color per row from status_color, computed once per distinct value."""
+        codes, uniques = self.codes[col]
+        lookup = np.array([status_color(u) for u in uniques] + [""], dtype=object)
+        return lookup[codes[rows]]
+
+
+def page_count(n_rows, page_size=PAGE_SIZE):
+    return max(1, -(-n_rows // page_size))
+
+
+def page_rows(rows, page, page_size=PAGE_SIZE):
+    """Row positions on 1-based `page`."""
+    start = (page - 1) * page_size
+    return rows[start:start + page_size]
+
+
+def sample_rows(rows, codes=None, max_points=MAX_PLOT_POINTS, seed=0):
+    """
+    At most max_points of `rows`, sorted. With per-row label `codes`, each
+    label keeps its share of the sample but at least MIN_POINTS_PER_LABEL
+    points, so rare classes stay visible on the map.
+    """
+    if len(rows) <= max_points:
+        return rows
+    rng = np.random.default_rng(seed)
+    if codes is None:
+        return np.sort(rng.choice(rows, max_points, replace=False))
+    labels, counts = np.unique(codes, return_counts=True)
+    quota = np.maximum(counts * max_points // len(rows), np.minimum(counts, MIN_POINTS_PER_LABEL))
+    picked = [rng.choice(rows[codes == label], min(q, c), replace=False)
+              for label, c, q in zip(labels, counts, quota)]
+    return np.sort(np.concatenate(picked))
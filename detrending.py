@@ -0,0 +1,158 @@
+# === Light Curve Detrending ===
+# Removes stellar variability before dip detection and periodicity searches.
+#
+# The trend is a robust sliding-window location: a running median (SciPy's
+# 1-D rank filter, O(N log w)) or a biweight-style refinement of it, where
+# each cadence is weighted by Tukey's biweight of its residual over the
+# local MAD scale and a weighted local quadratic is fit to the residual.
+# The window moments of that fit are FFT correlations (O(N log N)). A
+# local mean would sit above every variability trough and leave a dip
+# there once per period; the quadratic follows the curvature, and keeps
+# its slope up to the segment ends. Windows never reach across data gaps
+# or sector edges: each continuous segment is filtered on its own. Masked
+# cadences (known or first-pass dips) are left out of the fit and their
+# trend is interpolated from the neighbours. The refit only replaces the
+# trend inside first-pass dips, so a misfit bridge cannot add dips
+# anywhere else.
+
+from functools import partial, lru_cache
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from scipy.ndimage import median_filter
+from scipy.fft import rfft, irfft, next_fast_len
+from dip_detection import find_dips
+
+METHOD = "biweight"  # or "median"
+WINDOW_DAYS = 0.75  # about 3x the longest dips and transits we want to keep
+GAP_DAYS = 0.5  # a gap longer than this starts a new segment
+BIWEIGHT_C = 5.0  # tuning constant, in units of the local MAD scale
+BIWEIGHT_ITERATIONS = 2
+MASK_PAD_DAYS = 0.02  # minimum padding on each side of a masked first-pass dip
+MASK_PAD_FRACTION = 0.5  # of the dip's duration, when that is more
+DETREND_WORKERS = 1
+CHUNK_SIZE = 16  # light curves handed to a pool worker at a time
+
+
+def segment_bounds(time, gap=GAP_DAYS):
+    """(start, stop) index pairs of the runs of `time` without a gap longer than `gap`."""
+    breaks = np.flatnonzero(np.diff(time) > gap) + 1
+    edges = np.concatenate(([0], breaks, [len(time)]))
+    return list(zip(edges[:-1], edges[1:]))
+
+
+@lru_cache(maxsize=16)
+def _offset_kernels(half, size):
+    """
+    Spectra (FFT length `size`) of the window offsets ((j - i) / half) ** p
+    for p = 0..4, reversed so that convolving with them correlates. Cached:
+    segments of a sector share their window and FFT lengths.
+    """
+    offsets = -np.arange(-half, half + 1) / half
+    return [rfft(offsets ** p, size) for p in range(5)]
+
+
+def _window_moments(values, kernels, half, size):
+    # Centered sliding sums of values times each kernel's offsets, windows
+    # shrinking at the segment ends: one FFT of `values`, one inverse per kernel
+    spectrum = rfft(values, size)
+    return [irfft(spectrum * k, size)[half:half + len(values)] for k in kernels]
+
+
+def _local_quadratic(weight, residual, kernels, half, size):
+    # Weighted least-squares quadratic in each window, evaluated at its
+    # center: the first unknown of the 3x3 normal equations, by cofactors
+    s0, s1, s2, s3, s4 = _window_moments(weight, kernels, half, size)
+    t0, t1, t2 = _window_moments(weight * residual, kernels[:3], half, size)
+    c0, c1, c2 = s2 * s4 - s3 * s3, s2 * s3 - s1 * s4, s1 * s3 - s2 * s2
+    det = s0 * c0 + s1 * c1 + s2 * c2
+    # Too few weighted cadences to fit a curve (det ~ 0): the weighted mean
+    mean = np.divide(t0, s0, out=np.zeros(len(weight)), where=s0 > 0)
+    solvable = np.abs(det) > 1e-9 * np.maximum(s0, 1.0) ** 3
+    return np.divide(t0 * c0 + t1 * c1 + t2 * c2, det, out=mean, where=solvable)
+
+
+def _segment_trend(time, flux, window, method):
+    n = len(flux)
+    if n < 3:
+        return np.full(n, np.median(flux))
+    cadence = np.median(np.diff(time))
+    size = int(round(window / cadence)) | 1  # odd, so the window is centered
+    size = max(3, min(size, n if n % 2 else n - 1))
+    location = median_filter(flux, size=size, mode="mirror")
+    if method == "median":
+        return location
+
+    half = size // 2
+    scale = 1.4826 * median_filter(np.abs(flux - location), size=size, mode="mirror")
+    scale = np.maximum(scale, np.finfo(float).tiny)
+    fft_size = next_fast_len(n + 2 * half)
+    kernels = _offset_kernels(half, fft_size)
+    for _ in range(BIWEIGHT_ITERATIONS):
+        residual = flux - location
+        u = residual / (BIWEIGHT_C * scale)
+        weight = np.where(np.abs(u) < 1, (1 - u ** 2) ** 2, 0.0)
+        location = location + _local_quadratic(weight, residual, kernels, half, fft_size)
+    return location
+
+
+def trend(time, flux, method=METHOD, window=WINDOW_DAYS, mask=None, gap=GAP_DAYS):
+    """
+    Robust trend at every cadence. NaN and `mask`ed cadences are left out of
+    the fit and get the trend interpolated from their neighbours.
+    """
+    time = np.asarray(time, dtype=float)
+    flux = np.ma.filled(np.ma.asarray(flux, dtype=float), np.nan)
+    use = np.isfinite(time) & np.isfinite(flux)
+    if mask is not None:
+        use &= ~np.asarray(mask, dtype=bool)
+    if use.sum() == 0:
+        return np.full(len(flux), np.nanmedian(flux) if np.isfinite(flux).any() else 1.0)
+
+    t, f = time[use], flux[use]
+    fitted = np.empty(len(f))
+    for start, stop in segment_bounds(t, gap):
+        fitted[start:stop] = _segment_trend(t[start:stop], f[start:stop], window, method)
+    return np.interp(time, t, fitted)
+
+
+def mask_intervals(time, starts, ends):
+    """Boolean mask of the cadences inside any [start, end] interval (time sorted)."""
+    delta = np.zeros(len(time) + 1, dtype=np.int64)
+    np.add.at(delta, np.searchsorted(time, starts, side="left"), 1)
+    np.add.at(delta, np.searchsorted(time, ends, side="right"), -1)
+    return np.cumsum(delta[:-1]) > 0
+
+
+def detrend(time, flux, method=METHOD, window=WINDOW_DAYS, mask=None, mask_threshold=None, gap=GAP_DAYS):
+    """
+    Flux divided by its trend. With mask_threshold, dips found below it in
+    a first pass are masked (padded by half their duration) and the trend
+    is refit without them; inside those dips the refit trend is used, so
+    they keep their full depth.
+    """
+    time = np.asarray(time, dtype=float)
+    flux = np.ma.filled(np.ma.asarray(flux, dtype=float), np.nan)
+    fitted = trend(time, flux, method, window, mask, gap)
+    if mask_threshold is not None:
+        dips = find_dips(time, flux / fitted, [mask_threshold])
+        if len(dips["start_index"]):
+            pad = np.maximum(MASK_PAD_FRACTION * dips["duration"], MASK_PAD_DAYS)
+            in_dip = mask_intervals(time, dips["start_time"] - pad, dips["end_time"] + pad)
+            refit = trend(time, flux, method, window,
+                          in_dip if mask is None else in_dip | np.asarray(mask, dtype=bool), gap)
+            fitted = np.where(in_dip, refit, fitted)
+    return flux / fitted
+
+
+def _detrend_one(lc, **kwargs):
+    return detrend(lc["time"], lc["flux"], **kwargs)
+
+
+def detrend_many(lightcurves, workers=DETREND_WORKERS, **kwargs):
+    """Detrended flux for each {"time", "flux"} light curve, across a process pool if workers > 1."""
+    lightcurves = list(lightcurves)
+    fn = partial(_detrend_one, **kwargs)
+    if workers <= 1 or len(lightcurves) <= CHUNK_SIZE:
+        return [fn(lc) for lc in lightcurves]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(fn, lightcurves, chunksize=CHUNK_SIZE))
@@ -0,0 +1,143 @@
+# === Vectorized Dip Detection ===
+# Finds below-threshold runs in a normalized light curve with array operations
+# (run-length encoding of the below-threshold mask) instead of a Python loop.
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_THRESHOLDS = (0.995,)
+DIP_COLUMNS = ["start_index", "end_index", "start_time", "end_time", "depth", "duration"]
+
+
+def find_dips(time, flux, thresholds=DEFAULT_THRESHOLDS):
+    """
+    Detect dips for every threshold in one vectorized pass.
+
+    A dip is a run of consecutive cadences with flux < threshold. As in the
+    original scanner loop, a run that is still open at the last cadence is not
+    reported. Returns a dict of columnar arrays, one entry per dip, sorted by
+    threshold (in the order given) and then by start index.
+    """
+    time = np.asarray(time, dtype=float)
+    # Masked cadences never count as "below threshold", same as the old loop
+    flux = np.ma.filled(np.ma.asarray(flux, dtype=float), np.nan)
+    thresholds = np.atleast_1d(np.asarray(thresholds, dtype=float))
+
+    # (n_thresholds, n_cadences) mask, padded with False on both sides so
+    # every run has a rising and a falling edge
+    below = np.zeros((len(thresholds), len(flux) + 2), dtype=bool)
+    below[:, 1:-1] = flux[None, :] < thresholds[:, None]
+    edges = np.diff(below.view(np.int8), axis=1)
+
+    thr_idx, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+
+    # Drop runs that reach the end of the light curve (never closed)
+    closed = ends < len(flux)
+    thr_idx, starts, ends = thr_idx[closed], starts[closed], ends[closed]
+
+    lengths = ends - starts
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+    # Expand every run to its cadence indices so per-run reductions are
+    # a single reduceat over a flat array
+    positions = np.repeat(starts - offsets, lengths) + np.arange(lengths.sum())
+    if len(starts):
+        run_min = np.minimum.reduceat(flux[positions], offsets)
+        at_min = np.where(flux[positions] == np.repeat(run_min, lengths), positions, len(flux))
+        min_index = np.minimum.reduceat(at_min, offsets)
+    else:
+        run_min = np.empty(0)
+        min_index = np.empty(0, dtype=int)
+
+    last = ends - 1
+    return {
+        "threshold": thresholds[thr_idx],
+        "start_index": starts,
+        "end_index": last,
+        "start_time": time[starts],
+        "end_time": time[last],
+        "depth": 1 - run_min,
+        "duration": time[last] - time[starts],
+        "min_index": min_index,
+    }
+
+
+def dips_to_frame(dips, tic_id):
+    """Convert columnar dips to the per-event table written to *_dips.csv."""
+    df = pd.DataFrame(dips)
+    df.insert(0, "TIC", tic_id)
+    if df["threshold"].nunique() <= 1:
+        df = df.drop(columns="threshold")
+    return df
+
+
+def concat_dips(parts, thresholds=DEFAULT_THRESHOLDS):
+    """Join columnar dip dicts and restore find_dips ordering (threshold, then start)."""
+    parts = list(parts)
+    if not parts:
+        return find_dips([], [], thresholds)
+    dips = {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+    thresholds = np.atleast_1d(np.asarray(thresholds, dtype=float))
+    by_value = np.argsort(thresholds)
+    rank = by_value[np.searchsorted(thresholds[by_value], dips["threshold"])]
+    order = np.lexsort((dips["start_index"], rank))
+    return {key: values[order] for key, values in dips.items()}
+
+
+class StreamingDipDetector:
+    """
+    Dip detection over a light curve delivered in chunks (e.g. one sector at
+    a time), with the same events as find_dips on the concatenated arrays.
+
+    Only the cadences of runs still open at the end of a chunk (plus
+    `context` cadences before them) are carried into the next one, so a dip
+    that straddles a sector boundary is reported once, whole, with indices
+    into the concatenated light curve. Runs still open after the last chunk
+    are dropped, as in find_dips.
+    """
+
+    def __init__(self, thresholds=DEFAULT_THRESHOLDS, extract=None, context=0):
+        self.thresholds = np.atleast_1d(np.asarray(thresholds, dtype=float))
+        # extract(time, flux, dips) -> extra columns, computed on the carried
+        # plus new cadences; `context` extra cadences are carried for it
+        self.extract = extract
+        self.context = context
+        self.offset = 0  # global index of the first carried cadence
+        self.seen = 0  # cadences fed so far
+        self.carry_time = np.empty(0)
+        self.carry_flux = np.empty(0)
+
+    def feed(self, time, flux):
+        """Add the next chunk; returns the dips that closed inside it."""
+        time = np.concatenate([self.carry_time, np.asarray(time, dtype=float)])
+        flux = np.concatenate([self.carry_flux, np.ma.filled(np.ma.asarray(flux, dtype=float), np.nan)])
+        dips = find_dips(time, flux, self.thresholds)
+
+        # Runs that closed in earlier chunks were reported already
+        new = dips["end_index"] + 1 >= self.seen - self.offset
+        dips = {key: values[new] for key, values in dips.items()}
+        if self.extract is not None:
+            dips.update(self.extract(time, flux, dips))
+        for key in ("start_index", "end_index", "min_index"):
+            dips[key] = dips[key] + self.offset
+
+        # Carry from `context` cadences before the earliest run still open at
+        # the end of the chunk, so its features see the same pre-dip cadences
+        below = flux[None, :] < self.thresholds[:, None]
+        open_from = len(flux)
+        for row in below:
+            if len(row) and row[-1]:
+                last_above = np.flatnonzero(~row)
+                open_from = min(open_from, last_above[-1] + 1 if len(last_above) else 0)
+        open_from = max(0, open_from - self.context)
+        self.seen = self.offset + len(flux)
+        self.offset += open_from
+        self.carry_time = time[open_from:]
+        self.carry_flux = flux[open_from:]
+        return dips
+
+    def scan(self, chunks):
+        """Generator over (time, flux) chunks, yielding each chunk's closed dips."""
+        for time, flux in chunks:
+            yield self.feed(time, flux)
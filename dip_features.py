@@ -0,0 +1,129 @@
+# === Dip Feature Extraction ===
+# Shape, noise and position features for every dip of a light curve at once.
+#
+# The noise windows on either side of each dip are rows of one strided
+# sliding-window view of the flux, and the in-dip samples come from a
+# single (n_dips, MAX_DIP_SAMPLES) gather, so the cost is a handful of
+# array operations per TIC however many dips it has.
+
+import warnings
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+NOISE_WINDOW = 50  # out-of-dip cadences on each side used for the local noise
+MAX_DIP_SAMPLES = 128  # longer dips are sampled at a stride to fit
+BOTTOM_LEVEL = 0.7  # share of the depth below the threshold that counts as "at the bottom"
+U_SHAPE_FRACTION = 0.5  # dips with at least this share of points at the bottom are U-shaped
+MIN_SHAPE_POINTS = 3  # fewer points than this can't tell U from V
+GAP_DAYS = 0.5  # a time step longer than this splits sectors/orbits
+EDGE_DAYS = 0.5  # dips closer than this to a gap or the data edge are near_edge
+MAD_TO_SIGMA = 1.4826
+
+FEATURE_COLUMNS = ["n_points", "ingress_slope", "egress_slope", "symmetry", "local_noise",
+                   "snr", "edge_distance", "near_edge", "dip_shape"]
+# Numeric features the classifier can learn from (dip_shape is categorical)
+MODEL_FEATURES = ["n_points", "ingress_slope", "egress_slope", "symmetry", "snr",
+                  "edge_distance", "near_edge"]
+
+
+def _segment_bounds(time, idx):
+    """Start/end time of the gap-free segment that holds each index."""
+    breaks = np.flatnonzero(np.diff(time) > GAP_DAYS)  # last index of each segment but the final one
+    seg_first = np.concatenate(([0], breaks + 1))
+    seg_last = np.concatenate((breaks, [len(time) - 1]))
+    seg = np.searchsorted(breaks, idx, side="left")
+    return time[seg_first[seg]], time[seg_last[seg]]
+
+
+def _robust_noise(windows):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN windows -> NaN noise
+        median = np.nanmedian(windows, axis=1)
+        return MAD_TO_SIGMA * np.nanmedian(np.abs(windows - median[:, None]), axis=1)
+
+
+def extract_features(time, flux, dips):
+    """
+    Columnar features for `dips` (as returned by find_dips, with indices
+    into `time`/`flux`):
+
+    n_points       cadences in the dip
+    ingress_slope  flux change per day from the last pre-dip cadence to the dip bottom
+    egress_slope   flux change per day from the dip bottom to the first post-dip cadence
+    symmetry       shorter of ingress/egress time over the longer (1 = symmetric)
+    local_noise    robust (MAD) scatter of the flux around the dip
+    snr            depth / local_noise * sqrt(n_points)
+    edge_distance  days to the nearest data edge or gap
+    near_edge      edge_distance < EDGE_DAYS
+    dip_shape      "u_shaped", "v_shaped", or "unresolved" for very short dips
+    """
+    time = np.asarray(time, dtype=float)
+    flux = np.ma.filled(np.ma.asarray(flux, dtype=float), np.nan)
+    starts = np.asarray(dips["start_index"], dtype=int)
+    ends = np.asarray(dips["end_index"], dtype=int)
+    mins = np.asarray(dips["min_index"], dtype=int)
+    depth = np.asarray(dips["depth"], dtype=float)
+    n = len(flux)
+    n_points = ends - starts + 1
+
+    # In-dip samples, relative to the threshold: 0 at the threshold, 1 at the minimum
+    step = np.maximum(1, -(-n_points // MAX_DIP_SAMPLES))
+    offsets = np.arange(MAX_DIP_SAMPLES)[None, :] * step[:, None]
+    valid = offsets < n_points[:, None]
+    positions = np.minimum(starts[:, None] + offsets, max(n - 1, 0))
+    thresholds = np.asarray(dips["threshold"], dtype=float)[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        relative = (thresholds - flux[positions]) / (thresholds - (1 - depth[:, None]))
+    at_bottom = valid & (relative >= BOTTOM_LEVEL)
+    has_bottom = at_bottom.any(axis=1)
+    rows = np.arange(len(starts))
+    first_col = np.argmax(at_bottom, axis=1)
+    last_col = MAX_DIP_SAMPLES - 1 - np.argmax(at_bottom[:, ::-1], axis=1)
+    first_bottom = np.where(has_bottom, positions[rows, first_col], mins)
+    last_bottom = np.where(has_bottom, positions[rows, last_col], mins)
+
+    # Shape: share of in-dip cadences at the bottom (box/U ~ high, V ~ low)
+    bottom_fraction = at_bottom.sum(axis=1) / np.maximum(valid.sum(axis=1), 1)
+    dip_shape = np.where(n_points < MIN_SHAPE_POINTS, "unresolved",
+                         np.where(bottom_fraction >= U_SHAPE_FRACTION, "u_shaped", "v_shaped"))
+
+    # Ingress/egress: from the bracketing out-of-dip cadences to the bottom
+    before = np.clip(starts - 1, 0, max(n - 1, 0))
+    after = np.clip(ends + 1, 0, max(n - 1, 0))
+    t_in = time[first_bottom] - time[before]
+    t_out = time[after] - time[last_bottom]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ingress_slope = np.where(t_in > 0, (flux[first_bottom] - flux[before]) / t_in, np.nan)
+        egress_slope = np.where(t_out > 0, (flux[after] - flux[last_bottom]) / t_out, np.nan)
+        symmetry = np.minimum(t_in, t_out) / np.maximum(t_in, t_out)
+
+    # Local noise: NOISE_WINDOW cadences either side, as rows of one strided view
+    pad = np.full(NOISE_WINDOW, np.nan)
+    windows = sliding_window_view(np.concatenate((pad, flux, pad)), NOISE_WINDOW)
+    around = np.concatenate((windows[starts], windows[ends + 1 + NOISE_WINDOW]), axis=1)
+    local_noise = _robust_noise(around)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        snr = depth / local_noise * np.sqrt(n_points)
+
+    if n:
+        seg_start, seg_end = _segment_bounds(time, starts)
+        edge_distance = np.minimum(time[starts] - seg_start, seg_end - time[ends])
+    else:
+        edge_distance = np.empty(0)
+
+    return {
+        "n_points": n_points,
+        "ingress_slope": ingress_slope,
+        "egress_slope": egress_slope,
+        "symmetry": symmetry,
+        "local_noise": local_noise,
+        "snr": snr,
+        "edge_distance": edge_distance,
+        "near_edge": edge_distance < EDGE_DAYS,
+        "dip_shape": dip_shape,
+    }
+
+
+def with_features(time, flux, dips):
+    """The dips dict with the feature columns added."""
+    return {**dips, **extract_features(time, flux, dips)}
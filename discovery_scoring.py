@@ -1,73 +1,126 @@
 import pandas as pd
-import os
+import numpy as np
+from artifact_io import artifact_exists, read_table, write_table
+from sky_index import contamination, CONTAMINATION_RADIUS_PIX
+from catalog_store import CatalogStore, USE_CATALOG_STORE
 
 INPUT_FILE = "exoasteroid_output/merged_dip_metadata.csv"
 PERIODICITY_FILE = "exoasteroid_output/periodicity_flags.csv"
 OUTPUT_FILE = "exoasteroid_output/discovery_scores.csv"
+NEIGHBOR_CATALOG = "exoasteroid_output/tic_neighbors.csv"  # optional wider star catalog for blend checks
+CONTAMINATION_COLUMNS = ["n_neighbors", "contamination_ratio", "nearest_neighbor_arcsec", "contaminated"]
+
+# Scoring rules: each adds `weight` points to rows whose `column` passes `op`
+# against `value`. Rows without the column are tested against `default`, and
+# missing values (NaN) never pass. Negative weights are penalties; scores
+# never drop below 0. Reweight by editing the table or by passing
+# a modified copy to score_discoveries().
+SCORING_RULES = [
+    {"name": "not_in_exofop", "column": "exofop_status", "op": "contains", "value": "Not Found",
+     "default": None, "weight": 20},
+    {"name": "ai_label", "column": "predicted_label", "op": "in", "value": ["planet", "asteroid"],
+     "default": None, "weight": 10},
+    {"name": "deep", "column": "depth", "op": ">", "value": 0.01, "default": 0, "weight": 10},
+    {"name": "transit_duration", "column": "duration", "op": "between", "value": (0.05, 0.15),
+     "default": 0, "weight": 10},
+    {"name": "bright", "column": "Tmag", "op": "<", "value": 12, "default": 99, "weight": 10},
+    {"name": "periodic", "column": "periodic", "op": "==", "value": True, "default": None, "weight": 20},
+    {"name": "clean_shape", "column": "dip_shape", "op": "==", "value": "u_shaped", "default": "", "weight": 10},
+    {"name": "not_near_edge", "column": "near_edge", "op": "falsy", "value": None, "default": False, "weight": 10},
+    {"name": "blended", "column": "contaminated", "op": "==", "value": True, "default": None, "weight": -20},
+]
+
+# (minimum score, label), highest first; anything lower is "Noise"
+LABEL_THRESHOLDS = [(70, "Likely Planet"), (50, "Possible Asteroid"), (30, "Interesting Noise")]
+DEFAULT_LABEL = "Noise"
+
+def _contains(s, v):
+    # Test each distinct value once; statuses repeat across millions of dips
+    codes, uniques = pd.factorize(s)
+    hits = np.array([isinstance(u, str) and v in u for u in uniques] + [False])
+    return pd.Series(hits[codes], index=s.index)
+
+
+def _falsy(s, v):
+    if pd.api.types.is_numeric_dtype(s) or pd.api.types.is_bool_dtype(s):
+        return s == 0
+    return s.map(lambda x: not x)
+
+
+RULE_OPS = {
+    "contains": _contains,
+    "in": lambda s, v: s.isin(v),
+    ">": lambda s, v: s > v,
+    "<": lambda s, v: s < v,
+    "between": lambda s, v: (s >= v[0]) & (s <= v[1]),
+    "==": lambda s, v: s == v,
+    "falsy": _falsy,
+}
+
+
+def rule_mask(df, rule):
+    """Boolean array: which rows of df pass one rule."""
+    if rule["column"] in df.columns:
+        values = df[rule["column"]]
+    else:
+        values = pd.Series([rule["default"]] * len(df), index=df.index, dtype=object)
+    return RULE_OPS[rule["op"]](values, rule["value"]).fillna(False).to_numpy(dtype=bool)
+
+
+def score_frame(df, rules=SCORING_RULES):
+    """confidence_score and discovery_label for every row, one column operation per rule."""
+    score = np.zeros(len(df), dtype=np.int64)
+    for rule in rules:
+        score += rule["weight"] * rule_mask(df, rule)
+    score = np.maximum(score, 0)
+
+    label = np.select([score >= cutoff for cutoff, _ in LABEL_THRESHOLDS],
+                      [name for _, name in LABEL_THRESHOLDS], default=DEFAULT_LABEL)
+    return pd.DataFrame({"confidence_score": score, "discovery_label": label}, index=df.index)
+
+def _add_contamination(df, catalog=None, radius_pix=CONTAMINATION_RADIUS_PIX):
+    """Set the blend flag columns on df in place (see sky_index.contamination)."""
+    flags = contamination(df, catalog, radius_pix)
+    if flags is None:
+        return
+    print(f"🔭 {int(flags['contaminated'].sum())} of {len(flags)} TICs have bright neighbours "
+          f"within {radius_pix:g} px.")
+    # One gather per column; a merge would copy the whole (wide) dip table again
+    rows = pd.Index(flags["tic_id"]).get_indexer(df["tic_id"])
+    for col in CONTAMINATION_COLUMNS:
+        df[col] = flags[col].to_numpy()[rows]
+
+
+def score_discoveries(df, periodic_df=None, rules=SCORING_RULES, catalog=None):
+    """
+    Return the merged dip table with confidence_score and discovery_label
+    added. Neighbours for the blend check come from `catalog` when given,
+    else from the candidate TICs themselves.
+    """
+    # Optional: merge periodicity flags (the merge is already a new frame)
+    if periodic_df is not None:
+        result = pd.merge(df, periodic_df, on="tic_id", how="left")
+        print("🔁 Periodicity flags merged.")
+    else:
+        result = df.copy()
 
-def classify_discovery(row):
-    score = 0
-
-    # Not in ExoFOP
-    if isinstance(row.get("exofop_status"), str) and "Not Found" in row["exofop_status"]:
-        score += 20
-
-    # AI label
-    if row.get("predicted_label") in ["planet", "asteroid"]:
-        score += 10
-
-    # Depth
-    if row.get("depth", 0) > 0.01:
-        score += 10
-
-    # Duration
-    if 0.05 <= row.get("duration", 0) <= 0.15:
-        score += 10
-
-    # Brightness
-    if row.get("Tmag", 99) < 12:
-        score += 10
-
-    # Periodicity flag
-    if row.get("periodic") == True:
-        score += 20
-
-    # Clean dip shape (optional placeholder)
-    if row.get("dip_shape", "") == "u_shaped":
-        score += 10
-
-    # Not near edge
-    if not row.get("near_edge", False):
-        score += 10
-
-    # Final label
-    label = "Noise"
-    if score >= 70:
-        label = "Likely Planet"
-    elif score >= 50:
-        label = "Possible Asteroid"
-    elif score >= 30:
-        label = "Interesting Noise"
-
-    return pd.Series({"confidence_score": score, "discovery_label": label})
+    _add_contamination(result, catalog)
+    result[["confidence_score", "discovery_label"]] = score_frame(result, rules)
+    return result
 
 def run():
-    if not os.path.exists(INPUT_FILE):
+    if not artifact_exists(INPUT_FILE):
         print("❌ Missing input file.")
         return
 
-    df = pd.read_csv(INPUT_FILE)
-
-    # Optional: merge periodicity flags
-    if os.path.exists(PERIODICITY_FILE):
-        periodic_df = pd.read_csv(PERIODICITY_FILE)
-        df = pd.merge(df, periodic_df, on="tic_id", how="left")
-        print("🔁 Periodicity flags merged.")
-
-    result = df.copy()
-    result[["confidence_score", "discovery_label"]] = result.apply(classify_discovery, axis=1)
+    periodic_df = read_table(PERIODICITY_FILE) if artifact_exists(PERIODICITY_FILE) else None
+    catalog = read_table(NEIGHBOR_CATALOG) if artifact_exists(NEIGHBOR_CATALOG) else None
+    merged = read_table(INPUT_FILE)
+    result = score_discoveries(merged, periodic_df, catalog=catalog)
+    if USE_CATALOG_STORE:
+        CatalogStore().sync_scores(result, merged)
 
-    result.to_csv(OUTPUT_FILE, index=False)
+    write_table(result, OUTPUT_FILE)
     print(f"✅ Discovery scores updated: {OUTPUT_FILE}")
 
 if __name__ == "__main__":
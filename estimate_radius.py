@@ -1,31 +1,37 @@
-import pandas as pd
 import numpy as np
+from artifact_io import read_table, write_table
 
 INPUT_FILE = "exoasteroid_output/merged_dip_metadata.csv"
 OUTPUT_FILE = "exoasteroid_output/discovery_scores_with_radius.csv"
 R_SUN_KM = 695700  # Solar radius in kilometers
 
 def calculate_object_radius_km(depth, star_radius_rsun):
-    if pd.isna(depth) or pd.isna(star_radius_rsun) or depth <= 0:
-        return np.nan
-    return R_SUN_KM * star_radius_rsun * np.sqrt(depth)
-
-def run():
-    print(f"📂 Loading: {INPUT_FILE}")
-    df = pd.read_csv(INPUT_FILE)
+    """Works on scalars or whole columns; NaN where depth <= 0 or an input is missing."""
+    depth = np.asarray(depth, dtype=float)
+    star_radius_rsun = np.asarray(star_radius_rsun, dtype=float)
+    with np.errstate(invalid="ignore"):
+        radius = R_SUN_KM * star_radius_rsun * np.sqrt(np.where(depth > 0, depth, np.nan))
+    return radius if radius.ndim else float(radius)
 
+def add_object_radius(df):
+    """Return a copy with object_radius_km; None if the input columns are missing."""
     if "dip_depth" not in df.columns or "star_radius_rsun" not in df.columns:
         print("❌ Required columns 'dip_depth' or 'star_radius_rsun' missing.")
-        return
+        return None
 
     print("📏 Calculating object radius...")
-    df["object_radius_km"] = df.apply(
-        lambda row: calculate_object_radius_km(row["dip_depth"], row["star_radius_rsun"]),
-        axis=1
-    )
+    df = df.copy()
+    df["object_radius_km"] = calculate_object_radius_km(df["dip_depth"], df["star_radius_rsun"])
+    return df
+
+def run():
+    print(f"📂 Loading: {INPUT_FILE}")
+    df = add_object_radius(read_table(INPUT_FILE))
+    if df is None:
+        return
 
     print("💾 Saving with radius estimate...")
-    df.to_csv(OUTPUT_FILE, index=False)
+    write_table(df, OUTPUT_FILE)
     print(f"✅ Done: {OUTPUT_FILE}")
 
 if __name__ == "__main__":
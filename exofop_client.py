@@ -0,0 +1,183 @@
+# === ExoFOP Client ===
+# Pooled, rate-limited, retrying ExoFOP-TESS lookups with an on-disk TTL cache,
+# so repeat runs only hit ExoFOP for TICs that are unseen or stale.
+
+import os
+import time
+import random
+import sqlite3
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from tic_utils import normalize_tic
+import instrumentation as metrics
+
+BASE_URL = "https://exofop.ipac.caltech.edu/tess/target.php"
+CACHE_PATH = "exoasteroid_output/exofop_cache.sqlite"
+CACHE_TTL_DAYS = 7
+CONCURRENCY = 8
+RATE_PER_SEC = 5.0
+MAX_RETRIES = 4
+BACKOFF_SECONDS = 1.0
+TIMEOUT = 10
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def classify_page(text):
+    """Map an ExoFOP target page to the status strings used downstream."""
+    content = text.lower()
+    if "no target found" in content:
+        return "❌ Not Found"
+    elif "planet name" in content or "ephemeris" in content:
+        return "✅ Known Planet"
+    else:
+        return "🟡 Found (No Planet Listed)"
+
+
+class TokenBucket:
+    """Thread-safe token bucket: at most `rate` requests/s, bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class StatusCache:
+    """SQLite-backed TIC -> status cache with a time-to-live."""
+
+    def __init__(self, path=CACHE_PATH, ttl_days=CACHE_TTL_DAYS):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.ttl = ttl_days * 86400
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS exofop_status ("
+            "tic INTEGER PRIMARY KEY, status TEXT NOT NULL, fetched_at REAL NOT NULL)"
+        )
+
+    def fresh(self, tics):
+        """Cached statuses for the given TICs that have not expired."""
+        cutoff = time.time() - self.ttl
+        by_number = {normalize_tic(tic): tic for tic in tics}
+        numbers = list(by_number)
+        found = {}
+        for i in range(0, len(numbers), 500):
+            chunk = numbers[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT tic, status FROM exofop_status WHERE fetched_at >= ? "
+                f"AND tic IN ({','.join('?' * len(chunk))})",
+                [cutoff, *chunk],
+            )
+            found.update((by_number[tic], status) for tic, status in rows)
+        return found
+
+    def store(self, statuses):
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO exofop_status (tic, status, fetched_at) VALUES (?, ?, ?)",
+                [(normalize_tic(tic), status, now) for tic, status in statuses.items()],
+            )
+
+
+class ExofopClient:
+    def __init__(self, base_url=BASE_URL, concurrency=CONCURRENCY, rate=RATE_PER_SEC,
+                 max_retries=MAX_RETRIES, backoff=BACKOFF_SECONDS, timeout=TIMEOUT, cache=None):
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache = cache
+        self.bucket = TokenBucket(rate)
+        self.stats = {"cached": 0, "fetched": 0, "retries": 0, "errors": 0}
+        self.stats_lock = threading.Lock()  # retries are counted from the worker threads
+
+        # One keep-alive pool shared by all worker threads
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self):
+        self.session.close()
+
+    def _count(self, key, n=1):
+        with self.stats_lock:
+            self.stats[key] += n
+
+    def _sleep_before_retry(self, attempt, response=None):
+        self._count("retries")
+        metrics.count("exofop_retries")
+        delay = self.backoff * 2 ** attempt * (0.5 + random.random())
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, int(retry_after))
+        time.sleep(delay)
+
+    def fetch_status(self, tic_id):
+        """Fetch one TIC's status from ExoFOP, retrying with exponential backoff."""
+        params = {"id": normalize_tic(tic_id)}
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                with metrics.span("exofop_http"):
+                    r = self.session.get(self.base_url, params=params, timeout=self.timeout)
+                metrics.count("exofop_requests", status=r.status_code)
+            except requests.RequestException as e:
+                metrics.count("exofop_requests", status=type(e).__name__)
+                if attempt == self.max_retries:
+                    raise
+                self._sleep_before_retry(attempt)
+                continue
+            if r.status_code in RETRY_STATUS and attempt < self.max_retries:
+                self._sleep_before_retry(attempt, r)
+                continue
+            r.raise_for_status()
+            return classify_page(r.text)
+
+    def check_many(self, tic_ids, refresh=False):
+        """
+        Status for every TIC. Fresh cache entries are reused unless refresh=True;
+        only successful lookups are written back, so errors are retried next run.
+        """
+        tic_ids = list(dict.fromkeys(tic_ids))
+        results = {} if refresh or self.cache is None else self.cache.fresh(tic_ids)
+        self._count("cached", len(results))
+        metrics.count("exofop_cache_hits", len(results))
+        todo = [tic for tic in tic_ids if tic not in results]
+
+        fetched = {}
+        if todo:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                future_to_tic = {executor.submit(self.fetch_status, tic): tic for tic in todo}
+                for future in as_completed(future_to_tic):
+                    tic_id = future_to_tic[future]
+                    try:
+                        fetched[tic_id] = future.result()
+                        self._count("fetched")
+                    except Exception as e:
+                        results[tic_id] = f"⚠️ Error: {e}"
+                        self._count("errors")
+                        metrics.count_error(e, stage="exofop")
+                    print(f"{tic_id}: {fetched.get(tic_id, results.get(tic_id))}")
+
+        if self.cache is not None and fetched:
+            self.cache.store(fetched)
+        results.update(fetched)
+        return results
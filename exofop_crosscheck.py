@@ -1,35 +1,50 @@
-import pandas as pd
-import requests
-import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import argparse
+from artifact_io import artifact_exists, read_table, write_table
+from exofop_client import ExofopClient, StatusCache, BASE_URL, CONCURRENCY, RATE_PER_SEC, CACHE_TTL_DAYS
 
 INPUT_PATH = "exoasteroid_output/predicted_dip_labels.csv"
 OUTPUT_PATH = "exoasteroid_output/predicted_dips_with_exofop_status.csv"
 
-def check_exofop(tic_id):
+def check_exofop(tic_id, client=None):
     """
     Check if the given TIC ID exists in the ExoFOP-TESS database.
     """
-    base_url = "https://exofop.ipac.caltech.edu/tess/target.php"
-    params = {"id": tic_id.replace("TIC ", "").strip()}
+    own_client = client is None
+    client = client or ExofopClient()
     try:
-        r = requests.get(base_url, params=params, timeout=10)
-        content = r.text.lower()
-        if "no target found" in content:
-            return tic_id, "❌ Not Found"
-        elif "planet name" in content or "ephemeris" in content:
-            return tic_id, "✅ Known Planet"
-        else:
-            return tic_id, "🟡 Found (No Planet Listed)"
+        return tic_id, client.fetch_status(tic_id)
     except Exception as e:
         return tic_id, f"⚠️ Error: {e}"
+    finally:
+        if own_client:
+            client.close()
+
+def add_exofop_status(df, base_url=BASE_URL, concurrency=CONCURRENCY, rate=RATE_PER_SEC,
+                      ttl_days=CACHE_TTL_DAYS, refresh=False):
+    """Return a copy of the dip table with an 'exofop_status' column."""
+    tic_ids = df["tic_id"].unique()
+    print(f"🔍 Checking {len(tic_ids)} TICs against ExoFOP ({concurrency} connections, {rate}/s)...")
 
-def run():
-    if not os.path.exists(INPUT_PATH):
+    client = ExofopClient(base_url=base_url, concurrency=concurrency, rate=rate,
+                          cache=StatusCache(ttl_days=ttl_days))
+    try:
+        results = client.check_many(tic_ids, refresh=refresh)
+    finally:
+        client.close()
+    print(f"📊 {client.stats['cached']} cached, {client.stats['fetched']} fetched, "
+          f"{client.stats['retries']} retries, {client.stats['errors']} errors")
+
+    df = df.copy()
+    df["exofop_status"] = df["tic_id"].map(results)
+    return df
+
+def run(base_url=BASE_URL, concurrency=CONCURRENCY, rate=RATE_PER_SEC,
+        ttl_days=CACHE_TTL_DAYS, refresh=False):
+    if not artifact_exists(INPUT_PATH):
         print(f"❌ Input file not found: {INPUT_PATH}")
         return
 
-    df = pd.read_csv(INPUT_PATH)
+    df = read_table(INPUT_PATH)
     if "tic_id" not in df.columns:
         possible_cols = [col for col in df.columns if "tic" in col.lower()]
         if possible_cols:
@@ -39,20 +54,16 @@ def run():
             print("❌ No TIC ID column found in input file.")
             return
 
-    tic_ids = df["tic_id"].unique()
-    print(f"🔍 Checking {len(tic_ids)} TICs against ExoFOP using parallel requests...")
-
-    results = {}
-    with ThreadPoolExecutor(max_workers=8) as executor:
-        future_to_tic = {executor.submit(check_exofop, tic): tic for tic in tic_ids}
-        for future in as_completed(future_to_tic):
-            tic_id, status = future.result()
-            print(f"{tic_id}: {status}")
-            results[tic_id] = status
-
-    df["exofop_status"] = df["tic_id"].map(results)
-    df.to_csv(OUTPUT_PATH, index=False)
+    df = add_exofop_status(df, base_url, concurrency, rate, ttl_days, refresh)
+    write_table(df, OUTPUT_PATH)
     print(f"\n✅ ExoFOP check complete. Saved to {OUTPUT_PATH}")
 
 if __name__ == "__main__":
-    run()
+    parser = argparse.ArgumentParser(description="Cross-check TICs against ExoFOP-TESS.")
+    parser.add_argument("--base-url", default=BASE_URL, help="ExoFOP target page URL")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=RATE_PER_SEC, help="max requests per second")
+    parser.add_argument("--ttl-days", type=float, default=CACHE_TTL_DAYS, help="cache lifetime")
+    parser.add_argument("--refresh", action="store_true", help="ignore cached statuses")
+    args = parser.parse_args()
+    run(args.base_url, args.concurrency, args.rate, args.ttl_days, args.refresh)
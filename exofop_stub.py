@@ -0,0 +1,175 @@
+# === ExoFOP Stub Server ===
+# A local stand-in for the ExoFOP-TESS target page, so the client can be
+# exercised without touching the real service: canned "no target found",
+# "planet name" and plain target pages, plus TICs that answer 429 with a
+# Retry-After header a set number of times first.
+#
+#   python exofop_stub.py            run the client checks against the stub
+#   python exofop_stub.py --serve    just serve, for exofop_crosscheck.py --base-url
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+import subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import pandas as pd
+from artifact_io import read_table, write_table
+from exofop_client import ExofopClient, StatusCache
+from tic_utils import normalize_tic
+
+PORT = 8765
+TARGET_PATH = "/tess/target.php"
+RETRY_AFTER_SECONDS = 1
+
+PAGES = {
+    "not_found": "<html><body><h1>ExoFOP-TESS</h1><p>No target found for this ID.</p></body></html>",
+    "planet": "<html><body><h1>ExoFOP-TESS</h1><table><tr><th>Planet Name</th><td>TOI-1234.01</td></tr>"
+              "</table></body></html>",
+    "plain": "<html><body><h1>ExoFOP-TESS</h1><table><tr><th>TIC ID</th><td>{tic}</td></tr></table></body></html>",
+}
+
+# Canned TICs: page served, and how many 429s come before it
+STUB_TICS = {
+    1001: ("not_found", 0),
+    1002: ("planet", 0),
+    1003: ("plain", 0),
+    1004: ("planet", 1),  # rate limited once, then served
+}
+EXPECTED = {1001: "❌ Not Found", 1002: "✅ Known Planet", 1003: "🟡 Found (No Planet Listed)",
+            1004: "✅ Known Planet"}
+
+
+class StubServer:
+    """ExoFOP stand-in on a background thread; counts and timestamps requests per TIC."""
+
+    def __init__(self, tics=STUB_TICS, port=0):
+        self.tics = dict(tics)
+        self.requests = {}
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                tic = int(parse_qs(url.query).get("id", ["0"])[0])
+                with stub.lock:
+                    seen = stub.requests.setdefault(tic, [])
+                    seen.append(time.monotonic())
+                    attempt = len(seen)
+                page, throttled = stub.tics.get(tic, ("not_found", 0))
+                if url.path != TARGET_PATH:
+                    self.send_error(404)
+                elif attempt <= throttled:
+                    self.send_response(429)
+                    self.send_header("Retry-After", str(RETRY_AFTER_SECONDS))
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                else:
+                    body = PAGES[page].format(tic=tic).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/html; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}{TARGET_PATH}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def hits(self):
+        with self.lock:
+            return sum(len(times) for times in self.requests.values())
+
+
+def check_client(stub, folder):
+    """Status parsing, Retry-After handling and TTL cache hits vs refetches."""
+    tics = [f"TIC {tic}" for tic in STUB_TICS]
+    cache_path = os.path.join(folder, "exofop_cache.sqlite")
+    client = ExofopClient(base_url=stub.url, backoff=0.01, cache=StatusCache(cache_path, ttl_days=1))
+    try:
+        statuses = client.check_many(tics)
+    finally:
+        client.close()
+    assert statuses == {f"TIC {tic}": status for tic, status in EXPECTED.items()}, statuses
+    print("✅ Status parsing: not found / planet / plain pages")
+
+    times = stub.requests[1004]
+    assert client.stats["retries"] == 1 and len(times) == 2, client.stats
+    assert times[1] - times[0] >= RETRY_AFTER_SECONDS, "Retry-After not honored"
+    print(f"✅ 429 retried once after {times[1] - times[0]:.2f}s (Retry-After: {RETRY_AFTER_SECONDS})")
+
+    before = stub.hits()
+    client = ExofopClient(base_url=stub.url, cache=StatusCache(cache_path, ttl_days=1))
+    try:
+        assert client.check_many(tics) == statuses
+    finally:
+        client.close()
+    assert stub.hits() == before and client.stats["cached"] == len(tics), client.stats
+    print("✅ Fresh cache entries served without requests")
+
+    for label, cache, refresh in (("expired", StatusCache(cache_path, ttl_days=0), False),
+                                  ("--refresh", StatusCache(cache_path, ttl_days=1), True)):
+        before = stub.hits()
+        client = ExofopClient(base_url=stub.url, cache=cache)
+        try:
+            assert client.check_many(tics, refresh=refresh) == statuses
+        finally:
+            client.close()
+        assert stub.hits() - before == len(tics) and client.stats["cached"] == 0, client.stats
+        print(f"✅ {label} entries refetched")
+
+
+def check_crosscheck(stub, folder):
+    """exofop_crosscheck.py end to end, pointed at the stub with --base-url."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    tics = [f"TIC {tic}" for tic in STUB_TICS]
+    write_table(pd.DataFrame({"tic_id": tics * 2, "predicted_label": "planet"}),
+                os.path.join(folder, "exoasteroid_output", "predicted_dip_labels.csv"))
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [here, os.environ.get("PYTHONPATH")]))}
+    subprocess.run([sys.executable, os.path.join(here, "exofop_crosscheck.py"), "--base-url", stub.url],
+                   cwd=folder, env=env, check=True, stdout=subprocess.DEVNULL)
+    df = read_table(os.path.join(folder, "exoasteroid_output", "predicted_dips_with_exofop_status.csv"))
+    expected = df["tic_id"].map(normalize_tic).map(EXPECTED)  # tic_id is read back as a number
+    assert (df["exofop_status"] == expected).all(), df
+    print("✅ exofop_crosscheck.py --base-url against the stub")
+
+
+def run():
+    with tempfile.TemporaryDirectory() as folder, StubServer() as stub:
+        check_client(stub, folder)
+        check_crosscheck(stub, folder)
+
+
+def serve(port=PORT):
+    with StubServer(port=port) as stub:
+        print(f"🧪 ExoFOP stub at {stub.url} (TICs {', '.join(map(str, STUB_TICS))}); Ctrl+C to stop")
+        try:
+            stub.thread.join()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local ExoFOP stub server and client checks")
+    parser.add_argument("--serve", action="store_true", help="only serve the canned pages")
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.port)
+    else:
+        run()
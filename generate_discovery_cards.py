@@ -1,11 +1,13 @@
 import pandas as pd
 import os
+from artifact_io import artifact_exists, read_table
+from tic_utils import format_tic
 
 INPUT_FILE = "exoasteroid_output/discovery_scores.csv"
 REPORT_FOLDER = "reports"
 
 def create_card(row):
-    tic_id = row.get("tic_id", "Unknown")
+    tic_id = format_tic(row["tic_id"]) if pd.notna(row.get("tic_id")) else "Unknown"
     filename = os.path.join(REPORT_FOLDER, f"{tic_id.replace(' ', '_')}_discovery_card.md")
 
     content = f"""# 🪐 Discovery Card: {tic_id}
@@ -43,23 +45,23 @@ def create_card(row):
         f.write(content)
     print(f"✅ Generated card: {filename}")
 
-def run():
-    if not os.path.exists(INPUT_FILE):
-        print("❌ discovery_scores.csv not found.")
-        return
-
+def write_cards(top):
+    """Write one markdown card per row of the (already filtered) candidate table."""
     if not os.path.exists(REPORT_FOLDER):
         os.makedirs(REPORT_FOLDER)
 
-    df = pd.read_csv(INPUT_FILE)
-
-    # Filter top candidates
-    top = df[df["confidence_score"] >= 50]
-
     for _, row in top.iterrows():
         create_card(row)
 
     print(f"\n📝 All discovery cards saved in: {REPORT_FOLDER}")
 
+def run():
+    if not artifact_exists(INPUT_FILE):
+        print("❌ discovery_scores.csv not found.")
+        return
+
+    # Filter top candidates (pushed down to the reader)
+    write_cards(read_table(INPUT_FILE, filters=[("confidence_score", ">=", 50)]))
+
 if __name__ == "__main__":
     run()
@@ -0,0 +1,299 @@
+# === Instrumentation ===
+# Timing spans, counters and peak memory for the pipeline scripts, with
+# structured JSON logs and a Prometheus text rendering for the API.
+#
+#   with span("detect", tic=tic_id):      # timed, nested under any open span
+#       ...
+#   count("dips_found", n)                # monotonically increasing counter
+#   count_error(e, stage="scan")          # errors_total{type="TimeoutError",...}
+#
+# Metrics live in this process. Pool workers call drain() to hand theirs to
+# the parent, which merge()s them. JSON logs are opt-in: set
+# EXOASTEROID_JSON_LOG to a file path (or call configure()) and every span
+# is written as one JSON line, with a summary of all metrics at exit.
+
+import os
+import sys
+import json
+import time
+import atexit
+import cProfile
+import pstats
+import threading
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+
+try:
+    import resource  # not on Windows
+except ImportError:
+    resource = None
+
+METRIC_PREFIX = "exoasteroid"
+JSON_LOG = os.environ.get("EXOASTEROID_JSON_LOG")  # path of the JSON-lines log, None = off
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples in sample mode
+PROFILE_TOP = 25  # functions printed after a cProfile run
+
+_lock = threading.Lock()
+_counters = Counter()  # (name, labels) -> value
+_spans = {}  # (name, labels) -> [count, total seconds, max seconds]
+_gauges = {}  # (name, labels) -> value
+_current_span = contextvars.ContextVar("span_path", default=())
+_log_file = None
+_in_worker = False
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def peak_rss_bytes():
+    """Peak resident memory of this process so far."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024  # kilobytes on Linux
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss)
+    except ImportError:
+        return 0
+
+
+def configure(json_log=None):
+    """Start (or with None, stop) writing JSON-lines events to `json_log`."""
+    global _log_file
+    with _lock:
+        if _log_file is not None:
+            _log_file.close()
+            _log_file = None
+        if json_log:
+            os.makedirs(os.path.dirname(json_log) or ".", exist_ok=True)
+            _log_file = open(json_log, "a", buffering=1)
+
+
+def log_event(event, **fields):
+    """Write one JSON event (no-op while JSON logging is off)."""
+    if _log_file is None:
+        return
+    record = {"ts": time.time(), "event": event, "pid": os.getpid(), **fields}
+    line = json.dumps(record, default=str)
+    with _lock:
+        if _log_file is not None:
+            _log_file.write(line + "\n")
+
+
+def count(name, value=1, **labels):
+    with _lock:
+        _counters[_key(name, labels)] += value
+
+
+def count_error(error, **labels):
+    count("errors", type=type(error).__name__, **labels)
+
+
+def gauge(name, value, **labels):
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+@contextmanager
+def span(name, **labels):
+    """
+    Time a block. Durations are aggregated per (name, labels) and, with JSON
+    logging on, each span is logged with its parent path and the process's
+    peak RSS. Labels with high cardinality (e.g. tic) go to the log only.
+    """
+    path = _current_span.get() + (name,)
+    token = _current_span.set(path)
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    status = "ok"
+    try:
+        yield
+    except BaseException as e:
+        status = type(e).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        _current_span.reset(token)
+        key = _key(name, {k: v for k, v in labels.items() if k != "tic"})
+        with _lock:
+            stat = _spans.setdefault(key, [0, 0.0, 0.0])
+            stat[0] += 1
+            stat[1] += seconds
+            stat[2] = max(stat[2], seconds)
+        log_event("span", name=name, path="/".join(path), seconds=round(seconds, 6),
+                  cpu_seconds=round(time.process_time() - cpu_started, 6), status=status,
+                  peak_rss_bytes=peak_rss_bytes(), **labels)
+
+
+def snapshot():
+    """All metrics of this process as plain data."""
+    with _lock:
+        return {
+            "counters": [[name, dict(labels), value] for (name, labels), value in _counters.items()],
+            "spans": [[name, dict(labels), *stat] for (name, labels), stat in _spans.items()],
+            "gauges": [[name, dict(labels), value] for (name, labels), value in _gauges.items()],
+            "peak_rss_bytes": peak_rss_bytes(),
+        }
+
+
+def mark_worker():
+    """ProcessPoolExecutor initializer: this process reports its metrics via drain()."""
+    global _in_worker
+    _in_worker = True
+
+
+def in_worker():
+    return _in_worker
+
+
+def drain():
+    """Snapshot and reset this process's counters and spans (for a pool worker's result)."""
+    data = snapshot()
+    with _lock:
+        _counters.clear()
+        _spans.clear()
+    return data
+
+
+def merge(data):
+    """Add a worker's drain() into this process's metrics."""
+    if not data:
+        return
+    with _lock:
+        for name, labels, value in data["counters"]:
+            _counters[_key(name, labels)] += value
+        for name, labels, n, total, longest in data["spans"]:
+            stat = _spans.setdefault(_key(name, labels), [0, 0.0, 0.0])
+            stat[0] += n
+            stat[1] += total
+            stat[2] = max(stat[2], longest)
+        key = _key("worker_peak_rss_bytes", {})
+        _gauges[key] = max(_gauges.get(key, 0), data["peak_rss_bytes"])
+
+
+def _labels_text(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+
+def prometheus_text():
+    """Metrics in the Prometheus text exposition format."""
+    p = METRIC_PREFIX
+    lines = []
+    with _lock:
+        counters = sorted(_counters.items())
+        spans = sorted(_spans.items())
+        gauges = sorted(_gauges.items())
+
+    for name in sorted({name for (name, _), _ in counters}):
+        lines.append(f"# TYPE {p}_{name}_total counter")
+        lines.extend(f"{p}_{name}_total{_labels_text(labels)} {value:g}"
+                     for (n, labels), value in counters if n == name)
+
+    if spans:
+        lines.append(f"# TYPE {p}_span_seconds summary")
+        for (name, labels), (n, total, _) in spans:
+            text = _labels_text((("span", name),) + labels)
+            lines.append(f"{p}_span_seconds_count{text} {n}")
+            lines.append(f"{p}_span_seconds_sum{text} {total:.6f}")
+        lines.append(f"# TYPE {p}_span_seconds_max gauge")
+        lines.extend(f"{p}_span_seconds_max{_labels_text((('span', name),) + labels)} {longest:.6f}"
+                     for (name, labels), (_, _, longest) in spans)
+
+    for name in sorted({name for (name, _), _ in gauges}):
+        lines.append(f"# TYPE {p}_{name} gauge")
+        lines.extend(f"{p}_{name}{_labels_text(labels)} {value:g}" for (n, labels), value in gauges if n == name)
+
+    lines.append(f"# TYPE {p}_peak_rss_bytes gauge")
+    lines.append(f"{p}_peak_rss_bytes {peak_rss_bytes()}")
+    return "\n".join(lines) + "\n"
+
+
+def print_summary():
+    """Span totals, slowest first, and counters."""
+    data = snapshot()
+    print(f"\n📈 {'span':<28}{'count':>8}{'total s':>10}{'max s':>9}")
+    for name, labels, n, total, longest in sorted(data["spans"], key=lambda s: -s[3]):
+        label = name + ("" if not labels else " " + ",".join(f"{k}={v}" for k, v in labels.items()))
+        print(f"   {label:<28}{n:>8}{total:>10.2f}{longest:>9.2f}")
+    for name, labels, value in sorted(data["counters"], key=lambda c: (c[0], sorted(c[1].items()))):
+        label = name + ("" if not labels else " " + ",".join(f"{k}={v}" for k, v in labels.items()))
+        print(f"   {label:<46}{value:>9g}")
+    print(f"🧠 Peak RSS: {data['peak_rss_bytes'] / 1e6:.0f} MB")
+
+
+# === Profiling hook ===
+
+class StackSampler:
+    """Samples one thread's Python stack every `interval` seconds into collapsed-stack counts."""
+
+    def __init__(self, thread_id=None, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._sample, daemon=True, name="stack-sampler")
+
+    def _sample(self):
+        while not self.stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop_event.set()
+        self.thread.join()
+
+    def write(self, path):
+        """Collapsed stacks ("frame;frame;frame count"), the input format of flamegraph tools."""
+        with open(path, "w") as f:
+            for stack, n in self.stacks.most_common():
+                f.write(f"{stack} {n}\n")
+
+
+@contextmanager
+def profiled(path, mode="cprofile"):
+    """
+    Profile a block: mode "cprofile" writes pstats to `path` and prints the
+    top functions by cumulative time; "sample" writes collapsed stacks.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if mode == "sample":
+        with StackSampler() as sampler:
+            yield
+        sampler.write(path)
+        print(f"🔬 {sum(sampler.stacks.values())} stack samples saved to: {path}")
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        print(f"🔬 Profile saved to: {path} (top {PROFILE_TOP} by cumulative time)")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(PROFILE_TOP)
+
+
+if JSON_LOG:
+    configure(JSON_LOG)
+
+
+@atexit.register
+def _log_summary():
+    if _log_file is not None:
+        log_event("summary", argv=sys.argv, **snapshot())
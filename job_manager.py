@@ -0,0 +1,179 @@
+# === Job Manager ===
+# Runs pipeline requests as background jobs so API calls return immediately.
+# Jobs share a bounded executor; each declares the output directories it
+# writes, and holds a lock on each of them while running, so two jobs never
+# write the same artifacts at once. Stage progress, timings and printed
+# output are kept per job for the status endpoints.
+
+import sys
+import time
+import uuid
+import threading
+import contextvars
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_JOBS = 2  # jobs running at once; the rest queue
+MAX_LOG_LINES = 2000  # per job
+MAX_FINISHED_JOBS = 200  # oldest finished jobs are forgotten beyond this
+FINISHED = {"succeeded", "failed", "cancelled"}
+
+_current_log = contextvars.ContextVar("job_log", default=None)
+
+
+class _LogRouter:
+    """stdout wrapper that also copies writes into the log of the job running in this context."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text):
+        log = _current_log.get()
+        if log is not None:
+            log.write(text)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class JobLog:
+    def __init__(self, max_lines=MAX_LOG_LINES):
+        self.lines = deque(maxlen=max_lines)
+        self.partial = ""
+        self.lock = threading.Lock()
+
+    def write(self, text):
+        with self.lock:
+            *complete, self.partial = (self.partial + text).split("\n")
+            self.lines.extend(complete)
+
+    def tail(self, n=None):
+        with self.lock:
+            lines = list(self.lines) + ([self.partial] if self.partial else [])
+        return lines[-n:] if n else lines
+
+
+class Job:
+    def __init__(self, kind, func, resources):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.func = func  # func(job) -> stage report dict
+        self.resources = sorted(resources)
+        self.status = "queued"
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.stages = {}
+        self.log = JobLog()
+        self.cancel_event = threading.Event()
+        self.future = None
+
+    def update_stage(self, name, entry):
+        self.stages[name] = dict(entry)
+
+    def summary(self):
+        stages = dict(self.stages)  # snapshot; the job thread keeps updating it
+        done = sum(1 for s in stages.values() if s["status"] not in ("pending", "running"))
+        end = self.finished_at or time.time()
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "error": self.error,
+            "cancel_requested": self.cancel_event.is_set(),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "queued_seconds": (self.started_at or end) - self.created_at,
+            "run_seconds": end - self.started_at if self.started_at else 0.0,
+            "progress": done / len(stages) if stages else 0.0,
+            "stages": stages,
+        }
+
+
+class JobManager:
+    def __init__(self, max_jobs=MAX_JOBS):
+        self.executor = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="job")
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.resource_locks = {}
+        if not isinstance(sys.stdout, _LogRouter):
+            sys.stdout = _LogRouter(sys.stdout)
+
+    def _resource_lock(self, resource):
+        with self.lock:
+            return self.resource_locks.setdefault(resource, threading.Lock())
+
+    def submit(self, kind, func, resources):
+        job = Job(kind, func, resources)
+        with self.lock:
+            self.jobs[job.id] = job
+            self._forget_old_jobs()
+        job.future = self.executor.submit(self._run, job)
+        return job
+
+    def _forget_old_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in FINISHED]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    def _run(self, job):
+        if job.cancel_event.is_set():
+            # Cancelled after submit but before a worker thread picked it up
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            return
+        token = _current_log.set(job.log)
+        locks = [self._resource_lock(r) for r in job.resources]
+        held = []
+        try:
+            job.status = "waiting"  # for locks held by another job
+            for lock in locks:  # sorted order, so jobs cannot deadlock
+                lock.acquire()
+                held.append(lock)
+            if job.cancel_event.is_set():
+                job.status = "cancelled"
+                return
+            job.status = "running"
+            job.started_at = time.time()
+            report = job.func(job)
+            failed = [name for name, r in report.items() if r["status"] in ("failed", "blocked")]
+            if job.cancel_event.is_set():
+                job.status = "cancelled"
+            elif failed:
+                job.status = "failed"
+                job.error = f"stages failed: {', '.join(failed)}"
+            else:
+                job.status = "succeeded"
+        except Exception as e:
+            print(f"❌ Job {job.id} failed: {e}")
+            job.status = "failed"
+            job.error = f"{type(e).__name__}: {e}"
+        finally:
+            for lock in reversed(held):
+                lock.release()
+            job.finished_at = time.time()
+            _current_log.reset(token)
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def list(self):
+        with self.lock:
+            return [job.summary() for job in self.jobs.values()]
+
+    def cancel(self, job_id):
+        """Queued jobs never start; running ones stop before their next stage."""
+        job = self.jobs.get(job_id)
+        if job is None or job.status in FINISHED:
+            return job
+        job.cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            job.status = "cancelled"
+            job.finished_at = time.time()
+        return job
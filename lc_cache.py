@@ -0,0 +1,287 @@
+# === Processed Light Curve Cache ===
+# Local, content-addressed store of processed time/flux/flux_err arrays shared
+# by the scanner, periodicity detector and pixel frame stages.
+#
+# Each entry lives in its own directory named after a hash of
+# (TIC, sector set, recipe) and holds one .npy file per array, so a cache hit
+# is a memory-mapped np.load instead of a MAST query plus FITS parsing.
+
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+from lightkurve import search_lightcurve, search_targetpixelfile
+from tic_utils import normalize_tic
+import instrumentation as metrics
+
+CACHE_DIR = "exoasteroid_output/lc_cache"
+MAX_CACHE_BYTES = 2 * 1024 ** 3  # LRU cap, oldest-accessed entries are evicted first
+CACHE_VERSION = 1  # bump to invalidate every entry after a recipe-semantics change
+
+# Processing recipes: how to search, and which methods to chain afterwards
+RECIPES = {
+    "scan": {
+        "source": "lightcurve",
+        "search": {"author": "SPOC", "mission": "TESS"},
+        "steps": ["stitch", "normalize", "remove_outliers"],
+    },
+    "periodicity": {
+        "source": "lightcurve",
+        "search": {"mission": "TESS"},
+        "steps": ["stitch", "remove_nans", "normalize"],  # detrended by the caller
+    },
+    # One entry per sector for streaming scans: each sector is normalized on
+    # its own (as stitch() does) instead of against the stitched median
+    "scan_sector": {
+        "source": "lightcurve",
+        "search": {"author": "SPOC", "mission": "TESS"},
+        "steps": ["normalize", "remove_outliers"],
+    },
+    "tpf": {
+        "source": "tpf",
+        "search": {"mission": "TESS"},
+        "steps": ["to_lightcurve", "remove_nans", "normalize"],
+    },
+}
+
+stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def cache_stats():
+    """Hit/miss/eviction counters for this process."""
+    return dict(stats)
+
+
+def _entry_key(tic_number, sectors, recipe):
+    spec = {
+        "tic": tic_number,
+        "sectors": sorted(sectors),
+        "recipe": RECIPES[recipe],
+        "version": CACHE_VERSION,
+    }
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+
+def _alias_path(tic_number, recipe):
+    # Points (TIC, recipe) at its latest entry so warm reruns never need MAST
+    return os.path.join(CACHE_DIR, "latest", f"{recipe}_{tic_number}.txt")
+
+
+def data_key(tic_id, recipe="scan"):
+    """
+    Entry key(s) the (TIC, recipe) alias currently points at, or None if the
+    TIC was never cached. Changes whenever the cached data does (e.g. a new
+    sector), so callers can tell whether a past result is still current.
+    """
+    alias = _alias_path(normalize_tic(tic_id), recipe)
+    if not os.path.exists(alias):
+        return None
+    with open(alias) as f:
+        return " ".join(f.read().split())  # sector recipes hold one key per line
+
+
+def _write_text_atomic(path, text):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _plain(values, fill=np.nan):
+    values = getattr(values, "value", values)
+    if hasattr(values, "filled"):
+        values = values.filled(fill)
+    return np.asarray(values)
+
+
+def _load_entry(key):
+    entry_dir = os.path.join(CACHE_DIR, key)
+    meta_path = os.path.join(entry_dir, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    arrays = {name: np.load(os.path.join(entry_dir, f"{name}.npy"), mmap_mode="r")
+              for name in meta["arrays"]}
+    os.utime(meta_path)  # mark as recently used for LRU eviction
+    return arrays
+
+
+def _search(tic_number, recipe):
+    spec = RECIPES[recipe]
+    search = search_targetpixelfile if spec["source"] == "tpf" else search_lightcurve
+    with metrics.span("mast_search", source=spec["source"]):
+        result = search(f"TIC {tic_number}", **spec["search"])
+    sectors = [int(s) for s in result.table["sequence_number"]] if len(result) else []
+    return result, sectors
+
+
+def _process(tic_number, search_result, recipe):
+    spec = RECIPES[recipe]
+    if spec["source"] == "tpf":
+        # Only the one TPF the pixel frames are drawn from, not every sector
+        import lightkurve
+        from tpf_access import ensure_tpf
+        path, _ = ensure_tpf(tic_number, search_result=search_result)
+        lc = lightkurve.read(path)
+    else:
+        with metrics.span("download", source="lightcurve"):
+            lc = search_result.download_all()
+        metrics.count("downloads", len(search_result), source="lightcurve")
+    return _apply_steps(lc, spec["steps"])
+
+
+def _apply_steps(lc, steps):
+    for step in steps:
+        with metrics.span(step):
+            lc = getattr(lc, step)()
+
+    arrays = {
+        "time": _plain(lc.time).astype(float),
+        "flux": _plain(lc.flux).astype(float),
+        "flux_err": _plain(lc.flux_err).astype(float),
+    }
+    if "cadenceno" in lc.columns:
+        arrays["cadenceno"] = _plain(lc["cadenceno"], fill=-1).astype(np.int64)
+    return arrays
+
+
+def _store_entry(key, tic_number, sectors, recipe, arrays):
+    entry_dir = os.path.join(CACHE_DIR, key)
+    tmp_dir = f"{entry_dir}.{os.getpid()}.tmp"
+    os.makedirs(tmp_dir, exist_ok=True)
+    nbytes = 0
+    for name, values in arrays.items():
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), values)
+        nbytes += values.nbytes
+    meta = {"tic": tic_number, "recipe": recipe, "sectors": sorted(sectors),
+            "arrays": list(arrays), "bytes": nbytes}
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    try:
+        os.rename(tmp_dir, entry_dir)
+        metrics.count("cache_write_bytes", nbytes)
+    except OSError:
+        # Another worker stored the same entry first; keep theirs
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def evict(max_bytes=None):
+    """Delete least-recently-used entries until the cache fits in max_bytes."""
+    if max_bytes is None:
+        max_bytes = MAX_CACHE_BYTES
+    if not os.path.isdir(CACHE_DIR):
+        return
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        meta_path = os.path.join(CACHE_DIR, name, "meta.json")
+        if name.endswith(".tmp") or not os.path.exists(meta_path):
+            continue
+        with open(meta_path) as f:
+            nbytes = json.load(f)["bytes"]
+        entries.append((os.path.getmtime(meta_path), nbytes, name))
+
+    total = sum(nbytes for _, nbytes, _ in entries)
+    for _, nbytes, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(os.path.join(CACHE_DIR, name), ignore_errors=True)
+        total -= nbytes
+        stats["evictions"] += 1
+        metrics.count("cache_evictions")
+
+
+def get_lightcurve(tic_id, recipe="scan", refresh=False):
+    """
+    Return processed {"time", "flux", "flux_err"[, "cadenceno"]} arrays for a TIC.
+
+    A warm entry is served from disk without contacting MAST. With
+    refresh=True the sector list is re-queried, and the light curve is only
+    rebuilt if new sectors appeared since it was cached.
+    """
+    tic_number = normalize_tic(tic_id)
+    os.makedirs(os.path.join(CACHE_DIR, "latest"), exist_ok=True)
+    alias = _alias_path(tic_number, recipe)
+
+    if not refresh and os.path.exists(alias):
+        with open(alias) as f:
+            arrays = _load_entry(f.read().strip())
+        if arrays is not None:
+            stats["hits"] += 1
+            metrics.count("cache_hits", recipe=recipe)
+            return arrays
+
+    search_result, sectors = _search(tic_number, recipe)
+    if not sectors:
+        raise ValueError(f"No TESS data found for TIC {tic_number}")
+    key = _entry_key(tic_number, sectors, recipe)
+    arrays = _load_entry(key)
+    if arrays is not None:
+        stats["hits"] += 1
+        metrics.count("cache_hits", recipe=recipe)
+    else:
+        stats["misses"] += 1
+        metrics.count("cache_misses", recipe=recipe)
+        processed = _process(tic_number, search_result, recipe)
+        _store_entry(key, tic_number, sectors, recipe, processed)
+        evict()
+        arrays = _load_entry(key) or processed
+    _write_text_atomic(alias, key)
+    return arrays
+
+
+def _sector_label(table, i):
+    # A sector can have several products (e.g. 120 s and 20 s cadence)
+    return f"{int(table['sequence_number'][i])}-{int(table['exptime'][i])}"
+
+
+def iter_sectors(tic_id, recipe="scan_sector", refresh=False):
+    """
+    Yield processed per-sector arrays for a TIC, in search order, downloading
+    and caching one sector at a time so only one is ever held in memory.
+    """
+    tic_number = normalize_tic(tic_id)
+    os.makedirs(os.path.join(CACHE_DIR, "latest"), exist_ok=True)
+    alias = _alias_path(tic_number, recipe)
+
+    if not refresh and os.path.exists(alias):
+        with open(alias) as f:
+            keys = f.read().split()
+        entries = [_load_entry(key) for key in keys]
+        if all(entry is not None for entry in entries):
+            stats["hits"] += len(entries)
+            metrics.count("cache_hits", len(entries), recipe=recipe)
+            yield from entries
+            return
+
+    with metrics.span("mast_search", source="lightcurve"):
+        result = search_lightcurve(f"TIC {tic_number}", **RECIPES[recipe]["search"])
+    if not len(result):
+        raise ValueError(f"No TESS data found for TIC {tic_number}")
+
+    keys = []
+    for i in range(len(result)):
+        label = _sector_label(result.table, i)
+        key = _entry_key(tic_number, [label], recipe)
+        arrays = _load_entry(key)
+        if arrays is not None:
+            stats["hits"] += 1
+            metrics.count("cache_hits", recipe=recipe)
+        else:
+            stats["misses"] += 1
+            metrics.count("cache_misses", recipe=recipe)
+            with metrics.span("download", source="lightcurve"):
+                lc = result[i].download()
+            metrics.count("downloads", source="lightcurve")
+            if lc is None:
+                continue
+            processed = _apply_steps(lc, RECIPES[recipe]["steps"])
+            del lc
+            _store_entry(key, tic_number, [label], recipe, processed)
+            arrays = _load_entry(key) or processed
+        keys.append(key)
+        yield arrays
+
+    evict()
+    _write_text_atomic(alias, "\n".join(keys))
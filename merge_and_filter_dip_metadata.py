@@ -1,19 +1,21 @@
 import pandas as pd
-import os
+from artifact_io import artifact_exists, read_table, write_table
+from catalog_store import CatalogStore, USE_CATALOG_STORE
 
 DIPS_FILE = "exoasteroid_output/predicted_dips_with_exofop_status.csv"
 META_FILE = "exoasteroid_output/tic_metadata.csv"
 MERGED_OUTPUT = "exoasteroid_output/merged_dip_metadata.csv"
 BRIGHT_OUTPUT = "exoasteroid_output/bright_dip_candidates.csv"
 
-def run():
-    if not os.path.exists(DIPS_FILE) or not os.path.exists(META_FILE):
-        print("❌ Missing input files. Please run prediction + metadata scripts first.")
-        return
-
-    df_dips = pd.read_csv(DIPS_FILE)
-    df_meta = pd.read_csv(META_FILE)
-
+def merge_dips_metadata(df_dips, df_meta, store=None, previous=None):
+    """
+    Left-join dips onto TIC metadata; returns (merged, bright candidates,
+    store generation). With a CatalogStore, both tables are upserted and the
+    merged table comes from the store: only TICs changed since `previous`
+    (the last merged table) are re-joined, and without one the synced frames
+    are joined in memory. Once the merged table is saved,
+    pass the generation to store.mark_consumed (it is None without a store).
+    """
     # Normalize columns if needed
     if "tic_id" not in df_dips.columns:
         df_dips.rename(columns={col: "tic_id" for col in df_dips.columns if "tic" in col.lower()}, inplace=True)
@@ -21,16 +23,47 @@ def run():
     if "tic_id" not in df_meta.columns:
         df_meta.rename(columns={col: "tic_id" for col in df_meta.columns if "tic" in col.lower()}, inplace=True)
 
-    # Merge on TIC ID
-    merged = pd.merge(df_dips, df_meta, on="tic_id", how="left")
+    if store is not None:
+        df_dips = df_dips.assign(dip_id=store.sync_dips(df_dips))
+        store.sync_stars(df_meta)
 
-    # Save full merged dataset
-    merged.to_csv(MERGED_OUTPUT, index=False)
-    print(f"✅ Merged file saved to: {MERGED_OUTPUT}")
+        def rebuild():
+            # The store's merged_dips view, joined in memory: one row per
+            # dip_id and per star, ordered by (tic_id, dip_id)
+            dips = df_dips.drop_duplicates("dip_id", keep="last")
+            stars = df_meta.drop_duplicates("tic_id", keep="last")
+            full = pd.merge(dips, stars, on="tic_id", how="left")
+            full.insert(1, "dip_id", full.pop("dip_id"))
+            return full.sort_values(["tic_id", "dip_id"], ignore_index=True)
+
+        merged, generation = store.merged(previous, rebuild=rebuild)
+    else:
+        # Merge on TIC ID
+        merged = pd.merge(df_dips, df_meta, on="tic_id", how="left")
+        generation = None
 
     # Filter bright candidates (Tmag < 12)
     bright = merged[merged["Tmag"] < 12]
-    bright.to_csv(BRIGHT_OUTPUT, index=False)
+    return merged, bright, generation
+
+def run():
+    if not artifact_exists(DIPS_FILE) or not artifact_exists(META_FILE):
+        print("❌ Missing input files. Please run prediction + metadata scripts first.")
+        return
+
+    store = previous = None
+    if USE_CATALOG_STORE:
+        previous = read_table(MERGED_OUTPUT) if artifact_exists(MERGED_OUTPUT) else None
+        store = CatalogStore()
+    merged, bright, generation = merge_dips_metadata(read_table(DIPS_FILE), read_table(META_FILE), store, previous)
+
+    # Save full merged dataset
+    write_table(merged, MERGED_OUTPUT)
+    if store is not None:
+        store.mark_consumed(generation)
+    print(f"✅ Merged file saved to: {MERGED_OUTPUT}")
+
+    write_table(bright, BRIGHT_OUTPUT)
     print(f"🌟 Bright candidate file saved to: {BRIGHT_OUTPUT} ({len(bright)} stars)")
 
 if __name__ == "__main__":
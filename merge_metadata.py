@@ -1,32 +1,43 @@
 import pandas as pd
+from artifact_io import read_table, write_table
 
 SCORES_FILE = "exoasteroid_output/discovery_scores.csv"
 METADATA_FILE = "exoasteroid_output/tic_metadata.csv"
 MERGED_FILE = "exoasteroid_output/merged_dip_metadata.csv"
 
-def run():
-    print("📂 Loading discovery scores...")
-    scores_df = pd.read_csv(SCORES_FILE)
-
-    print("📂 Loading TIC metadata...")
-    metadata_df = pd.read_csv(METADATA_FILE)
-
+def merge_scores_metadata(scores_df, metadata_df):
+    """Join scores with TIC metadata for radius estimation; None if columns are missing."""
     # Use actual radius column: 'rad' -> 'star_radius_rsun'
     if "rad" in metadata_df.columns:
         metadata_df = metadata_df.rename(columns={"rad": "star_radius_rsun"})
 
+    # Scores already carry the metadata columns merged in before scoring;
+    # joining them again would split each into _x/_y copies
+    metadata_df = metadata_df[["tic_id"] + [c for c in metadata_df.columns if c not in scores_df.columns]]
+
     print("🔗 Merging on 'tic_id'...")
     merged_df = pd.merge(scores_df, metadata_df, on="tic_id", how="left")
 
     if "depth" not in merged_df.columns or "star_radius_rsun" not in merged_df.columns:
         print("❌ Required columns 'depth' or 'star_radius_rsun' missing after merge.")
-        return
+        return None
 
     # Rename depth to match what radius estimation expects
-    merged_df = merged_df.rename(columns={"depth": "dip_depth"})
+    return merged_df.rename(columns={"depth": "dip_depth"})
+
+def run():
+    print("📂 Loading discovery scores...")
+    scores_df = read_table(SCORES_FILE)
+
+    print("📂 Loading TIC metadata...")
+    metadata_df = read_table(METADATA_FILE)
+
+    merged_df = merge_scores_metadata(scores_df, metadata_df)
+    if merged_df is None:
+        return
 
     print("💾 Saving merged metadata...")
-    merged_df.to_csv(MERGED_FILE, index=False)
+    write_table(merged_df, MERGED_FILE)
     print(f"✅ Merged CSV saved to: {MERGED_FILE}")
 
 if __name__ == "__main__":
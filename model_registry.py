@@ -0,0 +1,220 @@
+# === Model Registry and Batch Inference ===
+# Keeps dip classifiers loaded in memory for the API, keyed by model version,
+# and coalesces concurrent prediction requests into single predict_proba calls.
+
+import os
+import re
+import time
+import queue
+import pickle
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+import joblib
+import numpy as np
+import pandas as pd
+
+MODEL_PATH = "exoasteroid_output/dip_classifier.pkl"
+ARCHIVE_DIR = "exoasteroid_output/models"  # one <version>.pkl per model ever served
+MAX_LOADED_MODELS = 4
+MAX_BATCH_ROWS = 8192
+MAX_BATCH_WAIT = 0.005  # seconds to wait for more requests before predicting
+LATENCY_WINDOW = 1000  # recent requests kept for latency percentiles
+DEFAULT_FEATURES = ["depth", "duration"]
+VERSION_PATTERN = re.compile(r"[0-9a-f]+")  # model_version is a hex digest
+
+
+def model_version(model):
+    """Version stamped on the model at training time, or a hash of its pickle."""
+    version = getattr(model, "version_", None)
+    if version is None:
+        version = hashlib.sha1(pickle.dumps(model)).hexdigest()[:12]
+    return version
+
+
+def model_features(model):
+    return list(getattr(model, "feature_names_in_", DEFAULT_FEATURES))
+
+
+class ModelRegistry:
+    """
+    The current model is whatever MODEL_PATH holds; it is reloaded when the
+    file changes and archived by version so older versions stay servable.
+    """
+
+    def __init__(self, path=MODEL_PATH, archive_dir=ARCHIVE_DIR, max_loaded=MAX_LOADED_MODELS):
+        self.path = path
+        self.archive_dir = archive_dir
+        self.max_loaded = max_loaded
+        self.models = OrderedDict()  # version -> model, least recently used first
+        self.current_version = None
+        self.stamp = None
+        self.lock = threading.Lock()
+
+    def _remember(self, version, model):
+        self.models[version] = model
+        self.models.move_to_end(version)
+        while len(self.models) > self.max_loaded:
+            self.models.popitem(last=False)
+
+    def _refresh(self):
+        st = os.stat(self.path)
+        stamp = (st.st_size, st.st_mtime_ns)
+        if stamp == self.stamp:
+            return
+        model = joblib.load(self.path)
+        version = model_version(model)
+        os.makedirs(self.archive_dir, exist_ok=True)
+        archived = os.path.join(self.archive_dir, f"{version}.pkl")
+        if not os.path.exists(archived):
+            shutil.copyfile(self.path, archived)
+        self._remember(version, model)
+        self.current_version, self.stamp = version, stamp
+        print(f"🧠 Serving model version {version}")
+
+    def get(self, version=None):
+        """(version, model); None means the current model."""
+        with self.lock:
+            if version is None:
+                self._refresh()
+                version = self.current_version
+            if version not in self.models:
+                # The version comes from API requests: only archived versions
+                # may name a pickle to load, never an arbitrary path
+                if not VERSION_PATTERN.fullmatch(str(version)) or version not in self._archived():
+                    raise KeyError(f"Unknown model version: {version}")
+                self._remember(version, joblib.load(os.path.join(self.archive_dir, f"{version}.pkl")))
+            self.models.move_to_end(version)
+            return version, self.models[version]
+
+    def _archived(self):
+        if not os.path.isdir(self.archive_dir):
+            return []
+        return sorted(f[:-4] for f in os.listdir(self.archive_dir) if f.endswith(".pkl"))
+
+    def versions(self):
+        return {"current": self.current_version, "loaded": list(self.models), "archived": self._archived()}
+
+
+class MicroBatcher:
+    """
+    Queues prediction requests and serves them from a background thread:
+    whatever arrives within MAX_BATCH_WAIT (up to MAX_BATCH_ROWS rows) for the
+    same model version goes through one predict_proba call.
+    """
+
+    def __init__(self, registry, max_rows=MAX_BATCH_ROWS, max_wait=MAX_BATCH_WAIT):
+        self.registry = registry
+        self.max_rows = max_rows
+        self.max_wait = max_wait
+        self.queue = queue.Queue()
+        self.started = time.time()
+        self.stats = {"requests": 0, "rows": 0, "batches": 0, "errors": 0, "predict_seconds": 0.0}
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.lock = threading.Lock()
+        threading.Thread(target=self._serve, daemon=True, name="micro-batcher").start()
+
+    def submit(self, rows, version=None):
+        """Future resolving to {"model_version", "labels", "probabilities", "classes"}."""
+        future = Future()
+        self.queue.put((pd.DataFrame(rows), version, future, time.perf_counter()))
+        return future
+
+    def _collect(self):
+        batch = [self.queue.get()]
+        rows = len(batch[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_rows:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    def _serve(self):
+        while True:
+            batch = self._collect()
+            by_version = {}
+            for item in batch:
+                by_version.setdefault(item[1], []).append(item)
+            for version, items in by_version.items():
+                self._predict(version, items)
+
+    def _fail(self, items, error):
+        with self.lock:
+            self.stats["errors"] += len(items)
+        for _, _, future, _ in items:
+            future.set_exception(error)
+
+    def _predict(self, version, items):
+        try:
+            version, model = self.registry.get(version)
+        except Exception as e:
+            self._fail(items, e)
+            return
+
+        # Bad rows only fail their own request, not the whole batch
+        features = model_features(model)
+        good, parts = [], []
+        for item in items:
+            missing = [f for f in features if f not in item[0].columns]
+            if len(item[0]) and missing:
+                self._fail([item], ValueError(f"Missing feature columns: {missing}"))
+                continue
+            try:
+                parts.append(item[0].reindex(columns=features).astype(float))
+                good.append(item)
+            except (TypeError, ValueError) as e:
+                self._fail([item], ValueError(f"Non-numeric feature values: {e}"))
+        items = good
+        if not items:
+            return
+
+        try:
+            X = pd.concat(parts, ignore_index=True)
+            started = time.perf_counter()
+            proba = model.predict_proba(X) if len(X) else np.empty((0, len(model.classes_)))
+            elapsed = time.perf_counter() - started
+        except Exception as e:
+            self._fail(items, e)
+            return
+
+        classes = [str(c) for c in model.classes_]
+        labels = np.asarray(model.classes_)[proba.argmax(axis=1)] if len(proba) else np.empty(0)
+        done = time.perf_counter()
+        with self.lock:
+            self.stats["batches"] += 1
+            self.stats["requests"] += len(items)
+            self.stats["rows"] += len(X)
+            self.stats["predict_seconds"] += elapsed
+        offset = 0
+        for rows, _, future, submitted in items:
+            part = slice(offset, offset + len(rows))
+            offset += len(rows)
+            self.latencies.append(done - submitted)
+            future.set_result({
+                "model_version": version,
+                "classes": classes,
+                "labels": [str(label) for label in labels[part]],
+                "probabilities": proba[part].round(6).tolist(),
+            })
+
+    def summary(self):
+        with self.lock:
+            stats = dict(self.stats)
+            latencies = np.array(self.latencies) * 1000
+        uptime = time.time() - self.started
+        stats.update({
+            "rows_per_batch": stats["rows"] / stats["batches"] if stats["batches"] else 0.0,
+            "rows_per_second": stats["rows"] / uptime if uptime else 0.0,
+            "predict_rows_per_second": stats["rows"] / stats["predict_seconds"] if stats["predict_seconds"] else 0.0,
+            "latency_ms": {f"p{q}": float(np.percentile(latencies, q)) for q in (50, 95, 99)} if len(latencies) else {},
+        })
+        return stats
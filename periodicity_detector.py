@@ -1,40 +1,156 @@
 import pandas as pd
-from lightkurve import search_lightcurve
-from astropy.timeseries import LombScargle
-import os
+import numpy as np
+from astropy.timeseries import LombScargle, BoxLeastSquares
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+import argparse
 import lightkurve as lk
+import lc_cache
+from detrending import detrend
+from artifact_io import artifact_exists, read_table, write_table
+from tic_utils import normalize_tic
 lk.conf.cache_location = "C:/Users/pinke/.lightkurve/cache"  # optional if needed
 
 
 
-INPUT_FILE = "exoasteroid_output/predicted_dip_labels.csv"  
+INPUT_FILE = "exoasteroid_output/predicted_dip_labels.csv"
 OUTPUT_FILE = "exoasteroid_output/periodicity_flags.csv"
 
+# === Periodogram settings ===
+NYQUIST_FACTOR = 2
+SAMPLES_PER_PEAK = 5
+LS_POWER_THRESHOLD = 0.1  # You can tune this
+BLS_DURATIONS = (0.04, 0.08, 0.12, 0.2)  # days
+BLS_MIN_PERIOD = 0.3  # days
+BLS_CAP_BASELINE = 28.0  # one sector, rounded up to BASELINE_STEP: always fully sampled
+BLS_SNR_THRESHOLD = 7.1
+BLS_BIN_DAYS = 10.0 / 60 / 24  # well below the shortest trial duration
+BASELINE_STEP = 1.0  # days; baselines are rounded up to this so grids can be shared
+CADENCE_DIGITS = 3  # significant digits of the mean cadence in a grid key
+WORKERS = 1
+
+EMPTY_RESULT = {"periodic": False, "bls_periodic": False, "peak_power": 0, "ls_period": np.nan,
+                "bls_period": np.nan, "bls_duration": np.nan, "bls_epoch": np.nan,
+                "bls_depth": np.nan, "bls_snr": np.nan}
+
+
+def grid_key(time):
+    """
+    (baseline, mean cadence) bucket a light curve falls into. The mean
+    cadence is baseline / n_points, as astropy's autopower uses it, so gaps
+    lower the Nyquist limit instead of the median cadence inflating it.
+    """
+    span = time.max() - time.min()
+    baseline = np.ceil(span / BASELINE_STEP) * BASELINE_STEP
+    cadence = float(f"{span / len(time):.{CADENCE_DIGITS}g}")
+    return float(baseline), cadence
+
+
+@lru_cache(maxsize=64)
+def ls_frequency_grid(baseline, cadence):
+    """Lomb-Scargle frequencies, matching autopower(nyquist_factor=2): f_max = factor * 0.5 * n / baseline."""
+    df = 1 / baseline / SAMPLES_PER_PEAK
+    f_max = NYQUIST_FACTOR * 0.5 / cadence
+    return np.arange(0.5 * df, f_max, df)
+
+
+def bls_periods_needed(baseline):
+    """Trial periods for a frequency step of shortest duration / baseline^2 (no transit falls between two)."""
+    df = min(BLS_DURATIONS) / baseline ** 2
+    return int((1 / BLS_MIN_PERIOD - 2 / baseline) / df) + 1
+
+
+@lru_cache(maxsize=64)
+def bls_period_grid(baseline):
+    """
+    BLS trial periods, uniform in frequency, requiring two transits in the
+    baseline. The grid grows with baseline^2, so beyond one sector it is
+    capped to grow linearly instead, with a warning.
+    """
+    max_period = baseline / 2
+    if max_period <= BLS_MIN_PERIOD:
+        return np.array([BLS_MIN_PERIOD])
+    needed = bls_periods_needed(baseline)
+    cap = int(bls_periods_needed(BLS_CAP_BASELINE) * max(1.0, baseline / BLS_CAP_BASELINE))
+    if needed > cap:
+        print(f"⚠️ BLS grid for a {baseline:.0f}-day baseline capped at {cap:,} of {needed:,} periods; "
+              f"short transits may fall between trial periods")
+    n = min(cap, needed)
+    return np.sort(1 / np.linspace(1 / max_period, 1 / BLS_MIN_PERIOD, n))
+
+
+def bin_lightcurve(time, flux, flux_err, bin_days):
+    """Average into fixed-width time bins (empty bins are dropped)."""
+    idx = np.floor((time - time[0]) / bin_days).astype(np.int64)
+    counts = np.bincount(idx)
+    keep = counts > 0
+    n = counts[keep]
+    t = np.bincount(idx, weights=time)[keep] / n
+    f = np.bincount(idx, weights=flux)[keep] / n
+    e = None
+    if flux_err is not None:
+        e = np.sqrt(np.bincount(idx, weights=flux_err ** 2)[keep]) / n
+    return t, f, e
+
+
+def analyze_lightcurve(time, flux, flux_err=None):
+    """Run one Lomb-Scargle and one BLS periodogram on a processed light curve."""
+    time = np.asarray(time, dtype=float)
+    flux = np.asarray(flux, dtype=float)
+    baseline, cadence = grid_key(time)
+
+    # Lomb-Scargle, computed once on the shared frequency grid
+    frequency = ls_frequency_grid(baseline, cadence)
+    power = LombScargle(time, flux).power(frequency)
+    best_ls = int(np.argmax(power))
+    peak_power = float(power[best_ls])
+
+    # Box Least Squares for transit-shaped signals, on binned data since the
+    # shortest trial duration spans several bins anyway
+    dy = None
+    if flux_err is not None and np.all(np.isfinite(flux_err)) and np.all(np.asarray(flux_err) > 0):
+        dy = np.asarray(flux_err, dtype=float)
+    t_bin, f_bin, dy_bin = bin_lightcurve(time, flux, dy, BLS_BIN_DAYS)
+    bls = BoxLeastSquares(t_bin, f_bin, dy=dy_bin)
+    periods = bls_period_grid(baseline)
+    durations = [d for d in BLS_DURATIONS if d < periods.min()]
+    result = bls.power(periods, durations, objective="snr")
+    best = int(np.argmax(result.power))
+    bls_snr = float(result.depth_snr[best])
+
+    return {
+        # "periodic" stays the Lomb-Scargle flag discovery_scoring has always
+        # scored; a transit-like BLS detection is flagged on its own
+        "periodic": bool(peak_power > LS_POWER_THRESHOLD),
+        "bls_periodic": bool(bls_snr > BLS_SNR_THRESHOLD),
+        "peak_power": peak_power,
+        "ls_period": float(1 / frequency[best_ls]),
+        "bls_period": float(result.period[best]),
+        "bls_duration": float(result.duration[best]),
+        "bls_epoch": float(result.transit_time[best]),
+        "bls_depth": float(result.depth[best]),
+        "bls_snr": bls_snr,
+    }
+
+
 def detect_periodicity(tic_id):
-    tic_number = tic_id.replace("TIC", "").strip()
+    tic_number = normalize_tic(tic_id)
     try:
-        # Search and download light curve
-        search_result = search_lightcurve(f"TIC {tic_number}", mission="TESS")
-        lc = search_result.download_all().stitch().remove_nans().normalize().flatten()
-
-        # Use Lomb-Scargle to detect periodic signals
-        ls = LombScargle(lc.time.value, lc.flux.value)
-        period = ls.autopower(nyquist_factor=2)[0]
-        peak_power = max(ls.autopower(nyquist_factor=2)[1])
-
-        # Simple threshold for periodicity
-        is_periodic = peak_power > 0.1  # You can tune this
-        return {"tic_id": tic_id, "periodic": is_periodic, "peak_power": peak_power}
+        # Processed light curve (stitch/remove_nans/normalize), cached on disk;
+        # detrended here, gap-aware, so the window can change without a re-download
+        lc = lc_cache.get_lightcurve(f"TIC {tic_number}", recipe="periodicity")
+        flux = detrend(lc["time"], lc["flux"])
+        return {"tic_id": tic_id, **analyze_lightcurve(lc["time"], flux, lc["flux_err"])}
     except Exception as e:
         print(f"⚠️ {tic_id} - Error: {e}")
-        return {"tic_id": tic_id, "periodic": False, "peak_power": 0}
+        return {"tic_id": tic_id, **EMPTY_RESULT}
 
-def run():
-    if not os.path.exists(INPUT_FILE):
+def run(workers=WORKERS):
+    if not artifact_exists(INPUT_FILE):
         print(f"❌ Input file not found: {INPUT_FILE}")
         return
 
-    df = pd.read_csv(INPUT_FILE)
+    df = read_table(INPUT_FILE)
     if "tic_id" not in df.columns:
         tic_col = [c for c in df.columns if "tic" in c.lower()]
         if tic_col:
@@ -43,15 +159,24 @@ def run():
             print("❌ No TIC column found.")
             return
 
-    results = []
-    for tic_id in df["tic_id"].unique():
-        print(f"🔍 Checking periodicity for {tic_id}...")
-        result = detect_periodicity(tic_id)
-        results.append(result)
+    tic_ids = list(df["tic_id"].unique())
+    print(f"🔍 Checking periodicity for {len(tic_ids)} TICs with {workers} worker(s)...")
+    if workers <= 1:
+        results = [detect_periodicity(tic_id) for tic_id in tic_ids]
+    else:
+        # Each worker keeps its own grid cache, reused across all of its targets
+        chunksize = max(1, len(tic_ids) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(detect_periodicity, tic_ids, chunksize=chunksize))
 
     out_df = pd.DataFrame(results)
-    out_df.to_csv(OUTPUT_FILE, index=False)
+    write_table(out_df, OUTPUT_FILE)
     print(f"\n✅ Periodicity flags saved to: {OUTPUT_FILE}")
+    if workers <= 1:
+        print(f"💾 Light curve cache: {lc_cache.cache_stats()}")
 
 if __name__ == "__main__":
-    run()
+    parser = argparse.ArgumentParser(description="Flag periodic signals with Lomb-Scargle and BLS.")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="process-pool size (1 = sequential)")
+    args = parser.parse_args()
+    run(args.workers)
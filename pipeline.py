@@ -0,0 +1,394 @@
+# === In-Process Pipeline Runner ===
+# Runs the discovery pipeline as a DAG of stages inside one process, handing
+# DataFrames between stages in memory. Independent branches (ExoFOP and TIC
+# metadata) run concurrently, and a stage is skipped when the content hashes
+# of its inputs and its parameters match its last successful run.
+
+import os
+import json
+import time
+import pickle
+import hashlib
+import argparse
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import joblib
+import pandas as pd
+from artifact_io import artifact_exists, read_table, write_table, parquet_path
+import exofop_client
+import instrumentation as metrics
+
+OUTPUT_DIR = "exoasteroid_output"
+STATE_FILE = os.path.join(OUTPUT_DIR, "pipeline_state.json")
+MAX_WORKERS = 2
+
+
+class Stage:
+    def __init__(self, name, func, deps=(), outputs=None, params=None, files=(), persists_outputs=False):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.outputs = outputs or {}  # output name -> artifact path
+        self.params = params or {}
+        self.files = list(files)  # extra on-disk inputs, fingerprinted by content
+        self.persists_outputs = persists_outputs  # stage writes its own artifacts
+
+
+# === Stage bodies ===
+# Each takes {output name: value} for everything upstream, plus its params,
+# and returns {output name: value}. Heavy modules are imported lazily so a
+# run that skips a stage never pays for its imports.
+
+def _with_tic_id(df):
+    if "tic_id" not in df.columns:
+        tic_cols = [c for c in df.columns if "tic" in c.lower()]
+        df = df.rename(columns={tic_cols[0]: "tic_id"})
+    return df
+
+
+def scan_stage(inputs, tic_file, dip_threshold, method, workers, stream, resume):
+    # With resume, TICs already in the scan manifest (same settings, same
+    # cached data) are reused, so appending to tics.txt scans only the new ones.
+    # Settings are passed in, not patched onto the module: pool workers never
+    # see module globals set here
+    import batch_dip_scanner
+    batch_dip_scanner.run(tic_file, workers, stream, resume,
+                          settings={"threshold": dip_threshold, "method": method})
+    return {"all_dips": read_table(os.path.join(OUTPUT_DIR, "all_dips.csv"))}
+
+
+def auto_label_stage(inputs):
+    from auto_label_dips import label_dips
+    return {"dip_labels_auto": label_dips(inputs["all_dips"])}
+
+
+def train_stage(inputs, algorithm, search):
+    from train_dip_classifier import train_classifier, save_model
+    model = train_classifier(inputs["dip_labels_auto"], algorithm, search)
+    save_model(model, MODEL_FILE)  # the pickle plus its JSON training report
+    return {"model": model}
+
+
+def predict_stage(inputs):
+    from predict_dip_labels import predict_labels
+    # Dips already labeled by this model version are reused, not rescored
+    path = _artifact("predicted_dip_labels")
+    previous = read_table(path) if artifact_exists(path) else None
+    return {"predicted_dip_labels": predict_labels(inputs["all_dips"], inputs["model"], previous)}
+
+
+def exofop_stage(inputs, **params):
+    from exofop_crosscheck import add_exofop_status
+    df = _with_tic_id(inputs["predicted_dip_labels"])
+    return {"predicted_dips_with_exofop_status": add_exofop_status(df, **params)}
+
+
+def metadata_stage(inputs):
+    from query_tic_metadata import fetch_metadata, TicCatalogCache
+    tic_ids = _with_tic_id(inputs["predicted_dip_labels"])["tic_id"].unique()
+    return {"tic_metadata": pd.DataFrame(fetch_metadata(tic_ids, cache=TicCatalogCache()))}
+
+
+def merge_stage(inputs):
+    from merge_and_filter_dip_metadata import merge_dips_metadata
+    from catalog_store import CatalogStore, USE_CATALOG_STORE
+    # With the (opt-in) catalog store only TICs whose rows changed since the
+    # last merge are re-joined; the changes count as merged only once the
+    # artifact is written
+    path = _artifact("merged_dip_metadata")
+    store = previous = None
+    if USE_CATALOG_STORE:
+        previous = read_table(path) if artifact_exists(path) else None
+        store = CatalogStore()
+    merged, bright, generation = merge_dips_metadata(inputs["predicted_dips_with_exofop_status"],
+                                                     inputs["tic_metadata"], store, previous)
+    merged = write_table(merged, path)
+    bright = write_table(bright, _artifact("bright_dip_candidates"))
+    if store is not None:
+        store.mark_consumed(generation)
+    return {"merged_dip_metadata": merged, "bright_dip_candidates": bright}
+
+
+def score_stage(inputs, periodicity_file, neighbor_catalog):
+    from discovery_scoring import score_discoveries
+    from catalog_store import CatalogStore, USE_CATALOG_STORE
+    periodic_df = read_table(periodicity_file) if artifact_exists(periodicity_file) else None
+    catalog = read_table(neighbor_catalog) if artifact_exists(neighbor_catalog) else None
+    scores = score_discoveries(inputs["merged_dip_metadata"], periodic_df, catalog=catalog)
+    if USE_CATALOG_STORE:
+        CatalogStore().sync_scores(scores, inputs["merged_dip_metadata"])
+    return {"discovery_scores": scores}
+
+
+def radius_stage(inputs):
+    from merge_metadata import merge_scores_metadata
+    from estimate_radius import add_object_radius
+    merged = merge_scores_metadata(inputs["discovery_scores"], inputs["tic_metadata"])
+    if merged is None or (merged := add_object_radius(merged)) is None:
+        raise ValueError("scores or metadata lack depth/star_radius_rsun")
+    return {"discovery_scores_with_radius": merged}
+
+
+def cards_stage(inputs, min_score):
+    from generate_discovery_cards import write_cards
+    scores = inputs["discovery_scores"]
+    write_cards(scores[scores["confidence_score"] >= min_score])
+    return {}
+
+
+def _artifact(name):
+    return os.path.join(OUTPUT_DIR, f"{name}.csv")
+
+
+PERIODICITY_FILE = _artifact("periodicity_flags")
+MODEL_FILE = os.path.join(OUTPUT_DIR, "dip_classifier.pkl")
+NEIGHBOR_CATALOG = _artifact("tic_neighbors")
+
+STAGES = [
+    Stage("scan", scan_stage, outputs={"all_dips": _artifact("all_dips")},
+          params={"tic_file": "tics.txt", "dip_threshold": 0.995, "method": "matched_filter", "workers": 1,
+                  "stream": False, "resume": True},
+          files=["tics.txt"], persists_outputs=True),
+    Stage("auto_label", auto_label_stage, deps=["scan"],
+          outputs={"dip_labels_auto": _artifact("dip_labels_auto")}),
+    Stage("train", train_stage, deps=["auto_label"], outputs={"model": MODEL_FILE},
+          params={"algorithm": "forest", "search": False}, persists_outputs=True),
+    Stage("predict", predict_stage, deps=["scan", "train"],
+          outputs={"predicted_dip_labels": _artifact("predicted_dip_labels")}),
+    Stage("exofop", exofop_stage, deps=["predict"],
+          outputs={"predicted_dips_with_exofop_status": _artifact("predicted_dips_with_exofop_status")},
+          params={"concurrency": exofop_client.CONCURRENCY, "rate": exofop_client.RATE_PER_SEC,
+                  "ttl_days": exofop_client.CACHE_TTL_DAYS}),
+    Stage("metadata", metadata_stage, deps=["predict"],
+          outputs={"tic_metadata": _artifact("tic_metadata")}),
+    Stage("merge", merge_stage, deps=["exofop", "metadata"],
+          outputs={"merged_dip_metadata": _artifact("merged_dip_metadata"),
+                   "bright_dip_candidates": _artifact("bright_dip_candidates")}, persists_outputs=True),
+    Stage("score", score_stage, deps=["merge"],
+          outputs={"discovery_scores": _artifact("discovery_scores")},
+          params={"periodicity_file": PERIODICITY_FILE, "neighbor_catalog": NEIGHBOR_CATALOG},
+          files=[parquet_path(PERIODICITY_FILE), PERIODICITY_FILE, parquet_path(NEIGHBOR_CATALOG), NEIGHBOR_CATALOG]),
+    Stage("radius", radius_stage, deps=["score", "metadata"],
+          outputs={"discovery_scores_with_radius": _artifact("discovery_scores_with_radius")}),
+    Stage("cards", cards_stage, deps=["score"], params={"min_score": 50}),
+]
+
+
+# === Fingerprints ===
+
+def content_hash(value):
+    h = hashlib.sha1()
+    if isinstance(value, pd.DataFrame):
+        h.update(json.dumps([str(c) for c in value.columns]).encode())
+        h.update(pd.util.hash_pandas_object(value, index=False).values.tobytes())
+    else:
+        h.update(pickle.dumps(value))
+    return h.hexdigest()
+
+
+def file_hash(path):
+    if not os.path.exists(path):
+        return None
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _artifact_file(path):
+    return path if path.endswith(".pkl") else parquet_path(path)
+
+
+def _file_stamp(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+class PipelineRunner:
+    def __init__(self, stages=STAGES, state_file=STATE_FILE, max_workers=MAX_WORKERS, on_stage=None):
+        self.stages = {s.name: s for s in stages}
+        self.state_file = state_file
+        self.max_workers = max_workers
+        self.state = self._load_state()
+        self.lock = threading.Lock()
+        self.values = {}  # output name -> in-memory value
+        self.hashes = {}  # output name -> content hash
+        self.report = {}
+        self.on_stage = on_stage  # called as on_stage(name, report entry) on every transition
+
+    def _load_state(self):
+        if os.path.exists(self.state_file):
+            with open(self.state_file) as f:
+                return json.load(f)
+        return {}
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+        tmp = self.state_file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.state_file)
+
+    def _upstream_outputs(self, stage):
+        names = []
+        for dep in stage.deps:
+            names.extend(self.stages[dep].outputs)
+            names.extend(self._upstream_outputs(self.stages[dep]))
+        return list(dict.fromkeys(names))
+
+    def fingerprint(self, stage):
+        spec = {
+            "stage": stage.name,
+            "params": stage.params,
+            "inputs": {name: self.hashes[name] for name in sorted(self._upstream_outputs(stage))},
+            "files": {path: file_hash(path) for path in stage.files},
+        }
+        return hashlib.sha1(json.dumps(spec, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _is_current(self, stage, fp):
+        """Same fingerprint as last success, and its artifacts untouched since."""
+        record = self.state.get(stage.name)
+        if not record or record["fingerprint"] != fp:
+            return False
+        for name, path in stage.outputs.items():
+            path = _artifact_file(path)
+            if not os.path.exists(path) or _file_stamp(path) != record["stamps"].get(name):
+                return False
+        return True
+
+    def _value(self, name):
+        # Outputs of skipped stages are only read back if a later stage needs them
+        if name not in self.values:
+            for stage in self.stages.values():
+                if name in stage.outputs:
+                    path = stage.outputs[name]
+                    self.values[name] = joblib.load(path) if path.endswith(".pkl") else read_table(path)
+        return self.values[name]
+
+    def _persist(self, stage, outputs):
+        """Write outputs; tables are handed on as stored, so memory matches disk."""
+        stored = dict(outputs)
+        for name, path in stage.outputs.items():
+            if stage.persists_outputs:
+                continue
+            if path.endswith(".pkl"):
+                joblib.dump(outputs[name], path)
+            else:
+                stored[name] = write_table(outputs[name], path)
+        return stored
+
+    def _run_stage(self, stage, force):
+        started = time.perf_counter()
+        fp = self.fingerprint(stage)
+        if not force and self._is_current(stage, fp):
+            with self.lock:
+                self.hashes.update(self.state[stage.name]["hashes"])
+            return "skipped", time.perf_counter() - started
+
+        print(f"\n▶️ Running stage: {stage.name}")
+        with metrics.span("stage", stage=stage.name):
+            inputs = {name: self._value(name) for name in self._upstream_outputs(stage)}
+            outputs = self._persist(stage, stage.func(inputs, **stage.params))
+
+        hashes = {name: content_hash(value) for name, value in outputs.items()}
+        with self.lock:
+            self.values.update(outputs)
+            self.hashes.update(hashes)
+            self.state[stage.name] = {
+                "fingerprint": fp,
+                "hashes": hashes,
+                "stamps": {name: _file_stamp(_artifact_file(path)) for name, path in stage.outputs.items()},
+                "finished_at": time.time(),
+            }
+            self._save_state()
+        return "ran", time.perf_counter() - started
+
+    def _with_ancestors(self, names):
+        selected = set()
+        todo = list(names)
+        while todo:
+            name = todo.pop()
+            if name not in selected:
+                selected.add(name)
+                todo.extend(self.stages[name].deps)
+        return selected
+
+    def _record(self, name, status, seconds=0.0, error=None):
+        self.report[name] = {"status": status, "seconds": seconds}
+        if error:
+            self.report[name]["error"] = error
+        if self.on_stage:
+            self.on_stage(name, self.report[name])
+
+    def run(self, targets=None, force=(), cancel_event=None):
+        """
+        Run `targets` (default: every stage) and whatever they depend on.
+        Stages named in `force` run even if their fingerprint is unchanged.
+        Once `cancel_event` is set no further stages start; running ones finish.
+        """
+        selected = self._with_ancestors(targets or list(self.stages))
+        pending = [name for name in self.stages if name in selected]
+        done, failed = set(), set()
+        running = {}
+        for name in pending:
+            self._record(name, "pending")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                if cancel_event is not None and cancel_event.is_set():
+                    for name in pending:
+                        self._record(name, "cancelled")
+                    pending = []
+                for name in list(pending):
+                    deps = self.stages[name].deps
+                    if any(d in failed for d in deps):
+                        pending.remove(name)
+                        failed.add(name)
+                        self._record(name, "blocked")
+                    elif all(d in done for d in deps):
+                        pending.remove(name)
+                        self._record(name, "running")
+                        # Carry the caller's context (e.g. a job's log capture) into the stage thread
+                        ctx = contextvars.copy_context()
+                        future = executor.submit(ctx.run, self._run_stage, self.stages[name], name in force)
+                        running[future] = name
+
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        status, seconds = future.result()
+                        done.add(name)
+                        self._record(name, status, seconds)
+                    except Exception as e:
+                        print(f"❌ Stage {name} failed: {e}")
+                        metrics.count_error(e, stage=name)
+                        failed.add(name)
+                        self._record(name, "failed", error=f"{type(e).__name__}: {e}")
+
+        self.print_report()
+        return self.report
+
+    def print_report(self):
+        print("\n📋 Pipeline summary")
+        for name in self.stages:
+            if name in self.report:
+                r = self.report[name]
+                print(f"  {name:<12}{r['status']:<9}{r['seconds']:>8.2f}s  {r.get('error', '')}")
+
+
+def run_pipeline(targets=None, force=(), max_workers=MAX_WORKERS, on_stage=None, cancel_event=None):
+    return PipelineRunner(max_workers=max_workers, on_stage=on_stage).run(targets, force, cancel_event)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the ExoAsteroid pipeline as a DAG.")
+    parser.add_argument("targets", nargs="*", help="stages to bring up to date (default: all)")
+    parser.add_argument("--force", nargs="*", default=[], help="stages to rerun regardless of fingerprints")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="stages run concurrently")
+    args = parser.parse_args()
+    run_pipeline(args.targets or None, args.force, args.workers)
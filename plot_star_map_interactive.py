@@ -1,9 +1,10 @@
-import pandas as pd
 import plotly.express as px
+from artifact_io import read_table
 
 # Load star data
-df = pd.read_csv("exoasteroid_output/tic_metadata.csv")
-df_pred = pd.read_csv("exoasteroid_output/predicted_dips_with_exofop_status.csv")
+df = read_table("exoasteroid_output/tic_metadata.csv")
+df_pred = read_table("exoasteroid_output/predicted_dips_with_exofop_status.csv",
+                     columns=["tic_id", "predicted_label", "exofop_status"])
 df = df.merge(df_pred[["tic_id", "predicted_label", "exofop_status"]], on="tic_id", how="left")
 
 fig = px.scatter(
@@ -2,29 +2,78 @@
 # Loads a trained model and applies it to unlabeled dips
 
 import pandas as pd
+import numpy as np
 import joblib
 import os
+import argparse
+from artifact_io import artifact_exists, read_table, write_table
+from model_registry import model_version, model_features
 
 # Paths
 model_path = "exoasteroid_output/dip_classifier.pkl"
 new_data_path = "exoasteroid_output/all_dips.csv"
 predicted_output_path = "exoasteroid_output/predicted_dip_labels.csv"
 
-# Load model
-if not os.path.exists(model_path):
-    raise FileNotFoundError("❌ Model not found. Please run train_dip_classifier.py first.")
+# Columns that identify a dip across runs; a dip is only reused when its
+# feature_hash matches too
+DIP_KEY = ["TIC", "threshold", "start_index"]
 
-model = joblib.load(model_path)
-print("✅ Loaded trained dip classifier")
 
-# Load new dips
-df = pd.read_csv(new_data_path)
-X_new = df[['depth', 'duration']]
+def feature_hash(df, model):
+    """Per-row hash of the model's feature values and version: changes whenever a new label could."""
+    features = df[model_features(model)].astype(float).assign(model_version=model_version(model))
+    # Stored as int64: SQLite (the catalog store) has no unsigned 64-bit integers
+    return pd.util.hash_pandas_object(features, index=False).to_numpy().view(np.int64)
 
-# Predict labels
-predictions = model.predict(X_new)
-df['predicted_label'] = predictions
 
-# Save results
-df.to_csv(predicted_output_path, index=False)
-print(f"✅ Predicted labels saved to: {predicted_output_path}")
+def predict_labels(df, model, previous=None):
+    """
+    Return a copy of the dip table with the model's 'predicted_label',
+    'model_version' and 'feature_hash'. Dips that `previous` already labeled
+    with this model version and the same feature values keep that label;
+    only the rest (new dips, and dips whose features changed with new data
+    or other detrend/detection settings) are scored.
+    """
+    version = model_version(model)
+    df = df.copy()
+    df["feature_hash"] = feature_hash(df, model)
+    labels = np.full(len(df), None, dtype=object)
+
+    if previous is not None and {"model_version", "feature_hash"} <= set(previous.columns):
+        key = [c for c in DIP_KEY if c in df.columns and c in previous.columns] + ["feature_hash"]
+        known = previous.loc[previous["model_version"] == version, key + ["predicted_label"]]
+        known = known.drop_duplicates(key)
+        labels = df[key].merge(known, on=key, how="left")["predicted_label"].to_numpy(dtype=object)
+
+    todo = pd.isna(labels)
+    if todo.any():
+        labels[todo] = model.predict(df.loc[todo, model_features(model)])
+    print(f"🔮 Model {version}: {todo.sum()} dips scored, {len(df) - todo.sum()} reused")
+
+    df['predicted_label'] = labels
+    df['model_version'] = version
+    return df
+
+
+def run(incremental=True):
+    # Load model
+    if not os.path.exists(model_path):
+        raise FileNotFoundError("❌ Model not found. Please run train_dip_classifier.py first.")
+
+    model = joblib.load(model_path)
+    print("✅ Loaded trained dip classifier")
+
+    # Load new dips and predict labels, reusing earlier predictions by this model
+    previous = read_table(predicted_output_path) if incremental and artifact_exists(predicted_output_path) else None
+    df = predict_labels(read_table(new_data_path), model, previous)
+
+    # Save results
+    write_table(df, predicted_output_path)
+    print(f"✅ Predicted labels saved to: {predicted_output_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Label dips with the trained classifier.")
+    parser.add_argument("--full", action="store_true", help="rescore every dip, not just new ones")
+    args = parser.parse_args()
+    run(incremental=not args.full)
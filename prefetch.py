@@ -0,0 +1,126 @@
+# === Download Prefetching ===
+# Overlaps network-bound fetching with CPU-bound analysis.
+#
+# A few download threads work through the item list ahead of the consumer
+# and hand finished items over a bounded queue: when analysis falls behind,
+# the queue fills up and the threads block instead of downloading further
+# ahead, so at most `depth` fetched items (plus one in flight per thread)
+# are ever waiting. The stats say which side is the bottleneck: consumer
+# stall time means analysis waited on the network (add threads), producer
+# blocked time means downloads were ahead (more depth would not help).
+
+import time
+import queue
+import threading
+import instrumentation as metrics
+
+PREFETCH_THREADS = 2
+PREFETCH_DEPTH = 4  # fetched items allowed to wait for the consumer
+POLL_SECONDS = 0.2  # how often a blocked thread checks for close()
+
+_DONE = object()
+
+
+class Prefetcher:
+    """
+    Iterate over (item, value, error) as `fetch(item)` completes on background
+    threads; error is the exception fetch raised (value is then None).
+    Completion order, not input order.
+    """
+
+    def __init__(self, items, fetch, threads=PREFETCH_THREADS, depth=PREFETCH_DEPTH):
+        self.items = iter(items)
+        self.fetch = fetch
+        self.depth = depth
+        self.queue = queue.Queue(maxsize=max(1, depth))
+        self.lock = threading.Lock()
+        self.stop = threading.Event()
+        self.active = threads
+        self.stats = {"fetched": 0, "errors": 0, "fetch_seconds": 0.0, "stall_seconds": 0.0,
+                      "blocked_seconds": 0.0, "gets": 0, "depth_sum": 0, "depth_max": 0}
+        self.threads = [threading.Thread(target=self._work, daemon=True, name=f"prefetch-{i}")
+                        for i in range(threads)]
+        for thread in self.threads:
+            thread.start()
+
+    def _next_item(self):
+        with self.lock:
+            return next(self.items, _DONE)
+
+    def _put(self, entry):
+        started = time.perf_counter()
+        while not self.stop.is_set():
+            try:
+                self.queue.put(entry, timeout=POLL_SECONDS)
+                break
+            except queue.Full:
+                continue
+        blocked = time.perf_counter() - started
+        with self.lock:
+            self.stats["blocked_seconds"] += blocked
+        metrics.count("prefetch_blocked_seconds", blocked)
+
+    def _work(self):
+        try:
+            while not self.stop.is_set():
+                item = self._next_item()
+                if item is _DONE:
+                    break
+                started = time.perf_counter()
+                value, error = None, None
+                try:
+                    value = self.fetch(item)
+                except Exception as e:
+                    error = e
+                seconds = time.perf_counter() - started
+                with self.lock:
+                    self.stats["fetched"] += 1
+                    self.stats["errors"] += error is not None
+                    self.stats["fetch_seconds"] += seconds
+                self._put((item, value, error))
+        finally:
+            with self.lock:
+                self.active -= 1
+                last = self.active == 0
+            if last:
+                self._put(_DONE)
+
+    def __iter__(self):
+        while True:
+            depth = self.queue.qsize()
+            started = time.perf_counter()
+            entry = self.queue.get()
+            stalled = time.perf_counter() - started
+            if entry is _DONE:
+                return
+            with self.lock:
+                self.stats["stall_seconds"] += stalled
+                self.stats["gets"] += 1
+                self.stats["depth_sum"] += depth
+                self.stats["depth_max"] = max(self.stats["depth_max"], depth)
+            metrics.gauge("prefetch_queue_depth", depth)
+            metrics.count("prefetch_stall_seconds", stalled)
+            yield entry
+
+    def close(self):
+        """Stop the threads early (e.g. the consumer gave up); fetches in progress finish first."""
+        self.stop.set()
+        for thread in self.threads:
+            thread.join()
+
+    def summary(self):
+        with self.lock:
+            stats = dict(self.stats)
+        stats["mean_depth"] = stats["depth_sum"] / stats["gets"] if stats["gets"] else 0.0
+        return stats
+
+    def print_summary(self):
+        s = self.summary()
+        print(f"📥 Prefetch: {s['fetched']} fetched ({s['errors']} failed) by {len(self.threads)} threads, "
+              f"{s['fetch_seconds']:.1f}s downloading")
+        print(f"   queue depth mean {s['mean_depth']:.1f} / max {s['depth_max']} of {self.depth}; "
+              f"analysis stalled {s['stall_seconds']:.1f}s, downloads blocked {s['blocked_seconds']:.1f}s")
+        if s["stall_seconds"] > s["blocked_seconds"]:
+            print("   ↳ analysis waited on the network: try more download threads")
+        elif s["depth_max"] >= self.depth:
+            print("   ↳ downloads kept ahead of analysis: more depth would not help")
@@ -1,29 +1,127 @@
-from astroquery.mast import Catalogs
 import pandas as pd
+import numpy as np
 import os
 import time
+import json
+import sqlite3
+import argparse
+from tic_utils import normalize_tic, format_tic
+from artifact_io import artifact_exists, read_table, write_table
 
 INPUT_FILE = "exoasteroid_output/predicted_dips_with_exofop_status.csv"
 OUTPUT_FILE = "exoasteroid_output/tic_metadata.csv"
+CACHE_FILE = "exoasteroid_output/tic_catalog_cache.sqlite"
+CHUNK_SIZE = 500  # TIC IDs per catalog request
+CHUNK_PAUSE = 1  # seconds between MAST requests
+
+
+class MastCatalogBackend:
+    """Bulk TIC lookups against MAST: one query_criteria call per chunk of IDs."""
+
+    def query(self, tic_numbers):
+        from astroquery.mast import Catalogs
+        table = Catalogs.query_criteria(catalog="Tic", ID=[str(n) for n in tic_numbers])
+        return table.to_pandas().to_dict("records")
+
+
+class LocalCatalogBackend:
+    """Serves TIC rows from a local CSV with an `ID` column, e.g. an offline catalog extract."""
+
+    def __init__(self, path):
+        self.catalog = pd.read_csv(path).set_index("ID", drop=False)
+
+    def query(self, tic_numbers):
+        found = self.catalog.index.intersection([int(n) for n in tic_numbers])
+        return self.catalog.loc[found].to_dict("records")
+
+
+class TicCatalogCache:
+    """SQLite store of catalog rows keyed by TIC number; misses are remembered too."""
+
+    def __init__(self, path=CACHE_FILE):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS tic_catalog ("
+            "tic INTEGER PRIMARY KEY, row_json TEXT, fetched_at REAL NOT NULL)"
+        )
+
+    def get(self, tic_numbers):
+        """{tic: row or None} for the TICs already fetched."""
+        found = {}
+        for i in range(0, len(tic_numbers), CHUNK_SIZE):
+            chunk = tic_numbers[i:i + CHUNK_SIZE]
+            rows = self.conn.execute(
+                f"SELECT tic, row_json FROM tic_catalog WHERE tic IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+            found.update((tic, json.loads(row) if row else None) for tic, row in rows)
+        return found
+
+    def put(self, rows_by_tic):
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO tic_catalog (tic, row_json, fetched_at) VALUES (?, ?, ?)",
+                [(tic, json.dumps(row, default=_json_value) if row else None, now)
+                 for tic, row in rows_by_tic.items()],
+            )
+
+
+def _json_value(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def fetch_metadata(tic_ids, backend=None, cache=None, chunk_size=CHUNK_SIZE):
+    """
+    Catalog rows for the given TICs, in input order. Cached TICs (including ones
+    the catalog had no row for) are never re-queried; the rest go out in chunks.
+    """
+    backend = backend or MastCatalogBackend()
+    numbers = list(dict.fromkeys(normalize_tic(t) for t in tic_ids))
+    known = cache.get(numbers) if cache else {}
+    todo = [n for n in numbers if n not in known]
+    print(f"💾 {len(known)} TICs cached, {len(todo)} to query in chunks of {chunk_size}")
+
+    for i in range(0, len(todo), chunk_size):
+        chunk = todo[i:i + chunk_size]
+        print(f"🔍 Querying TICs {i + 1}-{i + len(chunk)} of {len(todo)}...")
+        try:
+            rows = backend.query(chunk)
+        except Exception as e:
+            print(f"⚠️ Chunk failed: {e}")
+            continue
+        fetched = {n: None for n in chunk}
+        fetched.update({int(row["ID"]): row for row in rows})
+        if cache:
+            cache.put(fetched)
+        known.update(fetched)
+        if isinstance(backend, MastCatalogBackend) and i + chunk_size < len(todo):
+            time.sleep(CHUNK_PAUSE)
+
+    results = []
+    for n in numbers:
+        row = known.get(n)
+        if row:
+            row = dict(row)
+            row["dstArcSec"] = 0.0  # exact ID match, i.e. the target itself
+            row["tic_id"] = format_tic(n)
+            results.append(row)
+    return results
+
 
 def query_tic_metadata(tic_id):
-    try:
-        cleaned = tic_id.replace("TIC", "").strip()
-        catalog_data = Catalogs.query_object(f"TIC {cleaned}", catalog="TIC")
-        if len(catalog_data) > 0:
-            row = dict(catalog_data[0])
-            row["tic_id"] = f"TIC {cleaned}"
-            return row
-    except Exception as e:
-        print(f"⚠️ Failed for {tic_id}: {e}")
-    return None
-
-def run():
-    if not os.path.exists(INPUT_FILE):
+    rows = fetch_metadata([tic_id], cache=TicCatalogCache())
+    return rows[0] if rows else None
+
+def run(local_catalog=None):
+    if not artifact_exists(INPUT_FILE):
         print(f"❌ Input file not found: {INPUT_FILE}")
         return
 
-    df = pd.read_csv(INPUT_FILE)
+    df = read_table(INPUT_FILE)
 
     if "tic_id" not in df.columns:
         possible = [col for col in df.columns if "tic" in col.lower()]
@@ -33,19 +131,17 @@ def run():
             print("❌ 'tic_id' column missing.")
             return
 
-    results = []
-    for tic_id in df["tic_id"].unique():
-        print(f"🔍 Querying {tic_id}...")
-        meta = query_tic_metadata(tic_id)
-        if meta:
-            results.append(meta)
-        time.sleep(1)
+    backend = LocalCatalogBackend(local_catalog) if local_catalog else MastCatalogBackend()
+    results = fetch_metadata(df["tic_id"].unique(), backend=backend, cache=TicCatalogCache())
 
     if results:
-        pd.DataFrame(results).to_csv(OUTPUT_FILE, index=False)
+        write_table(pd.DataFrame(results), OUTPUT_FILE)
         print(f"\n✅ Metadata saved to: {OUTPUT_FILE}")
     else:
         print("❌ No TIC metadata fetched.")
 
 if __name__ == "__main__":
-    run()
+    parser = argparse.ArgumentParser(description="Fetch TIC catalog metadata in bulk.")
+    parser.add_argument("--local-catalog", help="CSV of TIC rows to use instead of MAST")
+    args = parser.parse_args()
+    run(args.local_catalog)
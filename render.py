@@ -0,0 +1,211 @@
+# === Image Rendering ===
+# Batch rendering of pixel-frame thumbnails, dip triptychs and the sky map.
+#
+# Figures are built directly on the Agg canvas (no pyplot state, so they are
+# safe in worker processes) and each layout is created once per process and
+# reused: per image only the pixel data, color limits and title change. For
+# plain thumbnails, render_frame_png skips matplotlib entirely and maps the
+# frame through a colormap lookup table straight to PNG.
+#
+# A process pool only pays off with spare CPUs and enough matplotlib work to
+# cover its start-up and pickling: LUT thumbnails take about a millisecond,
+# so they always render in-process, and so do small batches.
+
+import os
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from PIL import Image
+import instrumentation as metrics
+
+RENDER_WORKERS = 4  # capped at the CPU count
+CHUNK_SIZE = 32  # jobs handed to a pool worker at a time
+POOL_MIN_JOBS = 4 * CHUNK_SIZE  # matplotlib jobs below which the pool costs more than it saves
+THUMBNAIL_SCALE = 8  # pixels per TESS pixel on the fast path
+PNG_COMPRESS_LEVEL = 1  # zlib level; thumbnails are tiny, speed matters more
+
+LABEL_COLORS = {"planet": "limegreen", "asteroid": "orange", "noise": "gray"}
+
+
+def _limits(frame):
+    finite = frame[np.isfinite(frame)]
+    if finite.size == 0:
+        return None
+    return float(finite.min()), float(finite.max())
+
+
+class FrameRenderer:
+    """One pixel frame with a colorbar, e.g. the scanner's 'during dip' image."""
+
+    def __init__(self, cmap="plasma", figsize=(6, 6), clabel="Flux (e⁻/s)"):
+        self.fig = Figure(figsize=figsize)
+        FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot()
+        self.image = self.ax.imshow(np.zeros((2, 2)), cmap=cmap, origin="lower")
+        self.fig.colorbar(self.image, ax=self.ax, label=clabel)
+        self.shape = None
+
+    def render(self, path, frame, title=""):
+        frame = np.asarray(frame, dtype=float)
+        self.image.set_data(frame)
+        if frame.shape != self.shape:
+            ny, nx = frame.shape
+            self.image.set_extent((-0.5, nx - 0.5, -0.5, ny - 0.5))
+            self.shape = frame.shape
+        limits = _limits(frame)
+        if limits:
+            self.image.set_clim(*limits)
+        self.ax.set_title(title)
+        self.fig.savefig(path)
+        return path
+
+
+class TriptychRenderer:
+    """Before/during/after dip frames side by side (pixel_frame_comparison)."""
+
+    LABELS = ("Before Dip", "During Dip", "After Dip")
+
+    def __init__(self, figsize=(12, 4)):
+        self.fig = Figure(figsize=figsize)
+        FigureCanvasAgg(self.fig)
+        self.axes = self.fig.subplots(1, 3)
+        self.images = []
+        self.missing = []
+        for ax, label in zip(self.axes, self.LABELS):
+            self.images.append(ax.imshow(np.zeros((2, 2)), origin="lower"))
+            self.missing.append(ax.text(0.5, 0.5, "Frame Unavailable", ha="center", va="center",
+                                        transform=ax.transAxes, visible=False))
+            ax.set_title(label)
+            ax.set_ylabel("Pixel Row Number")
+        self.title = self.fig.suptitle("", fontsize=14)
+        self.layout_key = None
+
+    def render(self, path, frames, column=0, row=0, title=""):
+        frames = np.asarray(frames, dtype=float)
+        ny, nx = frames.shape[1:]
+        extent = (column - 0.5, column + nx - 0.5, row - 0.5, row + ny - 0.5)
+        for frame, image, missing in zip(frames, self.images, self.missing):
+            limits = _limits(frame)
+            image.set_data(frame)
+            image.set_extent(extent)
+            image.set_visible(limits is not None)
+            missing.set_visible(limits is None)
+            if limits:
+                image.set_clim(*limits)
+        self.title.set_text(title)
+        # Tick labels only change width when the cutout shape/origin does
+        if self.layout_key != (extent, frames.shape):
+            self.fig.tight_layout()
+            self.layout_key = (extent, frames.shape)
+        self.fig.savefig(path)
+        return path
+
+
+@lru_cache(maxsize=None)
+def colormap_lut(cmap="plasma"):
+    """256-entry RGBA lookup table for a matplotlib colormap."""
+    return matplotlib.colormaps[cmap](np.linspace(0, 1, 256), bytes=True)
+
+
+def render_frame_png(path, frame, cmap="plasma", scale=THUMBNAIL_SCALE, vmin=None, vmax=None):
+    """Fast path: frame -> colormap LUT -> PNG, no axes or labels. NaN pixels are transparent."""
+    frame = np.asarray(frame, dtype=float)
+    finite = np.isfinite(frame)
+    limits = _limits(frame) or (0.0, 1.0)
+    lo = limits[0] if vmin is None else vmin
+    hi = limits[1] if vmax is None else vmax
+    span = hi - lo if hi > lo else 1.0
+
+    index = np.zeros(frame.shape, dtype=np.uint8)
+    index[finite] = np.clip((frame[finite] - lo) * (255.0 / span), 0, 255).astype(np.uint8)
+    rgba = colormap_lut(cmap)[index]
+    rgba[~finite] = 0
+    rgba = rgba[::-1]  # origin="lower", as in the figure renderers
+    if scale > 1:
+        rgba = rgba.repeat(scale, axis=0).repeat(scale, axis=1)
+    Image.fromarray(rgba, "RGBA").save(path, compress_level=PNG_COMPRESS_LEVEL)
+    return path
+
+
+# One renderer per layout per process, reused for every image it draws
+_renderers = {}
+
+
+def _renderer(kind):
+    if kind not in _renderers:
+        _renderers[kind] = FrameRenderer() if kind == "frame" else TriptychRenderer()
+    return _renderers[kind]
+
+
+def pool_workers(jobs, workers=RENDER_WORKERS):
+    """Processes render_many will use: 1 (in-process) unless spare CPUs and POOL_MIN_JOBS matplotlib jobs."""
+    workers = min(workers, os.cpu_count() or 1)
+    figures = sum(job["kind"] != "png" for job in jobs)
+    return workers if workers > 1 and figures >= POOL_MIN_JOBS else 1
+
+
+def render_job(job):
+    """
+    Render one job dict: {"kind": "frame" | "triptych" | "png", "path": ...}
+    plus the arguments of the matching renderer. Returns the path, or None
+    if rendering failed.
+    """
+    job = dict(job)
+    kind = job.pop("kind")
+    path = job["path"]
+    # Drawn to a temporary file and renamed, so an interrupted run never
+    # leaves a truncated image behind (the extension still picks the format)
+    root, ext = os.path.splitext(path)
+    job["path"] = f"{root}.{os.getpid()}.tmp{ext}"
+    try:
+        with metrics.span("render", kind=kind):
+            if kind == "png":
+                render_frame_png(**job)
+            else:
+                _renderer(kind).render(**job)
+        os.replace(job["path"], path)
+        return path
+    except Exception as e:
+        print(f"❌ Render failed for {path}: {e}")
+        metrics.count_error(e, stage="render")
+        if os.path.exists(job["path"]):
+            os.remove(job["path"])
+        return None
+
+
+def render_many(jobs, workers=RENDER_WORKERS):
+    """
+    Render jobs, across a process pool when it helps (see pool_workers);
+    returns output paths in job order.
+    """
+    jobs = list(jobs)
+    workers = pool_workers(jobs, workers)
+    if workers <= 1:
+        return [render_job(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(render_job, jobs, chunksize=CHUNK_SIZE))
+
+
+def render_sky_map(df, path, title="🌠 TICs with AI-Predicted Dips on the Sky", ra="ra", dec="dec"):
+    """RA/Dec scatter colored by predicted label; `path` may also be a binary file object."""
+    fig = Figure(figsize=(12, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    for label in df["predicted_label"].dropna().unique():
+        subset = df[df["predicted_label"] == label]
+        ax.scatter(subset[ra], subset[dec], label=label, alpha=0.7,
+                   s=30, edgecolor="k", color=LABEL_COLORS.get(label, "blue"))
+    ax.invert_xaxis()  # RA increases right to left on sky maps
+    ax.set_xlabel("Right Ascension (deg)")
+    ax.set_ylabel("Declination (deg)")
+    ax.set_title(title)
+    ax.legend()
+    ax.grid(True)
+    fig.tight_layout()
+    if isinstance(path, str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fig.savefig(path, format="png")
+    return path
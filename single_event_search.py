@@ -0,0 +1,169 @@
+# === Single-Event Search ===
+# Matched-filter replacement for the fixed flux threshold.
+#
+# The detrended flux deficit (1 - flux) is correlated with box and trapezoid
+# kernels over a grid of durations by FFT convolution, O(N log N) per
+# kernel. For a kernel s the least-squares depth at each cadence is
+# sum(s * r) / sum(s^2), and dividing by the running robust (MAD) noise
+# times 1 / sqrt(sum(s^2)) gives an SNR time series. Each cadence keeps its
+# best kernel; SNR peaks above SNR_THRESHOLD become events, weaker peaks
+# inside a stronger event's window are dropped as its side lobes. Events are
+# reported in the find_dips schema so features, labeling and the catalog
+# take them unchanged. Continuous segments are searched separately, so no
+# kernel reaches across a data gap.
+
+import numpy as np
+from scipy.ndimage import median_filter
+from scipy.signal import fftconvolve
+from detrending import segment_bounds, GAP_DAYS
+
+DURATIONS_DAYS = tuple(np.geomspace(0.01, 0.25, 10))  # about sqrt(2) apart, up to a third of the detrending window
+KERNELS = ("box", "trapezoid")
+INGRESS_FRACTION = 0.25  # of the trapezoid's duration, on each side
+SNR_THRESHOLD = 7.0
+NOISE_WINDOW_DAYS = 1.0  # running MAD window for the noise level
+MIN_COVERAGE = 0.5  # share of a kernel that must lie on data (edges of segments)
+BASELINE = 1.0  # reported as the events' "threshold": depths are measured from the baseline
+MAD_TO_SIGMA = 1.4826
+
+
+def kernel(kind, length):
+    """Unit-depth kernel of `length` cadences: "box", or "trapezoid" with linear ingress/egress."""
+    if kind == "box" or length < 4:
+        return np.ones(length)
+    ramp = max(1, int(round(INGRESS_FRACTION * length)))
+    shape = np.ones(length)
+    edge = np.arange(1, ramp + 1) / (ramp + 1)
+    shape[:ramp] = edge
+    shape[-ramp:] = edge[::-1]
+    return shape
+
+
+def running_noise(residual, size):
+    """Robust scatter around each cadence: MAD of the residual over a `size`-cadence window."""
+    size = max(3, min(size, len(residual)))
+    center = median_filter(residual, size=size, mode="mirror")
+    return MAD_TO_SIGMA * median_filter(np.abs(residual - center), size=size, mode="mirror")
+
+
+def _segment_snr(time, residual, durations, kernels):
+    # Best (snr, depth, kernel length, kernel index) at every cadence of one segment
+    n = len(residual)
+    cadence = np.median(np.diff(time)) if n > 1 else 1.0
+    noise = running_noise(residual, int(round(NOISE_WINDOW_DAYS / cadence)))
+    noise = np.maximum(noise, np.finfo(float).tiny)
+    ones = np.ones(n)
+
+    best = np.full(n, -np.inf)
+    depth = np.zeros(n)
+    length = np.ones(n, dtype=int)
+    kind = np.zeros(n, dtype=int)
+    lengths = sorted({max(1, int(round(d / cadence))) for d in durations})
+    for size in lengths:
+        if size > n:
+            continue
+        for k, name in enumerate(kernels):
+            shape = kernel(name, size)
+            # Correlation with a symmetric kernel is convolution; "same" keeps it centered
+            num = fftconvolve(residual, shape, mode="same")
+            den = fftconvolve(ones, shape ** 2, mode="same")
+            covered = den >= MIN_COVERAGE * np.sum(shape ** 2)
+            den = np.maximum(den, np.finfo(float).tiny)
+            snr = np.where(covered, num / (noise * np.sqrt(den)), -np.inf)
+            better = snr > best
+            best[better] = snr[better]
+            depth[better] = num[better] / den[better]
+            length[better] = size
+            kind[better] = k
+    return best, depth, length, kind
+
+
+def snr_series(time, flux, durations=DURATIONS_DAYS, kernels=KERNELS, gap=GAP_DAYS):
+    """
+    Best matched-filter SNR at every cadence over all durations and kernels,
+    with the fitted depth, kernel length (cadences) and kernel index behind
+    it. NaN flux cadences get SNR -inf.
+    """
+    time = np.asarray(time, dtype=float)
+    flux = np.ma.filled(np.ma.asarray(flux, dtype=float), np.nan)
+    n = len(flux)
+    snr = np.full(n, -np.inf)
+    depth = np.zeros(n)
+    length = np.ones(n, dtype=int)
+    kind = np.zeros(n, dtype=int)
+
+    # Missing cadences are dropped, not zero-filled, so they never dilute a kernel
+    finite = np.flatnonzero(np.isfinite(time) & np.isfinite(flux))
+    t, r = time[finite], BASELINE - flux[finite]
+    for start, stop in segment_bounds(t, gap):
+        idx = finite[start:stop]
+        snr[idx], depth[idx], length[idx], kind[idx] = _segment_snr(t[start:stop], r[start:stop], durations, kernels)
+    return {"snr": snr, "depth": depth, "length": length, "kernel": kind, "finite": finite}
+
+
+def _window_argmin(values, starts, ends):
+    # Index of the first minimum of values[start:end] for each window, one reduceat
+    lengths = ends - starts
+    if not len(starts):
+        return np.empty(0, dtype=int)
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    positions = np.repeat(starts - offsets, lengths) + np.arange(lengths.sum())
+    window_min = np.minimum.reduceat(values[positions], offsets)
+    at_min = np.where(values[positions] == np.repeat(window_min, lengths), positions, len(values))
+    return np.minimum.reduceat(at_min, offsets)
+
+
+def search_events(time, flux, snr_threshold=SNR_THRESHOLD, durations=DURATIONS_DAYS, kernels=KERNELS,
+                  gap=GAP_DAYS):
+    """
+    Single events in a detrended, normalized light curve, as a columnar dict
+    in the find_dips schema (start/end/min index and time, depth, duration,
+    threshold = BASELINE) plus mid_time, search_snr and kernel. Each
+    local SNR maximum above snr_threshold not inside a stronger event's
+    window gives one event, fitted with the kernel that peaked there.
+    """
+    time = np.asarray(time, dtype=float)
+    flux = np.ma.filled(np.ma.asarray(flux, dtype=float), np.nan)
+    series = snr_series(time, flux, durations, kernels, gap)
+    finite = series["finite"]
+    snr = series["snr"][finite]
+
+    # Local SNR maxima above the cut, strongest first; each claims its fitted
+    # window (clipped to its segment) and weaker maxima overlapping a claimed
+    # window are side lobes of the same event
+    padded = np.concatenate(([-np.inf], snr, [-np.inf]))
+    candidates = np.flatnonzero((snr > snr_threshold) & (snr >= padded[:-2]) & (snr >= padded[2:]))
+    candidates = candidates[np.argsort(-snr[candidates], kind="stable")]
+    size = series["length"][finite][candidates]
+    bounds = np.asarray(segment_bounds(time[finite], gap), dtype=int).reshape(-1, 2)
+    seg = np.searchsorted(bounds[:, 1], candidates, side="right")
+    lo = np.maximum(candidates - size // 2, bounds[seg, 0])
+    hi = np.minimum(lo + size, bounds[seg, 1])
+    claimed = np.zeros(len(snr), dtype=bool)
+    keep = np.zeros(len(candidates), dtype=bool)
+    for i, (a, b) in enumerate(zip(lo, hi)):
+        if not claimed[a:b].any():
+            claimed[a:b] = True
+            keep[i] = True
+    order = np.argsort(candidates[keep])
+    peaks, lo, hi = candidates[keep][order], lo[keep][order], hi[keep][order]
+    peak_snr = snr[peaks]
+
+    # Lowest flux cadence inside each window, as find_dips reports it
+    min_index = finite[_window_argmin(flux[finite], lo, hi)]
+    start_index, end_index, peak_index = finite[lo], finite[hi - 1], finite[peaks]
+
+    names = np.asarray(kernels)
+    return {
+        "threshold": np.full(len(peaks), BASELINE),
+        "start_index": start_index,
+        "end_index": end_index,
+        "start_time": time[start_index],
+        "end_time": time[end_index],
+        "depth": series["depth"][peak_index],
+        "duration": time[end_index] - time[start_index],
+        "min_index": min_index,
+        "mid_time": time[peak_index],
+        "search_snr": peak_snr,
+        "kernel": names[series["kernel"][peak_index]],
+    }
@@ -0,0 +1,176 @@
+# === Sky Index ===
+# Spatial queries over TIC positions: batch cone searches, k nearest
+# neighbours, field grouping and the blend/contamination check used by
+# discovery scoring.
+#
+# Stars are stored as unit vectors in a KD-tree, so a cone of angular
+# radius r is a Euclidean ball of chord 2*sin(r/2): no RA wrap-around or
+# pole special cases, and every query is a batch call into scipy.
+
+import argparse
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from artifact_io import read_table, write_table
+
+TESS_PIXEL_ARCSEC = 21.0
+CONTAMINATION_RADIUS_PIX = 2.0  # TESS PSF wings reach ~2 pixels
+MAX_CONTAMINATION = 0.1  # neighbour/target flux ratio above which a dip may be a blend
+FIELD_RADIUS_DEG = 0.5  # friends-of-friends linking length for field grouping
+LEAF_SIZE = 32
+WORKERS = -1  # all cores for batch queries
+
+
+def coordinate_columns(df):
+    """RA/Dec column names; merges may have suffixed them with _x/_y."""
+    ra = next((c for c in ("ra", "ra_x", "ra_y") if c in df.columns), None)
+    dec = next((c for c in ("dec", "dec_x", "dec_y") if c in df.columns), None)
+    return ra, dec
+
+
+def unit_vectors(ra, dec):
+    ra = np.radians(np.asarray(ra, dtype=float))
+    dec = np.radians(np.asarray(dec, dtype=float))
+    cos_dec = np.cos(dec)
+    return np.column_stack((cos_dec * np.cos(ra), cos_dec * np.sin(ra), np.sin(dec)))
+
+
+def chord(radius_deg):
+    return 2 * np.sin(np.radians(radius_deg) / 2)
+
+
+def chord_to_deg(distance):
+    return np.degrees(2 * np.arcsin(np.clip(distance / 2, 0, 1)))
+
+
+def pixels_to_deg(pixels):
+    return pixels * TESS_PIXEL_ARCSEC / 3600
+
+
+class SkyIndex:
+    """KD-tree over star positions (degrees); query results are row positions into ra/dec."""
+
+    def __init__(self, ra, dec):
+        xyz = unit_vectors(ra, dec)
+        self.valid = np.flatnonzero(np.isfinite(xyz).all(axis=1))  # stars without positions are left out
+        self.tree = cKDTree(xyz[self.valid], leafsize=LEAF_SIZE, balanced_tree=False)
+
+    def __len__(self):
+        return len(self.valid)
+
+    def cone_search(self, ra, dec, radius_deg):
+        """For each (ra, dec) centre, an array of rows within radius_deg."""
+        hits = self.tree.query_ball_point(unit_vectors(ra, dec), chord(radius_deg), workers=WORKERS,
+                                          return_sorted=True)
+        return [self.valid[np.asarray(h, dtype=int)] for h in np.atleast_1d(hits)]
+
+    def cone_count(self, ra, dec, radius_deg):
+        """Number of stars within radius_deg of each centre."""
+        return self.tree.query_ball_point(unit_vectors(ra, dec), chord(radius_deg), workers=WORKERS,
+                                          return_length=True)
+
+    def pairs_within(self, ra, dec, radius_deg):
+        """
+        Every (centre, star) pair closer than radius_deg as flat arrays
+        (centre positions, star rows, separation in degrees). Centres
+        without a position pair with nothing.
+        """
+        xyz = unit_vectors(ra, dec)
+        placed = np.flatnonzero(np.isfinite(xyz).all(axis=1))
+        centres = cKDTree(xyz[placed], leafsize=LEAF_SIZE)
+        pairs = centres.sparse_distance_matrix(self.tree, chord(radius_deg), output_type="ndarray")
+        return placed[pairs["i"]], self.valid[pairs["j"]], chord_to_deg(pairs["v"])
+
+    def nearest(self, ra, dec, k=1):
+        """(separation in degrees, rows) of the k nearest stars to each centre; rows are -1 past the end."""
+        distance, idx = self.tree.query(unit_vectors(ra, dec), k=k, workers=WORKERS)
+        found = idx < len(self.valid)
+        rows = np.where(found, self.valid[np.minimum(idx, len(self.valid) - 1)], -1)
+        return np.where(found, chord_to_deg(np.where(found, distance, 0)), np.inf), rows
+
+
+def field_groups(ra, dec, radius_deg=FIELD_RADIUS_DEG):
+    """
+    Friends-of-friends group id per star: stars chained by separations
+    < radius_deg share a field. Stars without a position are fields of one.
+    """
+    xyz = unit_vectors(ra, dec)
+    placed = np.flatnonzero(np.isfinite(xyz).all(axis=1))
+    pairs = cKDTree(xyz[placed], leafsize=LEAF_SIZE).query_pairs(chord(radius_deg), output_type="ndarray")
+    pairs = placed[pairs]
+    graph = coo_matrix((np.ones(len(pairs), dtype=bool), (pairs[:, 0], pairs[:, 1])), shape=(len(xyz),) * 2)
+    return connected_components(graph, directed=False)[1]
+
+
+def _stars(df):
+    """tic_id, ra, dec, Tmag of one row per TIC."""
+    if "tic_id" not in df.columns and "ID" in df.columns:  # raw TIC catalog rows
+        df = df.rename(columns={"ID": "tic_id"})
+    ra, dec = coordinate_columns(df)
+    tmag = next((c for c in ("Tmag", "Tmag_x", "Tmag_y") if c in df.columns), None)
+    if ra is None or dec is None or tmag is None:
+        return None
+    stars = df[["tic_id", ra, dec, tmag]].drop_duplicates("tic_id")
+    stars.columns = ["tic_id", "ra", "dec", "Tmag"]
+    return stars.reset_index(drop=True)
+
+
+def contamination(targets, catalog=None, radius_pix=CONTAMINATION_RADIUS_PIX, max_ratio=MAX_CONTAMINATION):
+    """
+    Blend check per target TIC. Every catalog star within radius_pix TESS
+    pixels (other than the target itself) adds its flux relative to the
+    target's, 10^(-0.4 * (Tmag_neighbour - Tmag_target)). Returns tic_id,
+    n_neighbors, contamination_ratio, nearest_neighbor_arcsec and
+    contaminated (ratio > max_ratio). Catalog defaults to the targets
+    themselves, i.e. candidates blending with each other. Targets without
+    a position get NaN counts/ratios and are not flagged.
+    """
+    targets = _stars(targets)
+    catalog = targets if catalog is None else _stars(catalog)
+    if targets is None or catalog is None:
+        return None
+
+    index = SkyIndex(catalog["ra"], catalog["dec"])
+    t, c, sep = index.pairs_within(targets["ra"], targets["dec"], pixels_to_deg(radius_pix))
+    other = catalog["tic_id"].to_numpy()[c] != targets["tic_id"].to_numpy()[t]
+    t, c, sep = t[other], c[other], sep[other]
+
+    dmag = catalog["Tmag"].to_numpy(dtype=float)[c] - targets["Tmag"].to_numpy(dtype=float)[t]
+    flux = np.nan_to_num(10 ** (-0.4 * dmag))  # neighbours or targets without Tmag add nothing
+    n = len(targets)
+    ratio = np.bincount(t, weights=flux, minlength=n)
+    nearest = np.full(n, np.inf)
+    np.minimum.at(nearest, t, sep * 3600)
+    placed = np.isfinite(unit_vectors(targets["ra"], targets["dec"])).all(axis=1)
+    return pd.DataFrame({
+        "tic_id": targets["tic_id"],
+        "n_neighbors": np.where(placed, np.bincount(t, minlength=n), np.nan),
+        "contamination_ratio": np.where(placed, ratio, np.nan),
+        "nearest_neighbor_arcsec": np.where(np.isfinite(nearest), nearest, np.nan),
+        "contaminated": placed & (ratio > max_ratio),
+    })
+
+
+OUTPUT_FILE = "exoasteroid_output/contamination_flags.csv"
+
+
+def run(metadata_file, catalog_file=None, radius_pix=CONTAMINATION_RADIUS_PIX):
+    catalog = read_table(catalog_file) if catalog_file else None
+    flags = contamination(read_table(metadata_file), catalog, radius_pix)
+    if flags is None:
+        print("❌ Need tic_id, ra, dec and Tmag columns.")
+        return
+    write_table(flags, OUTPUT_FILE)
+    print(f"🔭 {int(flags['contaminated'].sum())} of {len(flags)} TICs have bright neighbours within "
+          f"{radius_pix:g} px. Saved to: {OUTPUT_FILE}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Flag TICs with bright neighbours that could blend their dips")
+    parser.add_argument("--metadata", default="exoasteroid_output/tic_metadata.csv")
+    parser.add_argument("--catalog", help="wider star catalog (tic_id/ID, ra, dec, Tmag) to search for neighbours")
+    parser.add_argument("--radius-pix", type=float, default=CONTAMINATION_RADIUS_PIX)
+    args = parser.parse_args()
+    run(args.metadata, args.catalog, args.radius_pix)
@@ -1,34 +1,128 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
+import numpy as np
 import plotly.express as px
 import io
+from artifact_io import read_table
+from render import render_sky_map
+from dashboard_data import FilterIndex, file_stamp, page_count, page_rows, sample_rows, PAGE_SIZE, \
+    MAX_PLOT_POINTS
+from sky_index import coordinate_columns
 
 st.set_page_config(page_title="🪐 ExoAsteroid Explorer", layout="wide")
 st.title("🔭 ExoAsteroid Dip Discovery Dashboard")
 
-# === Load merged data ===
 DATA_FILE = "exoasteroid_output/merged_dip_metadata.csv"
+SCORED_FILE = "exoasteroid_output/discovery_scores_with_radius.csv"
+PAGE_SIZES = [50, PAGE_SIZE, 500]
+
+
+# === Cached data layer ===
+# Tables and their filter indexes are loaded once and shared by every session
+# (cache_resource hands out the same object instead of unpickling a copy per
+# rerun); the file stamp is part of the key, so a rewritten artifact is
+# reloaded on the next interaction and the stale entry is evicted.
+
+@st.cache_resource(max_entries=2, show_spinner="📂 Loading dips...")
+def load_dips(path, stamp):
+    df = read_table(path)
+    index = FilterIndex(df, categorical=["tic_id", "predicted_label", "exofop_status"],
+                        numeric=["Tmag", "object_radius_km"])
+    return df, index
+
+
+@st.cache_resource(max_entries=2, show_spinner="📂 Loading discovery scores...")
+def load_scores(path, stamp):
+    df = read_table(path)
+    index = FilterIndex(df, categorical=["discovery_label", "periodic", "exofop_status"],
+                        numeric=["confidence_score", "Tmag", "Tmag_x", "Tmag_y"])
+    return df, index
+
+
+@st.cache_data(max_entries=64)
+def filtered_rows(loader_name, path, stamp, isin, ranges):
+    """Memoized row positions for one combination of filters (args are the cache key)."""
+    _, index = LOADERS[loader_name](path, stamp)
+    return index.rows(dict(isin), dict(ranges))
+
+
+@st.cache_data(max_entries=16)
+def csv_bytes(loader_name, path, stamp, isin, ranges):
+    df, _ = LOADERS[loader_name](path, stamp)
+    rows = filtered_rows(loader_name, path, stamp, isin, ranges)
+    return df.iloc[rows].to_csv(index=False).encode()
+
+
+@st.cache_data(max_entries=16)
+def static_sky_map(path, stamp, isin, ranges):
+    df, index = load_dips(path, stamp)
+    rows = sky_sample(index, filtered_rows("dips", path, stamp, isin, ranges))
+    ra, dec = coordinate_columns(df)
+    buf = io.BytesIO()
+    render_sky_map(df.iloc[rows], buf, title="Static Sky Map", ra=ra, dec=dec)
+    return buf.getvalue()
+
+
+LOADERS = {"dips": load_dips, "scores": load_scores}
+
+
+def sky_sample(index, rows):
+    """Rows to plot: a label-stratified sample once there are more than MAX_PLOT_POINTS."""
+    codes = index.codes["predicted_label"][0][rows] if "predicted_label" in index.codes else None
+    return sample_rows(rows, codes, MAX_PLOT_POINTS)
+
+
+def frozen(filters):
+    """Filters as a hashable, order-independent cache key."""
+    return tuple(sorted((col, tuple(value) if value is not None else None) for col, value in filters.items()))
+
+
+def paged_table(df, rows, key, columns, index=None, status_col=None):
+    """Server-side pagination: only the selected page is sliced, styled and sent."""
+    left, right = st.columns([1, 3])
+    page_size = left.selectbox("Rows per page", PAGE_SIZES, index=1, key=f"{key}_size")
+    pages = page_count(len(rows), page_size)
+    # Keyed on the page count so a narrower filter starts again from page 1
+    page = right.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, value=1,
+                              key=f"{key}_page_{pages}")
+    visible = page_rows(rows, page, page_size)
+    page_df = df.iloc[visible][columns]
+    if index is not None and status_col in index.codes:
+        colors = index.colors(status_col, visible)
+        css = np.where(colors != "", "background-color: " + colors.astype(str), "")
+        styles = pd.DataFrame(np.repeat(css[:, None], len(columns), axis=1), index=page_df.index, columns=columns)
+        st.dataframe(page_df.style.apply(lambda _: styles, axis=None), use_container_width=True)
+    else:
+        st.dataframe(page_df, use_container_width=True)
+
+
+def download(label, loader_name, path, stamp, isin, ranges, file_name):
+    # The CSV is only built on request, and then cached per filter combination
+    if st.button(f"📦 Prepare {file_name}", key=f"prepare_{file_name}"):
+        st.download_button(label, data=csv_bytes(loader_name, path, stamp, isin, ranges), file_name=file_name)
+
+
+# === Load merged data ===
 try:
-    df = pd.read_csv(DATA_FILE)
+    stamp = file_stamp(DATA_FILE)
 except FileNotFoundError:
     st.error("❌ Merged data not found. Please run the merge script first.")
     st.stop()
+df, index = load_dips(DATA_FILE, stamp)
 
 # === Sidebar filters ===
 with st.sidebar:
     st.header("🎛️ Filter Options")
 
-    # TIC filters
-    tics = sorted(df["tic_id"].unique())
-    selected_tics = st.multiselect("Select TICs", tics, default=tics)
+    # TIC filters (none selected = all TICs)
+    selected_tics = st.multiselect("Select TICs (empty = all)", index.options("tic_id"))
 
     # Label filter
-    labels = df["predicted_label"].dropna().unique()
+    labels = index.options("predicted_label")
     selected_labels = st.multiselect("AI Labels", labels, default=labels)
 
     # ExoFOP status filter
-    statuses = df["exofop_status"].dropna().unique()
+    statuses = index.options("exofop_status")
     selected_statuses = st.multiselect("ExoFOP Status", statuses, default=statuses)
 
     # Tmag brightness filter
@@ -44,133 +138,109 @@ with st.sidebar:
     earth_only = st.checkbox("🌍 Only Earth-sized (5000–15000 km)", value=False)
 
 # === Apply filters ===
-filtered_df = df[
-    df["tic_id"].isin(selected_tics) &
-    df["predicted_label"].isin(selected_labels) &
-    df["exofop_status"].isin(selected_statuses)
-]
-
-if bright_only and "Tmag" in filtered_df.columns:
-    filtered_df = filtered_df[filtered_df["Tmag"] < 12]
-
-if "object_radius_km" in filtered_df.columns:
-    filtered_df = filtered_df[filtered_df["object_radius_km"].between(*radius_range)]
-    if moon_only:
-        filtered_df = filtered_df[filtered_df["object_radius_km"].between(500, 3000)]
-    if earth_only:
-        filtered_df = filtered_df[filtered_df["object_radius_km"].between(5000, 15000)]
-
-# === Highlight ExoFOP status ===
-def highlight_status(row):
-    color = ""
-    if "Not Found" in row["exofop_status"]:
-        color = "#ffcccc"
-    elif "No Planet" in row["exofop_status"]:
-        color = "#fff7cc"
-    elif "Known Planet" in row["exofop_status"]:
-        color = "#ccffcc"
-    return [f"background-color: {color}"] * len(row)
+# Moon/Earth toggles narrow the slider range (both on -> nothing, as before)
+lo, hi = radius_range
+if moon_only:
+    lo, hi = max(lo, 500), min(hi, 3000)
+if earth_only:
+    lo, hi = max(lo, 5000), min(hi, 15000)
+dip_isin = frozen({
+    "tic_id": selected_tics or None,
+    "predicted_label": selected_labels,
+    "exofop_status": selected_statuses,
+})
+dip_ranges = frozen({
+    "Tmag": (-np.inf, 12, False) if bright_only else None,
+    "object_radius_km": (lo, hi),
+})
+rows = filtered_rows("dips", DATA_FILE, stamp, dip_isin, dip_ranges)
 
 st.subheader("📋 Dip Results")
-columns_to_show = [
-    "tic_id", "predicted_label", "exofop_status", "dip_depth",
-    "star_radius_rsun", "object_radius_km", "Tmag", "Teff"
-]
 available_cols = [col for col in [
     "tic_id", "predicted_label", "exofop_status", "dip_depth",
     "star_radius_rsun", "object_radius_km", "Tmag", "Teff"
-] if col in filtered_df.columns]
-
-st.dataframe(
-    filtered_df[available_cols].head(500).style.apply(highlight_status, axis=1),
-    use_container_width=True
-)
-st.download_button("📥 Download filtered results", data=filtered_df.to_csv(index=False), file_name="filtered_dips.csv")
+] if col in df.columns]
+st.markdown(f"📊 **{len(rows):,}** of {len(df):,} dips match")
+paged_table(df, rows, "dips", available_cols, index, status_col="exofop_status")
+download("📥 Download filtered results", "dips", DATA_FILE, stamp, dip_isin, dip_ranges, "filtered_dips.csv")
 
 # === Sky Map Tabs ===
 st.markdown("---")
 st.header("🗺️ Sky Map of Candidate TICs")
-tab1, tab2 = st.tabs(["🖼️ Static Sky Map", "🌐 Interactive Plotly Map"])
-
-with tab1:
-    fig, ax = plt.subplots(figsize=(10, 5))
-    for label in filtered_df["predicted_label"].unique():
-        subset = filtered_df[filtered_df["predicted_label"] == label]
-        ax.scatter(subset["ra_x"], subset["dec_x"], label=label, s=40, alpha=0.7, edgecolors="black")
-    ax.set_title("Static Sky Map")
-    ax.set_xlabel("RA (°)")
-    ax.set_ylabel("Dec (°)")
-    ax.invert_xaxis()
-    ax.legend()
-    buf = io.BytesIO()
-    fig.savefig(buf, format="png")
-    st.pyplot(fig)
-    st.download_button("📥 Download Sky Map Image", data=buf.getvalue(), file_name="static_sky_map.png", mime="image/png")
-
-with tab2:
-    hover_columns = ["tic_id", "Tmag_x", "Teff_x", "rad", "object_radius_km", "exofop_status"]
-    hover_data = [col for col in hover_columns if col in filtered_df.columns]
-    fig_plotly = px.scatter(
-        filtered_df,
-        x="ra_x", y="dec_x",
-        color="predicted_label",
-        symbol="exofop_status",
-        hover_name="tic_id",
-        hover_data=hover_data,
-        title="Interactive Sky Map of Predicted Dips"
-    )
-    fig_plotly.update_layout(xaxis_title="RA", yaxis_title="Dec", xaxis_autorange="reversed")
-    st.plotly_chart(fig_plotly, use_container_width=True)
+ra_col, dec_col = coordinate_columns(df)
+if ra_col is None or dec_col is None:
+    st.warning("⚠️ No RA/Dec columns in the merged data.")
+else:
+    sky_rows = sky_sample(index, rows)
+    if len(sky_rows) < len(rows):
+        st.caption(f"Showing a {len(sky_rows):,}-point sample of {len(rows):,} dips (every label kept)")
+    tab1, tab2 = st.tabs(["🖼️ Static Sky Map", "🌐 Interactive Plotly Map"])
+
+    with tab1:
+        png = static_sky_map(DATA_FILE, stamp, dip_isin, dip_ranges)
+        st.image(png, use_container_width=True)
+        st.download_button("📥 Download Sky Map Image", data=png, file_name="static_sky_map.png", mime="image/png")
+
+    with tab2:
+        sky = df.iloc[sky_rows]
+        hover_columns = ["tic_id", "Tmag", "Teff", "rad", "object_radius_km", "exofop_status"]
+        hover_data = [col for col in hover_columns if col in sky.columns]
+        fig_plotly = px.scatter(
+            sky,
+            x=ra_col, y=dec_col,
+            color="predicted_label",
+            symbol="exofop_status",
+            hover_name="tic_id",
+            hover_data=hover_data,
+            render_mode="webgl",  # scattergl: GPU-drawn, stays responsive at MAX_PLOT_POINTS
+            title="Interactive Sky Map of Predicted Dips"
+        )
+        fig_plotly.update_layout(xaxis_title="RA", yaxis_title="Dec", xaxis_autorange="reversed")
+        st.plotly_chart(fig_plotly, use_container_width=True)
 
 # === Discovery Score Section ===
 st.markdown("---")
 st.header("🪐 Discovery Candidates (Scored)")
 
-SCORED_FILE = "exoasteroid_output/discovery_scores_with_radius.csv"
 try:
-    df_scores = pd.read_csv(SCORED_FILE)
+    score_stamp = file_stamp(SCORED_FILE)
 except FileNotFoundError:
     st.warning("⚠️ No discovery score file found. Run `discovery_scoring.py` first.")
-    df_scores = None
+    score_stamp = None
 
-if df_scores is not None:
+if score_stamp is not None:
+    df_scores, score_index = load_scores(SCORED_FILE, score_stamp)
     st.subheader("🎯 Filter by Discovery Score")
 
-    score_labels = df_scores["discovery_label"].dropna().unique()
-    selected_labels = st.multiselect("Select candidate types", score_labels, default=score_labels)
+    score_labels = score_index.options("discovery_label")
+    selected_score_labels = st.multiselect("Select candidate types", score_labels, default=score_labels)
 
     score_min = st.slider("Minimum Confidence Score", 0, 100, 50)
     only_bright = st.checkbox("🌟 Only bright stars (Tmag < 12)", value=False)
     only_periodic = st.checkbox("📍 Only periodic candidates", value=False)
 
-    filtered_candidates = df_scores[
-        (df_scores["discovery_label"].isin(selected_labels)) &
-        (df_scores["confidence_score"] >= score_min)
-    ]
-
-    if only_bright and "Tmag" in filtered_candidates.columns:
-        filtered_candidates = filtered_candidates[filtered_candidates["Tmag"] < 12]
-
-    if only_periodic and "periodic" in filtered_candidates.columns:
-        filtered_candidates = filtered_candidates[filtered_candidates["periodic"] == True]
-
-    st.markdown(f"📊 Showing **{len(filtered_candidates)}** candidates")
-    tmag_col = "Tmag_x" if "Tmag_x" in filtered_candidates.columns else (
-    "Tmag_y" if "Tmag_y" in filtered_candidates.columns else None
-    )
+    tmag_col = next((c for c in ("Tmag", "Tmag_x", "Tmag_y") if c in df_scores.columns), None)
+    score_isin = frozen({
+        "discovery_label": selected_score_labels,
+        "periodic": [True] if only_periodic else None,
+    })
+    score_ranges = frozen({
+        "confidence_score": (score_min, np.inf),
+        tmag_col or "Tmag": (-np.inf, 12, False) if only_bright and tmag_col else None,
+    })
+    candidate_rows = filtered_rows("scores", SCORED_FILE, score_stamp, score_isin, score_ranges)
+
+    st.markdown(f"📊 Showing **{len(candidate_rows):,}** candidates")
     columns_to_show = [
-    "tic_id", "predicted_label", "exofop_status", "dip_depth",
-    "star_radius_rsun", "object_radius_km", tmag_col,
-    "periodic", "discovery_label"
+        "tic_id", "predicted_label", "exofop_status", "dip_depth",
+        "star_radius_rsun", "object_radius_km", tmag_col,
+        "periodic", "discovery_label"
     ]
-    columns_to_show = [col for col in columns_to_show if col is not None]
-    st.dataframe(filtered_candidates[columns_to_show].head(500), use_container_width=True)
-
-    st.download_button(
-        "📥 Download candidate list",
-        data=filtered_candidates.to_csv(index=False),
-        file_name="top_discovery_candidates.csv"
-    )
+    columns_to_show = [col for col in columns_to_show if col is not None and col in df_scores.columns]
+    paged_table(df_scores, candidate_rows, "scores", columns_to_show)
+
+    download("📥 Download candidate list", "scores", SCORED_FILE, score_stamp, score_isin, score_ranges,
+             "top_discovery_candidates.csv")
 
 st.markdown("---")
 st.caption("🚀 Built by Pinkey Bartake for the ExoAsteroids project")
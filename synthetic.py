@@ -0,0 +1,200 @@
+# === Synthetic TESS Data ===
+# Light curves and pipeline tables with known contents, so every stage can be
+# timed and checked without MAST.
+#
+# Light curves follow the TESS sector layout (two ~13.7-day orbits with a
+# downlink gap), with white noise, random data dropouts, smooth stellar
+# variability, periodic transits and single asteroid-like dips. What was
+# injected is returned alongside the data, which is what injection_recovery
+# scores detections against.
+
+import numpy as np
+import pandas as pd
+
+CADENCE_DAYS = 2.0 / 60 / 24
+SECTOR_DAYS = 27.4
+ORBIT_GAP_DAYS = 1.0  # downlink gap in the middle of each sector
+START_TIME = 1325.0  # BTJD of sector 1
+
+# Defaults for synthetic_lightcurve(); override any of them per call
+LIGHTCURVE_DEFAULTS = {
+    "n_sectors": 1,
+    "cadence": CADENCE_DAYS,
+    "noise": 0.001,  # white noise sigma, relative flux
+    "dropout_fraction": 0.002,  # cadences set to NaN (quality-flagged)
+    "variability_amplitude": 0.0,  # sinusoidal stellar variability
+    "variability_period": (1.0, 10.0),  # days, drawn uniformly
+    "transit": None,  # {"period", "duration", "depth"} for a periodic box transit
+    "n_dips": 0,  # single, V-shaped asteroid-like dips
+    "dip_depth": (0.003, 0.03),
+    "dip_duration": (0.01, 0.12),  # days
+}
+
+LABELS = ["asteroid", "planet", "noise"]
+EXOFOP_STATUSES = ["❌ Not Found", "🟡 Found (No Planet Listed)", "✅ Known Planet"]
+INJECTION_COLUMNS = ["kind", "start_time", "end_time", "depth", "duration", "period"]
+
+
+def sector_times(n_sectors=1, cadence=CADENCE_DAYS, start=START_TIME):
+    """Timestamps for consecutive sectors, each with its mid-sector downlink gap."""
+    orbit = (SECTOR_DAYS - ORBIT_GAP_DAYS) / 2
+    parts = []
+    for s in range(n_sectors):
+        t0 = start + s * SECTOR_DAYS
+        parts.append(t0 + np.arange(0, orbit, cadence))
+        parts.append(t0 + orbit + ORBIT_GAP_DAYS + np.arange(0, orbit, cadence))
+    return np.concatenate(parts)
+
+
+def _box_or_v(time, centre, duration, depth, shape):
+    """Flux decrement of one event: flat-bottomed box or linear V."""
+    phase = np.abs(time - centre) / (duration / 2)
+    inside = phase <= 1
+    if shape == "box":
+        return np.where(inside, depth, 0.0)
+    return np.where(inside, depth * (1 - phase), 0.0)
+
+
+def synthetic_lightcurve(seed=0, **overrides):
+    """
+    One TESS-like light curve. Returns {"time", "flux", "flux_err",
+    "injections"}, where injections is a DataFrame of INJECTION_COLUMNS
+    with one row per transit or dip actually placed on the data.
+    """
+    spec = {**LIGHTCURVE_DEFAULTS, **overrides}
+    rng = np.random.default_rng(seed)
+    time = sector_times(spec["n_sectors"], spec["cadence"])
+    flux = 1 + rng.normal(0, spec["noise"], len(time))
+    injections = []
+
+    if spec["variability_amplitude"]:
+        period = rng.uniform(*spec["variability_period"])
+        flux += spec["variability_amplitude"] * np.sin(2 * np.pi * time / period + rng.uniform(0, 2 * np.pi))
+
+    transit = spec["transit"]
+    if transit:
+        epoch = time[0] + rng.uniform(0, transit["period"])
+        for centre in np.arange(epoch, time[-1], transit["period"]):
+            decrement = _box_or_v(time, centre, transit["duration"], transit["depth"], "box")
+            if decrement.any():
+                flux -= decrement
+                injections.append(("transit", centre - transit["duration"] / 2, centre + transit["duration"] / 2,
+                                   transit["depth"], transit["duration"], transit["period"]))
+
+    for _ in range(spec["n_dips"]):
+        duration = rng.uniform(*spec["dip_duration"])
+        depth = rng.uniform(*spec["dip_depth"])
+        centre = rng.choice(time)
+        decrement = _box_or_v(time, centre, duration, depth, "v")
+        if decrement.any():
+            flux -= decrement
+            injections.append(("dip", centre - duration / 2, centre + duration / 2, depth, duration, np.nan))
+
+    flux[rng.random(len(time)) < spec["dropout_fraction"]] = np.nan
+    return {
+        "time": time,
+        "flux": flux,
+        "flux_err": np.full(len(time), spec["noise"]),
+        "injections": pd.DataFrame(injections, columns=INJECTION_COLUMNS),
+    }
+
+
+def injection_recovery(injections, dips):
+    """
+    Which injections a detector recovered: an injection counts as found when
+    any detected dip overlaps its [start_time, end_time] window. Returns the
+    injections with a boolean `recovered` column.
+    """
+    injections = injections.reset_index(drop=True)
+    starts = np.asarray(dips["start_time"], dtype=float)
+    ends = np.asarray(dips["end_time"], dtype=float)
+    order = np.argsort(starts)
+    starts, ends = starts[order], ends[order]
+    # Candidates start before the injection ends; the one with the latest end
+    # among them decides whether anything overlaps
+    n_before = np.searchsorted(starts, injections["end_time"].to_numpy(), side="right")
+    latest_end = np.maximum.accumulate(ends) if len(ends) else ends
+    found = n_before > 0
+    found[found] = latest_end[n_before[found] - 1] >= injections["start_time"].to_numpy()[found]
+    return injections.assign(recovered=found)
+
+
+def completeness(recovered, column="depth", bins=(0.003, 0.005, 0.0075, 0.01, 0.02, 0.05)):
+    """Recovered fraction per bin of `column` (e.g. depth or snr)."""
+    groups = recovered.groupby(pd.cut(recovered[column], bins), observed=False)["recovered"]
+    return pd.DataFrame({"injected": groups.size(), "completeness": groups.mean()})
+
+
+# === Pipeline tables ===
+# Shaped like the real artifacts so the table stages (labeling, merging,
+# scoring, radius estimation) run on them unchanged.
+
+def synthetic_tic_metadata(n_targets, seed=0):
+    """tic_metadata rows: positions, magnitude and stellar parameters."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "tic_id": np.arange(1, n_targets + 1, dtype=np.int64) * 1000 + 7,
+        "ra": rng.uniform(0, 360, n_targets),
+        "dec": np.degrees(np.arcsin(rng.uniform(-1, 1, n_targets))),
+        "Tmag": rng.uniform(6, 16, n_targets).astype(np.float32),
+        "Teff": rng.normal(5600, 900, n_targets).clip(2800, 12000).astype(np.float32),
+        "rad": rng.lognormal(0, 0.4, n_targets).astype(np.float32),
+        "logg": rng.normal(4.3, 0.3, n_targets).astype(np.float32),
+        "mass": rng.lognormal(0, 0.3, n_targets).astype(np.float32),
+    })
+
+
+def synthetic_dips(metadata, dips_per_target=3, seed=0):
+    """all_dips rows (with shape features) for the TICs in `metadata`."""
+    rng = np.random.default_rng(seed)
+    tic = np.repeat(metadata["tic_id"].to_numpy(), rng.poisson(dips_per_target, len(metadata)))
+    n = len(tic)
+    start = rng.integers(0, 19000, n)
+    n_points = rng.integers(2, 90, n)
+    depth = rng.lognormal(np.log(0.008), 0.7, n)
+    duration = (n_points - 1) * CADENCE_DAYS
+    noise = rng.lognormal(np.log(0.001), 0.3, n)
+    return pd.DataFrame({
+        "TIC": tic,
+        "start_index": start,
+        "end_index": start + n_points - 1,
+        "start_time": START_TIME + start * CADENCE_DAYS,
+        "end_time": START_TIME + (start + n_points - 1) * CADENCE_DAYS,
+        "depth": depth,
+        "duration": duration,
+        "min_index": start + n_points // 2,
+        "n_points": n_points,
+        "ingress_slope": -depth / np.maximum(duration / 2, CADENCE_DAYS),
+        "egress_slope": depth / np.maximum(duration / 2, CADENCE_DAYS),
+        "symmetry": rng.uniform(0.3, 1, n),
+        "local_noise": noise,
+        "snr": depth / noise * np.sqrt(n_points),
+        "edge_distance": rng.exponential(5, n),
+        "near_edge": rng.random(n) < 0.05,
+        "dip_shape": rng.choice(["u_shaped", "v_shaped", "unresolved"], n, p=[0.3, 0.6, 0.1]),
+    })
+
+
+def synthetic_predictions(dips, seed=0):
+    """predicted_dips_with_exofop_status rows: dips plus model label and ExoFOP status."""
+    rng = np.random.default_rng(seed)
+    df = dips.rename(columns={"TIC": "tic_id"})
+    df["predicted_label"] = rng.choice(LABELS, len(df), p=[0.3, 0.1, 0.6])
+    codes, tics = pd.factorize(df["tic_id"])  # ExoFOP status is per TIC, not per dip
+    df["exofop_status"] = rng.choice(EXOFOP_STATUSES, len(tics), p=[0.8, 0.15, 0.05])[codes]
+    return df
+
+
+def synthetic_periodicity(metadata, seed=0):
+    """periodicity_flags rows, about a fifth of TICs periodic."""
+    rng = np.random.default_rng(seed)
+    n = len(metadata)
+    periodic = rng.random(n) < 0.2
+    return pd.DataFrame({
+        "tic_id": metadata["tic_id"],
+        "periodic": periodic,
+        "peak_power": np.where(periodic, rng.uniform(0.1, 0.6, n), rng.uniform(0, 0.1, n)),
+        "bls_period": rng.uniform(0.3, 13, n),
+        "bls_snr": np.where(periodic, rng.uniform(7.1, 40, n), rng.uniform(0, 7.1, n)),
+        "bls_periodic": periodic,
+    })
@@ -1,7 +1,7 @@
-import pandas as pd
+from artifact_io import read_table
 
-scores_df = pd.read_csv("exoasteroid_output/discovery_scores.csv")
-metadata_df = pd.read_csv("exoasteroid_output/tic_metadata.csv")
+scores_df = read_table("exoasteroid_output/discovery_scores.csv")
+metadata_df = read_table("exoasteroid_output/tic_metadata.csv")
 
 print("\n📄 Columns in discovery_scores.csv:")
 print(scores_df.columns)
@@ -0,0 +1,19 @@
+# === TIC ID Helpers ===
+# One place for turning "TIC 123", "TIC_123", 123 or 123.0 into a TIC number
+# and back, instead of repeating replace("TIC", "").strip() in every script.
+
+import re
+
+_TIC_PREFIX = re.compile(r"^\s*tic[\s_-]*", re.IGNORECASE)
+
+
+def normalize_tic(tic_id):
+    """Return the integer TIC number for any of the ID spellings used in the pipeline."""
+    if isinstance(tic_id, str):
+        tic_id = _TIC_PREFIX.sub("", tic_id).strip()
+    return int(float(tic_id))
+
+
+def format_tic(tic_id):
+    """Canonical "TIC <number>" form used for MAST queries and tic_id columns."""
+    return f"TIC {normalize_tic(tic_id)}"
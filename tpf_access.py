@@ -0,0 +1,186 @@
+# === Target Pixel File Access ===
+# Finds, validates and reads TESS target pixel files without loading whole
+# pixel cubes.
+#
+# A SQLite index maps (TIC, sector) to the downloaded FITS file, so a cached
+# TPF is found without walking the lightkurve download tree. Files are checked
+# against their FITS CHECKSUM/DATASUM cards once (and again only if the file
+# changes on disk); a file that fails is re-downloaded, intact ones are never
+# deleted. Frames are read through a memory map, one cadence row at a time.
+
+import os
+import time
+import sqlite3
+import warnings
+import numpy as np
+from astropy.io import fits
+from tic_utils import normalize_tic
+import instrumentation as metrics
+
+INDEX_FILE = "exoasteroid_output/tpf_index.sqlite"
+DOWNLOAD_DIR = None  # None uses lightkurve's own cache (~/.lightkurve/cache)
+FITS_BLOCK = 2880  # every complete FITS file is a whole number of blocks
+
+stats = {"index_hits": 0, "downloads": 0, "validated": 0, "invalid": 0}
+
+
+class TpfIndex:
+    """SQLite index of downloaded TPFs: (tic, sector) -> path, stamp and validation result."""
+
+    def __init__(self, path=INDEX_FILE):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS tpf_files ("
+            "tic INTEGER NOT NULL, sector INTEGER NOT NULL, path TEXT NOT NULL, "
+            "size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, valid INTEGER NOT NULL, "
+            "n_cadences INTEGER NOT NULL, validated_at REAL NOT NULL, PRIMARY KEY (tic, sector))"
+        )
+
+    def lookup(self, tic, sector=None):
+        """Rows for a TIC (optionally one sector), lowest sector first."""
+        query = "SELECT sector, path, size, mtime_ns, valid, n_cadences FROM tpf_files WHERE tic = ?"
+        params = [tic]
+        if sector is not None:
+            query += " AND sector = ?"
+            params.append(sector)
+        rows = self.conn.execute(query + " ORDER BY sector", params).fetchall()
+        keys = ("sector", "path", "size", "mtime_ns", "valid", "n_cadences")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def record(self, tic, sector, path, valid, n_cadences):
+        st = os.stat(path)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO tpf_files VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (tic, sector, path, st.st_size, st.st_mtime_ns, int(valid), n_cadences, time.time()),
+            )
+
+    def forget(self, tic, sector):
+        with self.conn:
+            self.conn.execute("DELETE FROM tpf_files WHERE tic = ? AND sector = ?", (tic, sector))
+
+
+def verify_fits(path):
+    """
+    (valid, n_cadences) for a TPF. Checks the FITS CHECKSUM/DATASUM cards where
+    present and catches truncated files; reads the file once, never into RAM.
+    """
+    try:
+        if os.path.getsize(path) % FITS_BLOCK:
+            return False, 0
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            with fits.open(path, memmap=True, checksum=True, lazy_load_hdus=False) as hdul:
+                n_cadences = hdul[1].header.get("NAXIS2", 0)
+        failed = any("verification failed" in str(w.message).lower() for w in caught)
+        return not failed, n_cadences
+    except (OSError, ValueError, IndexError):
+        return False, 0
+
+
+def _is_current(row):
+    """Indexed file still on disk and unchanged since it was validated."""
+    try:
+        st = os.stat(row["path"])
+    except OSError:
+        return False
+    return row["valid"] and st.st_size == row["size"] and st.st_mtime_ns == row["mtime_ns"]
+
+
+def _download(search_row, download_dir):
+    with metrics.span("download", source="tpf"):
+        tpf = search_row.download(download_dir=download_dir)
+    stats["downloads"] += 1
+    path = getattr(tpf, "path", None)
+    metrics.count("downloads", source="tpf")
+    if path and os.path.exists(path):
+        metrics.count("download_bytes", os.path.getsize(path), source="tpf")
+    return path
+
+
+def ensure_tpf(tic_id, sector=None, index=None, download_dir=DOWNLOAD_DIR, search_result=None):
+    """
+    (path, sector) of a validated TPF with data for the TIC: the requested
+    sector, or the first indexed/available one. Downloads at most one sector.
+    Pass `search_result` to reuse a search_targetpixelfile() result.
+    """
+    tic = normalize_tic(tic_id)
+    index = index or TpfIndex()
+
+    for row in index.lookup(tic, sector):
+        if row["n_cadences"] > 0 and _is_current(row):
+            stats["index_hits"] += 1
+            metrics.count("tpf_index_hits")
+            return row["path"], row["sector"]
+
+    result = search_result
+    if result is None:
+        from lightkurve import search_targetpixelfile
+        result = search_targetpixelfile(f"TIC {tic}", mission="TESS")
+    for i in range(len(result)):
+        row_sector = int(result.table["sequence_number"][i])
+        if sector is not None and row_sector != sector:
+            continue
+        path = _download(result[i], download_dir)
+        if path is None:
+            continue
+        valid, n_cadences = verify_fits(path)
+        stats["validated"] += 1
+        if not valid:
+            # Only the file that failed its checksum is replaced
+            stats["invalid"] += 1
+            metrics.count("tpf_invalid")
+            print(f"🧹 Re-downloading corrupted TPF: {path}")
+            os.remove(path)
+            path = _download(result[i], download_dir)
+            valid, n_cadences = verify_fits(path) if path else (False, 0)
+            if not valid:
+                index.forget(tic, row_sector)
+                continue
+        index.record(tic, row_sector, path, valid, n_cadences)
+        if n_cadences > 0:
+            return path, row_sector
+
+    raise ValueError(f"No usable TPFs for TIC {tic}")
+
+
+def _header_origin(header):
+    # Pixel (column, row) of the cutout's lower-left corner
+    return header.get("1CRV5P", 0), header.get("2CRV5P", 0)
+
+
+def read_frames(path, indices):
+    """
+    Pixel frames at the given cadence positions, read through a memory map
+    so only those rows of the FLUX column leave the file.
+    """
+    indices = np.asarray(indices, dtype=int)
+    with fits.open(path, memmap=True) as hdul:
+        table = hdul[1].data
+        n = len(table)
+        indices = np.clip(indices, 0, n - 1)
+        column, row = _header_origin(hdul[1].header)
+        return {
+            "index": indices,
+            "cadenceno": np.array(table["CADENCENO"][indices]),
+            "time": np.array(table["TIME"][indices], dtype=float),
+            "flux": np.array(table["FLUX"][indices], dtype=np.float32),
+            "column": column,
+            "row": row,
+            "n_cadences": n,
+        }
+
+
+def frames_around(path, cadence, offsets=(-1, 0, 1)):
+    """Frames at `offsets` from the TPF row holding `cadence` (e.g. before/during/after a dip)."""
+    with fits.open(path, memmap=True) as hdul:
+        center = int(np.searchsorted(hdul[1].data["CADENCENO"], cadence))
+    return read_frames(path, [center + o for o in offsets])
+
+
+def frames_near_time(path, time, offsets=(0,)):
+    """Like frames_around, keyed by the TPF row closest in time (for callers without cadence numbers)."""
+    with fits.open(path, memmap=True) as hdul:
+        center = int(np.nanargmin(np.abs(hdul[1].data["TIME"] - time)))
+    return read_frames(path, [center + o for o in offsets])